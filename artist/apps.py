@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import pre_migrate
 
 
 class ArtistConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'artist'
+
+    def ready(self):
+        from utils.schema import create_missing_tables
+
+        pre_migrate.connect(create_missing_tables, sender=self)
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from utils.schema import bootstrap_schema, create_table_statements
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates the Users, Artist and Music tables from sql_querys, translated for the configured "
+        "database. Tables that already exist are left alone; `migrate` runs this first as well."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+        parser.add_argument("--print", action="store_true", help="Print the statements instead of running them.")
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        if options["print"]:
+            for sql in create_table_statements(connection).values():
+                self.stdout.write(sql + ";\n")
+            return
+
+        with transaction.atomic(using=options["database"]):
+            created, skipped = bootstrap_schema(connection)
+        for name in created:
+            self.stdout.write(f"Created {name}")
+        for name in skipped:
+            self.stdout.write(f"Skipped {name}, it already exists")
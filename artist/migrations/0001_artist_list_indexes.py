@@ -0,0 +1,43 @@
+from django.db import migrations
+
+from utils.migrations import vendor_sql
+
+
+class Migration(migrations.Migration):
+
+    dependencies = []
+
+    operations = [
+        # The list and the streaming export read Artist newest first. SQL Server can only walk the
+        # clustered primary key backwards serially; this gives a forward, covering scan in list order.
+        # SQLite keeps the table in rowid order already, so it needs nothing here.
+        vendor_sql(
+            {
+                "microsoft": [
+                    "CREATE NONCLUSTERED INDEX IX_Artist_id_desc ON Artist (id DESC) "
+                    "INCLUDE (name, dob, gender, address, first_release_year, no_of_albums_released)",
+                ],
+                "postgresql": [
+                    "CREATE INDEX IX_Artist_id_desc ON Artist (id DESC) "
+                    "INCLUDE (name, dob, gender, address, first_release_year, no_of_albums_released)",
+                ],
+            },
+            {
+                "microsoft": ["DROP INDEX IX_Artist_id_desc ON Artist"],
+                "postgresql": ["DROP INDEX IX_Artist_id_desc"],
+            },
+        ),
+        # COUNT(*), MAX(updated_at) runs on every artist list request to build the ETag
+        vendor_sql(
+            {
+                "microsoft": ["CREATE NONCLUSTERED INDEX IX_Artist_updated_at ON Artist (updated_at)"],
+                "postgresql": ["CREATE INDEX IX_Artist_updated_at ON Artist (updated_at)"],
+                "sqlite": ["CREATE INDEX IX_Artist_updated_at ON Artist (updated_at)"],
+            },
+            {
+                "microsoft": ["DROP INDEX IX_Artist_updated_at ON Artist"],
+                "postgresql": ["DROP INDEX IX_Artist_updated_at"],
+                "sqlite": ["DROP INDEX IX_Artist_updated_at"],
+            },
+        ),
+    ]
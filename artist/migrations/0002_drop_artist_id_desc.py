@@ -0,0 +1,31 @@
+from django.db import migrations
+
+from utils.migrations import vendor_sql
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("artist", "0001_artist_list_indexes"),
+    ]
+
+    operations = [
+        # A second copy of every Artist column that each write has to maintain, with no captured plan
+        # showing the list or export choosing it over a backward scan of the primary key
+        vendor_sql(
+            {
+                "microsoft": ["DROP INDEX IX_Artist_id_desc ON Artist"],
+                "postgresql": ["DROP INDEX IX_Artist_id_desc"],
+            },
+            {
+                "microsoft": [
+                    "CREATE NONCLUSTERED INDEX IX_Artist_id_desc ON Artist (id DESC) "
+                    "INCLUDE (name, dob, gender, address, first_release_year, no_of_albums_released)",
+                ],
+                "postgresql": [
+                    "CREATE INDEX IX_Artist_id_desc ON Artist (id DESC) "
+                    "INCLUDE (name, dob, gender, address, first_release_year, no_of_albums_released)",
+                ],
+            },
+        ),
+    ]
@@ -1,3 +1,220 @@
-from django.test import TestCase
+import json
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext
+
+from utils.repositories import ArtistRepository, MusicRepository
+from utils.testing import ApiTestCase, AsyncApiTestCase
+
+
+class ArtistListTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.artist_ids = [self.add_artist(f"artist {index}") for index in range(5)]
+
+    def test_pages_follow_the_cursor(self):
+        seen = []
+        path = "/artist/get/?limit=2"
+        while True:
+            _, body = self.send("get", path)
+            seen += [artist["id"] for artist in body["data"]]
+            if not body["nextCursor"]:
+                break
+            path = f"/artist/get/?limit=2&after={body['nextCursor']}"
+        self.assertEqual(seen, sorted(self.artist_ids, reverse=True))
+
+    def test_invalid_cursor_is_a_400(self):
+        response, _ = self.send("get", "/artist/get/?after=!!!")
+        self.assertEqual(response.status_code, 400)
+
+    def test_genre_filter_revalidates_on_track_writes(self):
+        self.add_track(self.artist_ids[0], genre="rnb")
+        response, body = self.send("get", "/artist/get/?genre=rnb&fields=id")
+        self.assertEqual([artist["id"] for artist in body["data"]], [self.artist_ids[0]])
+
+        self.add_track(self.artist_ids[3], genre="rnb")
+        response, body = self.send("get", "/artist/get/?genre=rnb&fields=id", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([artist["id"] for artist in body["data"]], [self.artist_ids[3], self.artist_ids[0]])
+
+    def test_name_filter_matches_wildcards_literally(self):
+        percent_id = self.add_artist("100% pure")
+        self.add_artist("100 pure")
+        _, body = self.send("get", "/artist/get/?name_contains=0%25&fields=id")
+        self.assertEqual([artist["id"] for artist in body["data"]], [percent_id])
+
+    def test_unchanged_list_is_not_modified(self):
+        response = self.client.get("/artist/get/")
+        self.assertEqual(self.client.get("/artist/get/", HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+    def test_unchanged_artist_is_not_modified_without_loading_it(self):
+        for path in [f"/artist/get/?id={self.artist_ids[0]}", f"/artist/get/?ids={self.artist_ids[0]},{self.artist_ids[1]}"]:
+            response = self.client.get(path)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn("Last-Modified", response)
+            with mock.patch.object(ArtistRepository, "get") as get, mock.patch.object(ArtistRepository, "get_many") as get_many:
+                self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+            get.assert_not_called()
+            get_many.assert_not_called()
+
+    def test_fields_narrow_an_uncached_lookup(self):
+        path = f"/artist/get/?id={self.artist_ids[0]}&fields=name"
+        with CaptureQueriesContext(connection) as queries:
+            _, body = self.send("get", path)
+        self.assertEqual(body["data"], {"name": "artist 0"})
+        self.assertTrue(queries[-1]["sql"].startswith("SELECT name, id FROM Artist WHERE id ="))
+
+        # Only whole rows are cached, and a later ?fields= request is projected from them
+        self.send("get", f"/artist/get/?id={self.artist_ids[0]}")
+        with CaptureQueriesContext(connection) as queries:
+            _, body = self.send("get", path)
+        self.assertEqual(body["data"], {"name": "artist 0"})
+        self.assertFalse(any("SELECT name" in query["sql"] for query in queries))
+
+    def test_included_tracks_revalidate_the_artist(self):
+        path = f"/artist/get/?id={self.artist_ids[0]}&include=music"
+        response = self.client.get(path)
+        self.add_track(self.artist_ids[0])
+        response, body = self.send("get", path, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(body["data"]["music"]), 1)
+
+    def test_stream_ndjson(self):
+        response = self.client.get("/artist/get/?stream=ndjson")
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).splitlines()
+        self.assertEqual([json.loads(line)["id"] for line in lines], sorted(self.artist_ids, reverse=True))
+
+    def test_stream_json_array(self):
+        response = self.client.get("/artist/get/?stream=json")
+        artists = json.loads(b"".join(response.streaming_content))
+        self.assertEqual([artist["id"] for artist in artists], sorted(self.artist_ids, reverse=True))
+
+
+class AsyncStreamTests(AsyncApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.artist_ids = [self.add_artist(f"artist {index}") for index in range(5)]
+
+    def test_batches_walk_keyset_pages(self):
+        async def collect():
+            return [[row[0] for row in rows] async for rows in ArtistRepository.aiter_batches(batch_size=2, fields=["id"])]
+
+        ids = sorted(self.artist_ids, reverse=True)
+        self.assertEqual(async_to_sync(collect)(), [ids[0:2], ids[2:4], ids[4:]])
+
+    def test_export_batches_walk_keyset_pages(self):
+        for index, artist_id in enumerate(self.artist_ids[:3]):
+            for track in range(index + 2):
+                self.add_track(artist_id, title=f"t{track}")
+
+        async def collect(include_music):
+            return [row async for rows in ArtistRepository.aexport_batches(include_music, batch_size=2) for row in rows]
+
+        for include_music in [False, True]:
+            expected = [row for rows in ArtistRepository.export_batches(include_music) for row in rows]
+            self.assertEqual(async_to_sync(collect)(include_music), expected)
+
+    async def test_asgi_download_is_async(self):
+        client, headers = AsyncClient(), {"Authorization": self.client.defaults["HTTP_AUTHORIZATION"]}
+        response = await client.get("/artist/download/?include=music", headers=headers)
+        self.assertTrue(response.is_async)
+        rows = b"".join([chunk async for chunk in response.streaming_content]).decode().splitlines()
+        self.assertEqual(len(rows), 1 + len(self.artist_ids))
+
+        response = await client.get("/artist/download/?format=xlsx", headers=headers)
+        self.assertTrue(response.is_async)
+        self.assertTrue(b"".join([chunk async for chunk in response.streaming_content]).startswith(b"PK"))
+
+    async def test_asgi_stream_is_async(self):
+        client, headers = AsyncClient(), {"Authorization": self.client.defaults["HTTP_AUTHORIZATION"]}
+        for path in ["/artist/get/?stream=ndjson", "/music/get?stream=ndjson", "/users/get/?stream=ndjson"]:
+            response = await client.get(path, headers=headers)
+            self.assertTrue(response.is_async, path)
+        response = await client.get("/artist/get/?stream=json&fields=id", headers=headers)
+        artists = json.loads(b"".join([chunk async for chunk in response.streaming_content]))
+        self.assertEqual([artist["id"] for artist in artists], sorted(self.artist_ids, reverse=True))
+
+
+class UpdateArtistTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.artist_id = self.add_artist(first_release_year=1990)
+
+    def body(self, **changes):
+        return {"id": self.artist_id, "name": "renamed", "gender": "female", "first_release_year": 2001,
+                "no_of_albums_released": 2, **changes}
+
+    def test_update(self):
+        response, body = self.send("put", "/artist/update/", self.body())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(ArtistRepository.get(self.artist_id)["first_release_year"], 2001)
+
+    def test_invalid_fields_are_a_400(self):
+        for changes, error in [
+            ({"gender": "x"}, "Invalid gender"),
+            ({"gender": 1}, "Invalid gender"),
+            ({"name": ""}, "Required fields missing"),
+            ({"first_release_year": "soon"}, "first_release_year and no_of_albums_released must be integers"),
+        ]:
+            response, body = self.send("put", "/artist/update/", self.body(**changes))
+            self.assertEqual((response.status_code, body["errorMessage"]), (400, error))
+        self.assertEqual(ArtistRepository.get(self.artist_id)["first_release_year"], 1990)
+
+    def test_missing_artist_is_a_404(self):
+        response, _ = self.send("put", "/artist/update/", self.body(id=424242))
+        self.assertEqual(response.status_code, 404)
+
+
+class ImportArtistTests(ApiTestCase):
+    def upload(self, lines):
+        csv_file = "\n".join(["name,dob,gender,first_release_year,no_of_albums_released", *lines]).encode("utf-8")
+        response = self.client.post("/artist/import/", {"file": SimpleUploadedFile("artists.csv", csv_file)})
+        return json.loads(response.content)["data"]
+
+    def test_invalid_dob_is_rejected_per_row(self):
+        data = self.upload([
+            "a,1990-02-30,male,2010,1", "b,1990-02-03,female,2010,1", "c,03/02/1990,male,2010,1", "d,,others,2010,1",
+        ])
+        self.assertEqual(data["inserted"], 2)
+        self.assertEqual([error["row"] for error in data["errors"]], [2, 4])
+        self.assertTrue(all(error["error"].startswith("dob") for error in data["errors"]))
+
+    def test_errors_are_sorted_by_row(self):
+        insert_many = ArtistRepository.insert_many
+
+        def fail_on_duplicate(rows):
+            if any(row[0] == "dup" for row in rows):
+                raise IntegrityError("duplicate")
+            return insert_many(rows)
+
+        # The database error on line 2 is only found when its batch is written at line 4, after line 3 failed to parse
+        with mock.patch("artist.views.IMPORT_BATCH_SIZE", 2), \
+                mock.patch.object(ArtistRepository, "insert_many", side_effect=fail_on_duplicate):
+            data = self.upload([
+                "dup,,male,2010,1", "c,,male,x,1", "b,,female,2010,1", "d,,male,2010,1",
+            ])
+        self.assertEqual(data["inserted"], 2)
+        self.assertEqual([error["row"] for error in data["errors"]], [2, 3])
+
+
+class ReturningPreviousTests(ApiTestCase):
+    def test_update_returns_previous_values(self):
+        artist_id = self.add_artist(first_release_year=1990, no_of_albums_released=3)
+        previous = ArtistRepository.update(artist_id, ["renamed", None, "f", None, 2001, 4])
+        self.assertEqual(tuple(previous), (1990, 3))
+        self.assertEqual(ArtistRepository.get(artist_id)["first_release_year"], 2001)
+
+    def test_update_of_missing_row_returns_none(self):
+        self.assertIsNone(ArtistRepository.update(424242, ["x", None, "f", None, 2001, 4]))
+        self.assertIsNone(MusicRepository.update(424242, ["t", "a", "rock"]))
+
+    def test_batch_insert_ids_follow_row_order(self):
+        artist_id = self.add_artist()
+        inserted = MusicRepository.insert_batch([(index, artist_id, f"t{index}", "a", "rock") for index in [3, 1, 2]])
+        self.assertEqual({MusicRepository.get(music_id)["title"]: index for index, music_id in inserted.items()},
+                         {"t3": 3, "t1": 1, "t2": 2})
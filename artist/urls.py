@@ -1,10 +1,13 @@
 from django import urls
 from artist import views
+from utils.async_db import for_server
 
 urlpatterns = [
-    urls.path('add/',views.add_artist),
-    urls.path('get/',views.get_artist),
-    urls.path('get/<int:id>/',views.get_artist),
-    urls.path('delete',views.delete_artist),
-    urls.path('update/',views.update_artist),
+    urls.path('add/',for_server(views.add_artist)),
+    urls.path('get/',for_server(views.get_artist)),
+    urls.path('get/<int:id>/',for_server(views.get_artist)),
+    urls.path('delete',for_server(views.delete_artist)),
+    urls.path('update/',for_server(views.update_artist)),
+    urls.path('download/',for_server(views.download_artist)),
+    urls.path('import/',for_server(views.import_artist)),
 ]
\ No newline at end of file
@@ -1,16 +1,77 @@
-from django.db import connection, transaction
-from django.http import JsonResponse  
-from django.db.utils import IntegrityError
+import datetime
+from django.db import transaction
+from utils.serialization import JsonResponse
+from django.db.utils import DataError, IntegrityError
 import json
 from django.views.decorators.csrf import csrf_exempt
+import csv
+import io
 
 from utils.service_result import ServiceResult
-import pandas as pd
+from utils.idempotency import idempotent
+from utils.pagination import InvalidPageRequest, parse_page_params
+from utils.streaming import serves_async, stream_batches, stream_format, stream_rows_response
+from utils.exports import csv_streaming_response, xlsx_file_response
+from utils.cache import EntityCache
+from utils.conditional import not_modified, validators_for, with_validators
+from utils.filters import InvalidFilter, parse_filters
+from utils.fields import InvalidFields, parse_fields
+from utils.repositories import GENDER_CODES, GENDER_NAMES, ArtistRepository, MusicRepository, rows_per_statement
+from search.index import catalogue_index
+from stats.summary import catalogue_stats
 
 
+artist_cache = EntityCache("artist")
+
+ARTIST_REQUIRED_FIELDS = ["name", "first_release_year", "no_of_albums_released", "gender"]
+IMPORT_BATCH_SIZE = rows_per_statement(ArtistRepository.INSERT_ROW)
+MAX_ARTIST_IDS = 200
+
+
+def clean_artist(data):
+    missing_fields = [field for field in ARTIST_REQUIRED_FIELDS if data.get(field) in [None, ""]]
+    if missing_fields:
+        return None, "Required fields missing"
+
+    gender = GENDER_CODES.get(str(data.get("gender")).strip().lower())
+    if not gender:
+        return None, "Invalid gender"
+
+    try:
+        first_release_year = int(data.get("first_release_year"))
+        no_of_albums_released = int(data.get("no_of_albums_released"))
+    except (TypeError, ValueError):
+        return None, "first_release_year and no_of_albums_released must be integers"
+
+    dob = data.get("dob") or None
+    if dob is not None:
+        try:
+            dob = datetime.date.fromisoformat(dob).isoformat()
+        except (TypeError, ValueError):
+            return None, "dob must be a date in YYYY-MM-DD format"
+
+    return [
+        data.get("name"),
+        dob,
+        gender,
+        data.get("address") or None,
+        first_release_year,
+        no_of_albums_released,
+    ], None
+
+
+def parse_artist_ids(value):
+    try:
+        artist_ids = list(dict.fromkeys(int(artist_id) for artist_id in value.split(",") if artist_id.strip()))
+    except ValueError:
+        return None, "ids must be a comma separated list of integers"
+    if not artist_ids or len(artist_ids) > MAX_ARTIST_IDS:
+        return None, f"Between 1 and {MAX_ARTIST_IDS} artist IDs are required"
+    return artist_ids, None
 
 
 @csrf_exempt
+@idempotent
 def add_artist(request, *args, **kwargs):
     if request.method != "POST":
         result = ServiceResult.as_failure(error_message="Only POST method allowed", status=405)
@@ -18,35 +79,16 @@ def add_artist(request, *args, **kwargs):
 
     try:
         data = json.loads(request.body.decode("utf-8"))
-        name=data.get("name") 
-        dob = data.get("dob")
-        gender = data.get("gender")
-        address = data.get("address")
-        first_release_year = data.get("first_release_year")
-        no_of_albums_released = data.get("no_of_albums_released")
-
-        
-        required_fields = ["name", "first_release_year", "no_of_albums_released", "gender"]
-        missing_fields = [field for field in required_fields if data.get(field) in [None, ""]]
-        print(missing_fields)
-        if missing_fields:
-            return JsonResponse(ServiceResult.as_failure(error_message="Required fields missing", status=400).to_dict())
 
-        gender_map = {"male": "m", "female": "f", "others": "o"}
-        gender = gender_map.get(gender.lower())
+        values, error_message = clean_artist(data)
+        if error_message:
+            return JsonResponse(ServiceResult.as_failure(error_message=error_message, status=400).to_dict())
+        name, dob, gender, address, first_release_year, no_of_albums_released = values
 
         with transaction.atomic():
-            with connection.cursor() as cursor:
- 
-                cursor.execute(
-                    '''
-                    INSERT INTO Artist (name, dob,gender, address, first_release_year, no_of_albums_released)
-                    OUTPUT INSERTED.id
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                    ''',
-                    [name, dob, gender,  address,first_release_year, no_of_albums_released]
-                )
-                artist_id = cursor.fetchone()[0] 
+            artist_id = ArtistRepository.insert(values)
+            catalogue_stats.artists_added([(artist_id, first_release_year, no_of_albums_released)])
+        catalogue_index.add_artist(artist_id, name)
 
         artist_data = {
             "id": artist_id,
@@ -78,60 +120,94 @@ def get_artist(request, *args, **kwargs):
         return JsonResponse(ServiceResult.as_failure("Only GET method allowed", status=405).to_dict(), status=405)
 
     try:
-        gender_map = {"m": "male", "f": "female", "o": "others"}
         artist_id = request.GET.get("id") 
+        fields = parse_fields(request.GET, ArtistRepository.keys)
+
+        include = request.GET.get("include", "")
+        if include not in ["", "music"]:
+            return JsonResponse(ServiceResult.as_failure("include: expected music", status=400).to_dict(), status=400)
+
+        ids = request.GET.get("ids")
+        if ids or (artist_id and include):
+            # Artists and their tracks come from one joined query instead of a music/get call per artist
+            artist_ids, error_message = parse_artist_ids(ids or artist_id)
+            if error_message:
+                return JsonResponse(ServiceResult.as_failure(error_message, status=400).to_dict(), status=400)
+
+            # Like the list below, a revalidation is answered from COUNT/MAX(updated_at) without loading the rows
+            validator = ArtistRepository.many_validator(artist_ids, include == "music")
+            if not validator[0]:
+                return JsonResponse(ServiceResult.as_failure("Artist not found", status=404).to_dict(), status=404)
+            etag, last_modified = validators_for(request, "artist", validator)
+            cached_response = not_modified(request, etag, last_modified)
+            if cached_response:
+                return cached_response
+
+            artists = ArtistRepository.get_many(artist_ids, include == "music", fields)
+            if not artists:
+                return JsonResponse(ServiceResult.as_failure("Artist not found", status=404).to_dict(), status=404)
 
-        with connection.cursor() as cursor:
-            if artist_id:
-                cursor.execute(
-                    '''
-                    SELECT id, name, dob, gender, address, first_release_year, no_of_albums_released
-                    FROM Artist WHERE id = %s
-                    ''', 
-                    [artist_id]
-                )
-                artist = cursor.fetchone()
-
-                if not artist:
-                    return JsonResponse(ServiceResult.as_failure("Artist not found", status=404).to_dict(), status=404)
-
-                artist_data = {
-                    "id": artist[0],
-                    "name": artist[1],
-                    "dob": artist[2],
-                    "gender": gender_map.get(artist[3]),  
-                    "address": artist[4],
-                    "first_release_year": artist[5],
-                    "no_of_albums_released": artist[6],
-                }
-
-                return JsonResponse(ServiceResult.as_success(artist_data).to_dict(), status=200)
-
-            cursor.execute(
-                '''
-                SELECT id, name, dob, gender, address, first_release_year, no_of_albums_released
-                FROM Artist ORDER BY ID DESC
-                '''
+            artist_data = [artists[artist_id] for artist_id in artist_ids if artist_id in artists]
+            if not ids:
+                artist_data = artist_data[0]
+            return with_validators(
+                JsonResponse(ServiceResult.as_success(artist_data).to_dict(), status=200), etag, last_modified
             )
-            artists = cursor.fetchall()
 
-            if not artists:
-                return JsonResponse(ServiceResult.as_failure("No artists found", status=404).to_dict())
-
-            artists_data = [
-                {
-                    "id": artist[0],
-                    "name": artist[1],
-                    "dob": artist[2],
-                    "gender": gender_map.get(artist[3], ),
-                    "address": artist[4],
-                    "first_release_year": artist[5],
-                    "no_of_albums_released": artist[6],
-                }
-                for artist in artists
-            ]
-
-            return JsonResponse(ServiceResult.as_success(artists_data).to_dict(), status=200)
+        if artist_id:
+            validator = ArtistRepository.ids_validator([artist_id])
+            if not validator[0]:
+                return JsonResponse(ServiceResult.as_failure("Artist not found", status=404).to_dict(), status=404)
+            etag, last_modified = validators_for(request, "artist", validator)
+            cached_response = not_modified(request, etag, last_modified)
+            if cached_response:
+                return cached_response
+
+            artist_data = artist_cache.get_fields(artist_id, fields, lambda fields: ArtistRepository.get(artist_id, fields))
+
+            if not artist_data:
+                return JsonResponse(ServiceResult.as_failure("Artist not found", status=404).to_dict(), status=404)
+
+            return with_validators(
+                JsonResponse(ServiceResult.as_success(artist_data).to_dict(), status=200), etag, last_modified
+            )
+
+        validator = ArtistRepository.validator()
+        if "genre" in request.GET:
+            # ?genre= matches on Music rows, so track writes change the result as well
+            validator = [*validator, *MusicRepository.validator()]
+        etag, last_modified = validators_for(request, "artists", validator)
+        cached_response = not_modified(request, etag, last_modified)
+        if cached_response:
+            return cached_response
+
+        filters = parse_filters(request.GET, ArtistRepository.filters)
+        fmt = stream_format(request)
+        if fmt:
+            return with_validators(
+                stream_rows_response(
+                    fmt,
+                    stream_batches(
+                        request, ArtistRepository.iter_batches, ArtistRepository.aiter_batches, filters, fields=fields
+                    ),
+                    ArtistRepository.projection(fields).map_row,
+                ),
+                etag,
+                last_modified,
+            )
+
+        limit, after_id = parse_page_params(request.GET)
+        artists_data, next_cursor = ArtistRepository.page(limit, after_id, filters, fields)
+
+        if not artists_data:
+            return JsonResponse(ServiceResult.as_failure("No artists found", status=404).to_dict())
+
+        return with_validators(
+            JsonResponse(ServiceResult.as_page(artists_data, next_cursor).to_dict(), status=200), etag, last_modified
+        )
+
+    except (InvalidPageRequest, InvalidFilter, InvalidFields) as e:
+        return JsonResponse(ServiceResult.as_failure(str(e), status=400).to_dict(), status=400)
 
     except IntegrityError as e:
         return JsonResponse(ServiceResult.as_failure("Database error: " + str(e), status=400).to_dict(), status=400)
@@ -151,17 +227,12 @@ def delete_artist(request, *args, **kwargs):
             return JsonResponse(ServiceResult.as_failure("Artist ID is required", status=400).to_dict(), status=400)
 
         with transaction.atomic():
-            with connection.cursor() as cursor:
-                cursor.execute(
-                    '''
-                    DELETE FROM Artist WHERE id = %s
-                    ''',
-                    [artist_id]
-                )
-
-                if cursor.rowcount == 0:
-                    return JsonResponse(ServiceResult.as_failure("Artist not found", status=404).to_dict(), status=404)
+            catalogue_stats.artist_removing(artist_id)
+            if ArtistRepository.delete(artist_id) == 0:
+                return JsonResponse(ServiceResult.as_failure("Artist not found", status=404).to_dict(), status=404)
 
+        artist_cache.invalidate(artist_id)
+        catalogue_index.remove_artist(artist_id)
         return JsonResponse(ServiceResult.as_success("Artist deleted successfully").to_dict(), status=200)
 
     except IntegrityError as e:
@@ -185,48 +256,27 @@ def update_artist(request, *args, **kwargs):
     try:
         data = json.loads(request.body.decode("utf-8"))
         artist_id = data.get("id")
-        gender_map = {"male": "m", "female": "f", "others": "o"}
-
         if not artist_id:
             return JsonResponse(ServiceResult.as_failure("Artist ID is required", status=400).to_dict(), status=400)
 
-        name = data.get("name")
-        dob = data.get("dob")
-        original_gender=gender = data.get("gender")
-        address = data.get("address")
-        first_release_year = data.get("first_release_year")
-        no_of_albums_released = data.get("no_of_albums_released")
-
-        required_fields = ["name", "first_release_year", "no_of_albums_released", "gender"]
-        missing_fields = [field for field in required_fields if data.get(field) in [None, ""]]
-        if missing_fields:
-            return JsonResponse(ServiceResult.as_failure(
-                f"Required fields missing", status=400
-            ).to_dict(), status=400)
-
-        gender_map = {"male": "m", "female": "f", "others": "o"}
-        gender = gender_map.get(gender.lower())
+        values, error_message = clean_artist(data)
+        if error_message:
+            return JsonResponse(ServiceResult.as_failure(error_message, status=400).to_dict(), status=400)
+        name, dob, _, address, first_release_year, no_of_albums_released = values
 
         with transaction.atomic():
-            with connection.cursor() as cursor:
-                cursor.execute(
-                    '''
-                    UPDATE Artist 
-                    SET name = %s, dob = %s, gender = %s, address = %s, 
-                        first_release_year = %s, no_of_albums_released = %s, updated_at = CURRENT_TIMESTAMP
-                    WHERE id = %s
-                    ''',
-                    [name, dob, gender, address, first_release_year, no_of_albums_released, artist_id]
-                )
-
-                if cursor.rowcount == 0:
-                    return JsonResponse(ServiceResult.as_failure("Artist not found", status=404).to_dict(), status=404)
- 
+            previous = ArtistRepository.update(artist_id, values)
+            if previous is None:
+                return JsonResponse(ServiceResult.as_failure("Artist not found", status=404).to_dict(), status=404)
+            catalogue_stats.artist_updated(artist_id, previous, first_release_year, no_of_albums_released)
+
+        artist_cache.invalidate(artist_id)
+        catalogue_index.update_artist(artist_id, name)
         artist_data = {
             "id": artist_id,
             "name": name,
             "dob": dob,
-            "gender": original_gender,
+            "gender": data.get("gender"),
             "address": address,
             "first_release_year": first_release_year,
             "no_of_albums_released": no_of_albums_released,
@@ -242,3 +292,116 @@ def update_artist(request, *args, **kwargs):
         return JsonResponse(ServiceResult.as_failure(str(e), status=500).to_dict(), status=500)
 
 
+ARTIST_EXPORT_COLUMNS = ["id", "name", "dob", "gender", "address", "first_release_year", "no_of_albums_released"]
+MUSIC_EXPORT_COLUMNS = ["music_id", "title", "album_name", "genre"]
+
+
+def artist_row_to_values(row):
+    return [*row[:3], GENDER_NAMES.get(row[3]), *row[4:]]
+
+
+@csrf_exempt
+def download_artist(request, *args, **kwargs):
+    if request.method != "GET":
+        return JsonResponse(ServiceResult.as_failure("Only GET method allowed", status=405).to_dict(), status=405)
+
+    try:
+        export_format = request.GET.get("format", "csv").lower()
+        include_music = request.GET.get("include") == "music"
+
+        if export_format not in ["csv", "xlsx"]:
+            return JsonResponse(ServiceResult.as_failure("Unsupported export format", status=400).to_dict(), status=400)
+
+        header = ARTIST_EXPORT_COLUMNS + MUSIC_EXPORT_COLUMNS if include_music else ARTIST_EXPORT_COLUMNS
+        if export_format == "csv":
+            batches = stream_batches(
+                request, ArtistRepository.export_batches, ArtistRepository.aexport_batches, include_music
+            )
+            return csv_streaming_response("artists.csv", header, batches, artist_row_to_values)
+
+        try:
+            # The workbook is written to a temporary file here in the view, so it reads the rows directly
+            return xlsx_file_response(
+                "artists.xlsx", header, ArtistRepository.export_batches(include_music), artist_row_to_values,
+                serves_async(request),
+            )
+        except ImportError:
+            return JsonResponse(ServiceResult.as_failure("XLSX export requires openpyxl", status=501).to_dict(), status=501)
+
+    except Exception as e:
+        return JsonResponse(ServiceResult.as_failure(str(e), status=500).to_dict(), status=500)
+
+
+def _insert_artist_batch(batch, errors):
+    try:
+        with transaction.atomic():
+            catalogue_stats.artists_added(ArtistRepository.insert_many([values for _, values in batch]))
+        return len(batch)
+    except (IntegrityError, DataError):
+        pass
+
+    # One bad row rolled back the whole batch; replay it row by row so only the offending rows are reported
+    inserted = 0
+    for line_number, values in batch:
+        try:
+            with transaction.atomic():
+                catalogue_stats.artists_added(ArtistRepository.insert_many([values]))
+            inserted += 1
+        except (IntegrityError, DataError) as e:
+            errors.append({"row": line_number, "error": "Database error: " + str(e)})
+    return inserted
+
+
+@csrf_exempt
+def import_artist(request, *args, **kwargs):
+    if request.method != "POST":
+        return JsonResponse(ServiceResult.as_failure("Only POST method allowed", status=405).to_dict(), status=405)
+
+    try:
+        upload = request.FILES.get("file")
+        if not upload:
+            return JsonResponse(ServiceResult.as_failure("CSV file is required", status=400).to_dict(), status=400)
+
+        reader = csv.DictReader(io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline=""))
+        missing_columns = [field for field in ARTIST_REQUIRED_FIELDS if field not in (reader.fieldnames or [])]
+        if missing_columns:
+            return JsonResponse(ServiceResult.as_failure(
+                "Missing columns: " + ", ".join(missing_columns), status=400
+            ).to_dict(), status=400)
+
+        inserted = 0
+        errors = []
+        batch = []
+        # Line 1 is the header, so data rows are reported with their line number in the file
+        for line_number, row in enumerate(reader, start=2):
+            values, error_message = clean_artist(row)
+            if error_message:
+                errors.append({"row": line_number, "error": error_message})
+                continue
+
+            batch.append((line_number, values))
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                inserted += _insert_artist_batch(batch, errors)
+                batch = []
+
+        if batch:
+            inserted += _insert_artist_batch(batch, errors)
+        if inserted:
+            catalogue_index.mark_stale()
+
+        # Rows from a failed batch are reported after the validation errors found while reading past it
+        errors.sort(key=lambda error: error["row"])
+        return JsonResponse(ServiceResult.as_success({
+            "inserted": inserted,
+            "failed": len(errors),
+            "errors": errors,
+        }).to_dict(), status=200)
+
+    except UnicodeDecodeError:
+        return JsonResponse(ServiceResult.as_failure("CSV file must be UTF-8 encoded", status=400).to_dict(), status=400)
+
+    except csv.Error as e:
+        return JsonResponse(ServiceResult.as_failure("Malformed CSV: " + str(e), status=400).to_dict(), status=400)
+
+    except Exception as e:
+        return JsonResponse(ServiceResult.as_failure(str(e), status=500).to_dict(), status=500)
@@ -0,0 +1,7 @@
+from mssql.base import DatabaseWrapper as MssqlDatabaseWrapper
+
+from utils.db_pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, MssqlDatabaseWrapper):
+    pass
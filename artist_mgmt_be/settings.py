@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -41,10 +44,14 @@ INSTALLED_APPS = [
     'registration',
     'users',
     'artist',
-    'music'
+    'music',
+    'search',
+    'stats',
 ]
 
 MIDDLEWARE = [
+    'utils.metrics.MetricsMiddleware',
+    'utils.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -53,12 +60,63 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'registration.middleware.JWTAuthenticationMiddleware',
+    'utils.rate_limit.RateLimitMiddleware',
+    'utils.profiling.ProfilingMiddleware',
 ]
 
+# Request latency and SQL timings exposed on /metrics, see utils/metrics.py
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+
+# Brotli (with the optional brotli package) or gzip for JSON bodies of at least COMPRESSION_MIN_SIZE
+# bytes and for every streamed list; levels picked from test/bench_compression.py, see utils/compression.py
+COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', '1') == '1'
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 3))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 5))
+
+# Per-request profiling for admins (X-Profile: inline|store) or 1 in PROFILING_SAMPLE_RATE requests,
+# see utils/profiling.py; removed from the middleware chain unless enabled
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '0') == '1'
+PROFILING_ENGINE = os.environ.get('PROFILING_ENGINE', 'cprofile')
+PROFILING_SAMPLE_RATE = int(os.environ.get('PROFILING_SAMPLE_RATE', 0))
+PROFILING_DIR = os.environ.get('PROFILING_DIR', str(BASE_DIR / 'profiles'))
+
+# Token buckets per client (JWT user id, else IP) for the paths below, longest prefix wins; RATE
+# requests per PER seconds with bursts up to BURST. While the DB pool is saturated other requests get
+# a 503 before any SQL runs. See utils/rate_limit.py
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') == '1'
+RATE_LIMITS = {
+    '/auth/login/': {'RATE': 10, 'PER': 60, 'BURST': 10},
+    '/artist/get/': {'RATE': 20, 'PER': 1, 'BURST': 40},
+    '/music/get': {'RATE': 20, 'PER': 1, 'BURST': 40},
+    '/users/get/': {'RATE': 20, 'PER': 1, 'BURST': 40},
+}
+# utils.rate_limit.CacheBucketStore shares buckets across workers through RATE_LIMIT_CACHE_ALIAS
+RATE_LIMIT_STORE = os.environ.get('RATE_LIMIT_STORE', 'utils.rate_limit.MemoryBucketStore')
+RATE_LIMIT_CACHE_ALIAS = 'default'
+RATE_LIMIT_SHED_ON_POOL_SATURATION = os.environ.get('RATE_LIMIT_SHED_ON_POOL_SATURATION', '1') == '1'
+RATE_LIMIT_SHED_EXEMPT_PATHS = ['/metrics']
+# Number of reverse proxies in front of the app that append to X-Forwarded-For
+RATE_LIMIT_TRUSTED_PROXIES = int(os.environ.get('RATE_LIMIT_TRUSTED_PROXIES', 0))
+
+# The in-process search index is rebuilt in the background once older than this (seconds), which is
+# how a worker picks up writes made by other processes, see search/index.py
+SEARCH_INDEX_MAX_AGE = int(os.environ.get('SEARCH_INDEX_MAX_AGE', 300))
+
+# Paths whose views require a valid Authorization: Bearer token, see registration/middleware.py
+JWT_PROTECTED_PATHS = ['/artist/', '/music/', '/users/', '/search/', '/stats/']
+# Operational endpoints: an admin token, or a request from one of ADMIN_ALLOWED_IPS (comma separated,
+# resolved through RATE_LIMIT_TRUSTED_PROXIES like the rate limiter's client address)
+JWT_ADMIN_PATHS = ['/metrics', '/cache/']
+ADMIN_ALLOWED_IPS = [ip.strip() for ip in os.environ.get('ADMIN_ALLOWED_IPS', '').split(',') if ip.strip()]
+JWT_TOKEN_CACHE_SIZE = 1024
+
 ROOT_URLCONF = 'artist_mgmt_be.urls'
 CORS_ALLOW_CREDENTIALS = True  
 CORS_ORIGIN_ALLOW_ALL =True
 CORS_ALLOWED_ORIGINS = ["http://localhost:5090"]  
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key")
 CSRF_TRUSTED_ORIGINS = ["http://localhost:5090"]  
 
 
@@ -85,9 +143,21 @@ WSGI_APPLICATION = 'artist_mgmt_be.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'mssql',
+# See utils/db_pool.py; remove from a profile to open a fresh connection per request
+DB_POOL = {
+    'SIZE': int(os.environ.get('DB_POOL_SIZE', 10)),
+    'MAX_AGE': int(os.environ.get('DB_POOL_MAX_AGE', 300)),
+    'PRE_PING': os.environ.get('DB_POOL_PRE_PING', '1') == '1',
+    'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+}
+
+# DB_PROFILE=sqlite or DB_PROFILE=postgres runs the app against a local database for development,
+# benchmarks and `manage.py test`; utils/dialects.py covers the SQL that differs. `manage.py migrate`
+# first creates any missing sql_querys tables (see utils/schema.py and `manage.py bootstrap_schema`).
+DB_PROFILE = os.environ.get('DB_PROFILE', 'mssql')
+DATABASE_PROFILES = {
+    'mssql': {
+        'ENGINE': 'artist_mgmt_be.backends.mssql',
         'NAME': 'artistDb',
         'USER': 'sa',
         'PASSWORD': 'sa123',
@@ -97,9 +167,84 @@ DATABASES = {
             'driver': 'ODBC Driver 17 for SQL Server',
             'Trusted_Connection': 'yes',
         },
-    }
+        # The server's zone, e.g. Europe/London: updated_at holds GETDATE() local times, and without it
+        # conditional GETs send no Last-Modified (see utils/conditional.py)
+        'TIME_ZONE': os.environ.get('DB_TIME_ZONE'),
+        # Connections go back to the pool at the end of each request, so Django itself keeps none open
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0)),
+        'CONN_HEALTH_CHECKS': True,
+        'POOL': DB_POOL,
+    },
+    'sqlite': {
+        'ENGINE': 'artist_mgmt_be.backends.sqlite3',
+        'NAME': os.environ.get('DB_NAME', str(BASE_DIR / 'artist_mgmt.sqlite3')),
+        'OPTIONS': {
+            # Take the write lock when a transaction starts, so concurrent writers wait for
+            # it (up to timeout seconds) instead of failing when they upgrade from a read
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+            'init_command': 'PRAGMA journal_mode=WAL',
+        },
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0)),
+        'POOL': DB_POOL,
+    },
+    'postgres': {
+        'ENGINE': 'artist_mgmt_be.backends.postgresql',
+        'NAME': os.environ.get('DB_NAME', 'artistdb'),
+        'USER': os.environ.get('DB_USER', 'postgres'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+        'HOST': os.environ.get('DB_HOST', 'localhost'),
+        'PORT': os.environ.get('DB_PORT', '5432'),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0)),
+        'CONN_HEALTH_CHECKS': True,
+        'POOL': DB_POOL,
+    },
+}
+
+DATABASES = {
+    'default': DATABASE_PROFILES[DB_PROFILE],
 }
 
+# Set by asgi.py: views are wrapped as async def and run on a bounded executor of
+# ASYNC_DB_WORKERS threads, sized to the connection pool
+ASYNC_VIEWS = os.environ.get('DJANGO_ASYNC_VIEWS') == '1'
+ASYNC_DB_WORKERS = int(os.environ.get('ASYNC_DB_WORKERS', os.environ.get('DB_POOL_SIZE', 10)))
+
+
+# Caches
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Single artist/user lookups, see utils/cache.py. Point the backend at Redis or
+    # Memcached to share entries across workers.
+    'entities': {
+        'BACKEND': os.environ.get('ENTITY_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('ENTITY_CACHE_LOCATION', 'entities'),
+        'TIMEOUT': int(os.environ.get('ENTITY_CACHE_TTL', 60)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('ENTITY_CACHE_MAX_ENTRIES', 10000)),
+        },
+    },
+    # Idempotency-Key responses for the add endpoints, see utils/idempotency.py. Retries can
+    # land on any worker, so production should point this at a shared backend as well.
+    'idempotency': {
+        'BACKEND': os.environ.get('IDEMPOTENCY_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('IDEMPOTENCY_CACHE_LOCATION', 'idempotency'),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('IDEMPOTENCY_CACHE_MAX_ENTRIES', 50000)),
+        },
+    },
+}
+
+ENTITY_CACHE_ALIAS = 'entities'
+IDEMPOTENCY_CACHE_ALIAS = 'idempotency'
+# How long a stored response is replayed, and how long an unfinished request holds its key
+IDEMPOTENCY_KEY_TTL = int(os.environ.get('IDEMPOTENCY_KEY_TTL', 86400))
+IDEMPOTENCY_LOCK_TIMEOUT = int(os.environ.get('IDEMPOTENCY_LOCK_TIMEOUT', 60))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -119,6 +264,29 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing, see utils/passwords.py. The first entry hashes new passwords;
+# the others still verify older hashes, which are upgraded on the next login.
+# test/bench_login.py measures login throughput per core for a given work factor.
+
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'pbkdf2')
+
+_PASSWORD_HASHERS = {
+    'pbkdf2': 'utils.passwords.TunablePBKDF2PasswordHasher',
+    'argon2': 'utils.passwords.TunableArgon2PasswordHasher',
+    'scrypt': 'utils.passwords.TunableScryptPasswordHasher',
+}
+
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER]] + [
+    hasher for name, hasher in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHER
+]
+
+PASSWORD_WORK_FACTOR = {
+    'pbkdf2_iterations': int(os.environ.get('PBKDF2_ITERATIONS', 600000)),
+    'argon2_time_cost': int(os.environ.get('ARGON2_TIME_COST', 2)),
+    'argon2_memory_cost': int(os.environ.get('ARGON2_MEMORY_COST', 102400)),
+    'scrypt_work_factor': int(os.environ.get('SCRYPT_WORK_FACTOR', 2 ** 14)),
+}
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
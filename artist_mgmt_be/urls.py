@@ -1,8 +1,14 @@
 from django.urls import path,include
 
+from artist_mgmt_be import views
+
 urlpatterns = [
     path('users/',include('users.urls')),
     path('artist/',include('artist.urls')),
     path('music/',include('music.urls')),
     path('auth/',include('registration.urls')),
+    path('search/',include('search.urls')),
+    path('stats/',include('stats.urls')),
+    path('cache/stats/',views.cache_stats),
+    path('metrics',views.metrics),
 ]
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+
+from utils.cache import cache_stats as entity_cache_stats
+from utils.metrics import registry
+from utils.serialization import JsonResponse
+from utils.service_result import ServiceResult
+
+
+@csrf_exempt
+def cache_stats(request, *args, **kwargs):
+    if request.method != "GET":
+        return JsonResponse(ServiceResult.as_failure("Only GET method allowed", status=405).to_dict(), status=405)
+
+    return JsonResponse(ServiceResult.as_success(entity_cache_stats()).to_dict(), status=200)
+
+
+@csrf_exempt
+def metrics(request, *args, **kwargs):
+    if request.method != "GET":
+        return JsonResponse(ServiceResult.as_failure("Only GET method allowed", status=405).to_dict(), status=405)
+
+    if not getattr(settings, "METRICS_ENABLED", True):
+        return JsonResponse(ServiceResult.as_failure("Metrics are disabled", status=404).to_dict(), status=404)
+
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,45 @@
+from django.db import migrations
+
+from utils.migrations import vendor_sql
+
+
+class Migration(migrations.Migration):
+
+    dependencies = []
+
+    operations = [
+        # get_music?id= filters and joins on artist_id and reads only these columns, so the
+        # lookup never touches the base table; updated_at also serves the ETag validator
+        vendor_sql(
+            {
+                "microsoft": [
+                    "CREATE NONCLUSTERED INDEX IX_Music_artist_id ON Music (artist_id) "
+                    "INCLUDE (title, album_name, genre, updated_at)",
+                ],
+                "postgresql": [
+                    "CREATE INDEX IX_Music_artist_id ON Music (artist_id) INCLUDE (title, album_name, genre, updated_at)",
+                ],
+                "sqlite": [
+                    "CREATE INDEX IX_Music_artist_id ON Music (artist_id, title, album_name, genre, updated_at)",
+                ],
+            },
+            {
+                "microsoft": ["DROP INDEX IX_Music_artist_id ON Music"],
+                "postgresql": ["DROP INDEX IX_Music_artist_id"],
+                "sqlite": ["DROP INDEX IX_Music_artist_id"],
+            },
+        ),
+        # COUNT(*), MAX(updated_at) runs on every music list request to build the ETag
+        vendor_sql(
+            {
+                "microsoft": ["CREATE NONCLUSTERED INDEX IX_Music_updated_at ON Music (updated_at)"],
+                "postgresql": ["CREATE INDEX IX_Music_updated_at ON Music (updated_at)"],
+                "sqlite": ["CREATE INDEX IX_Music_updated_at ON Music (updated_at)"],
+            },
+            {
+                "microsoft": ["DROP INDEX IX_Music_updated_at ON Music"],
+                "postgresql": ["DROP INDEX IX_Music_updated_at"],
+                "sqlite": ["DROP INDEX IX_Music_updated_at"],
+            },
+        ),
+    ]
@@ -1,3 +1,88 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+
+from music import views
+from utils.repositories import MAX_STATEMENT_PARAMETERS, MusicRepository
+from utils.testing import ApiTestCase
+
+
+class BatchChunkTests(SimpleTestCase):
+    def test_chunks_fit_the_parameter_cap(self):
+        width = MusicRepository.BATCH_ROW.count("%s")
+        self.assertLessEqual(views.BATCH_INSERT_CHUNK * width, MAX_STATEMENT_PARAMETERS)
+        self.assertLessEqual(views.BATCH_UPDATE_CHUNK * width, MAX_STATEMENT_PARAMETERS)
+        self.assertLessEqual(views.BATCH_DELETE_CHUNK, MAX_STATEMENT_PARAMETERS)
+
+
+class BatchMusicTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.artist_id = self.add_artist()
+
+    def test_update_larger_than_one_chunk(self):
+        count = views.BATCH_UPDATE_CHUNK + 50
+        music_ids = [self.add_track(self.artist_id, title=f"t{index}") for index in range(count)]
+        tracks = [
+            {"id": music_id, "title": f"u{index}", "album_name": "b", "genre": "jazz"}
+            for index, music_id in enumerate(music_ids)
+        ]
+
+        with mock.patch.object(MusicRepository, "update_batch", wraps=MusicRepository.update_batch) as update_batch:
+            response, body = self.send("put", "/music/batch/", tracks)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result.get("id") for result in body["data"]], music_ids)
+        self.assertEqual([len(call.args[0]) for call in update_batch.call_args_list], [views.BATCH_UPDATE_CHUNK, 50])
+        self.assertEqual(MusicRepository.get(music_ids[-1])["title"], f"u{count - 1}")
+
+    def test_insert_larger_than_one_chunk(self):
+        count = views.BATCH_INSERT_CHUNK + 1
+        tracks = [{"artist_id": self.artist_id, "title": f"t{index}", "album_name": "a", "genre": "rock"} for index in range(count)]
+        response, body = self.send("post", "/music/batch/", tracks)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(all("id" in result for result in body["data"]))
+        self.assertEqual(MusicRepository.get(body["data"][-1]["id"])["title"], f"t{count - 1}")
+
+    def test_malformed_ids_are_per_item_errors(self):
+        music_id = self.add_track(self.artist_id)
+        tracks = [
+            {"id": [music_id], "title": "t", "album_name": "a", "genre": "rock"},
+            {"id": {"id": music_id}, "title": "t", "album_name": "a", "genre": "rock"},
+            {"id": True, "title": "t", "album_name": "a", "genre": "rock"},
+            {"id": music_id, "title": ["t"], "album_name": "a", "genre": "rock"},
+            {"id": music_id, "title": "ok", "album_name": "a", "genre": "rock"},
+        ]
+        response, body = self.send("put", "/music/batch/", tracks)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result.get("error") for result in body["data"]], [
+            "id must be an integer", "id must be an integer", "id must be an integer",
+            "title and album_name must be strings", None,
+        ])
+
+        response, body = self.send("post", "/music/batch/", [{"artist_id": "1", "title": "t", "album_name": "a", "genre": "rock"}])
+        self.assertEqual(body["data"], [{"index": 0, "error": "artist_id must be an integer"}])
+
+
+class GetMusicTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.artist_id = self.add_artist("singer")
+        self.music_id = self.add_track(self.artist_id, title="song")
+
+    def test_artist_tracks_apply_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            _, body = self.send("get", f"/music/get?id={self.artist_id}&fields=title,artist_name")
+        self.assertEqual(body["data"], [{"title": "song", "artist_name": "singer"}])
+        self.assertIn("SELECT Music.title, Artist.name FROM Music", queries[-1]["sql"])
+
+        _, body = self.send("get", f"/music/get?id={self.artist_id}")
+        self.assertEqual(set(body["data"][0]), set(MusicRepository.artist_keys))
+
+    def test_unknown_field_is_a_400(self):
+        _, body = self.send("get", f"/music/get?id={self.artist_id}&fields=artist_id")
+        self.assertEqual(body["status"], 400)
+        _, body = self.send("get", "/music/get?fields=artist_name")
+        self.assertEqual(body["status"], 400)
@@ -1,11 +1,14 @@
 from django import urls
 from music import views
+from utils.async_db import for_server
 
 
 urlpatterns = [
-    urls.path('add/',views.add_music),
-    urls.path('get',views.get_music),
-    urls.path('get/<int:id>/',views.get_music),
-    urls.path('delete',views.delete_music),
-    urls.path('update/',views.update_music)
+    urls.path('add/',for_server(views.add_music)),
+    urls.path('get',for_server(views.get_music)),
+    urls.path('get/<int:id>/',for_server(views.get_music)),
+    urls.path('delete',for_server(views.delete_music)),
+    urls.path('update/',for_server(views.update_music)),
+    urls.path('batch/',for_server(views.batch_music)),
+    urls.path('batch',for_server(views.batch_music)),
 ]
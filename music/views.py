@@ -1,14 +1,23 @@
-from django.db import connection, transaction
-from django.http import JsonResponse  
-from django.db.utils import IntegrityError
+from django.db import transaction
+from utils.serialization import JsonResponse
+from django.db.utils import DataError, IntegrityError
 import json
 from django.views.decorators.csrf import csrf_exempt
 
 from utils.service_result import ServiceResult
-
+from utils.idempotency import idempotent
+from utils.pagination import InvalidPageRequest, parse_page_params
+from utils.streaming import stream_batches, stream_format, stream_rows_response
+from utils.conditional import not_modified, validators_for, with_validators
+from utils.filters import InvalidFilter, parse_filters
+from utils.fields import InvalidFields, parse_fields
+from utils.repositories import MUSIC_GENRES, MusicRepository, rows_per_statement
+from search.index import catalogue_index
+from stats.summary import catalogue_stats
 
 
 @csrf_exempt
+@idempotent
 def add_music(request, *args, **kwargs):
     if request.method != "POST":
         result = ServiceResult.as_failure(error_message="Only POST method allowed", status=405)
@@ -28,19 +37,11 @@ def add_music(request, *args, **kwargs):
             return JsonResponse(ServiceResult.as_failure(error_message="Required fields missing", status=400).to_dict())
 
         with transaction.atomic():
-            with connection.cursor() as cursor:
-                cursor.execute(
-                    '''
-                    INSERT INTO Music (artist_id, title, album_name, genre)
-                    OUTPUT INSERTED.id
-                    VALUES (%s, %s, %s, %s)
-                    ''',
-                    [artist_id, title, album_name, genre]
-                )
-                row = cursor.fetchone()
-                if not row:
-                    raise Exception("Failed to insert record") 
-                music_id = row[0]
+            music_id = MusicRepository.insert([artist_id, title, album_name, genre])
+            if music_id is None:
+                raise Exception("Failed to insert record")
+            catalogue_stats.tracks_added([(artist_id, genre)])
+        catalogue_index.add_music(music_id, title, album_name, genre, artist_id)
 
         music_data = {
             "id": music_id,
@@ -70,57 +71,47 @@ def get_music(request, *args, **kwargs):
         return JsonResponse(ServiceResult.as_failure(error_message="Only GET method allowed", status=405).to_dict())
     try:
         artist_id = request.GET.get("id") 
-        print(artist_id)
-        with connection.cursor() as cursor:
-            if artist_id:
-                cursor.execute(
-                    '''
-                    SELECT Music.id, Music.title, Music.album_name, Music.genre, Artist.name
-                    FROM Music
-                    INNER JOIN Artist ON Music.artist_id = Artist.id
-                    WHERE Music.artist_id = %s
-                    ''', 
-                    [artist_id]
-                )
-                musics = cursor.fetchall()
-                if not musics:
-                    return JsonResponse(ServiceResult.as_failure("No music found for the given artist", status=404).to_dict())
-
-                music_data = [
-                    {
-                        "id": music[0],
-                        "title": music[1],
-                        "album_name": music[2],
-                        "genre": music[3],
-                        "artist_name": music[4]
-                    }
-                    for music in musics
-                ]
-
-                return JsonResponse(ServiceResult.as_success(music_data).to_dict())
-
-            cursor.execute(
-                '''
-                SELECT id, title, album_name, genre
-                FROM Music ORDER BY ID DESC
-                '''
+
+        validator = MusicRepository.artist_validator(artist_id) if artist_id else MusicRepository.validator()
+        etag, last_modified = validators_for(request, "music", validator)
+        cached_response = not_modified(request, etag, last_modified)
+        if cached_response:
+            return cached_response
+
+        filters = parse_filters(request.GET, MusicRepository.filters)
+        fmt = stream_format(request)
+        # The per-artist listing also carries artist_name
+        fields = parse_fields(request.GET, MusicRepository.artist_keys if artist_id else MusicRepository.keys)
+        if fmt and not artist_id:
+            return with_validators(
+                stream_rows_response(
+                    fmt,
+                    stream_batches(
+                        request, MusicRepository.iter_batches, MusicRepository.aiter_batches, filters, fields=fields
+                    ),
+                    MusicRepository.projection(fields).map_row,
+                ),
+                etag,
+                last_modified,
             )
-            musics = cursor.fetchall()
-
-            if not musics:
-                return JsonResponse(ServiceResult.as_failure("No music found", status=404).to_dict())
-
-            musics_data = [
-                {
-                    "id": music[0],
-                    "title": music[1],
-                    "album_name": music[2],
-                    "genre": music[3],
-                }
-                for music in musics
-            ]
 
-            return JsonResponse(ServiceResult.as_success(musics_data).to_dict())
+        if artist_id:
+            music_data = MusicRepository.for_artist(artist_id, filters, fields)
+            if not music_data:
+                return JsonResponse(ServiceResult.as_failure("No music found for the given artist", status=404).to_dict())
+
+            return with_validators(JsonResponse(ServiceResult.as_success(music_data).to_dict()), etag, last_modified)
+
+        limit, after_id = parse_page_params(request.GET)
+        musics_data, next_cursor = MusicRepository.page(limit, after_id, filters, fields)
+
+        if not musics_data:
+            return JsonResponse(ServiceResult.as_failure("No music found", status=404).to_dict())
+
+        return with_validators(JsonResponse(ServiceResult.as_page(musics_data, next_cursor).to_dict()), etag, last_modified)
+
+    except (InvalidPageRequest, InvalidFilter, InvalidFields) as e:
+        return JsonResponse(ServiceResult.as_failure(error_message=str(e), status=400).to_dict())
 
     except IntegrityError as e:
         return JsonResponse(ServiceResult.as_failure(error_message="Database error: " + str(e), status=400).to_dict())
@@ -138,17 +129,13 @@ def delete_music(request, *args, **kwargs):
         if not music_id:
             return JsonResponse(ServiceResult.as_failure("Music ID is required", status=400).to_dict(), status=400)
 
-        with connection.cursor() as cursor:
-            cursor.execute(
-                '''
-                DELETE FROM Music WHERE id = %s
-                ''',
-                [music_id]
-            )
-
-            if cursor.rowcount == 0:
+        with transaction.atomic():
+            deleted = MusicRepository.delete_batch([music_id])
+            if not deleted:
                 return JsonResponse(ServiceResult.as_failure("Music not found", status=404).to_dict(), status=404)
+            catalogue_stats.tracks_removed(deleted.values())
 
+        catalogue_index.remove_music(music_id)
         return JsonResponse(ServiceResult.as_success("Music deleted successfully").to_dict(), status=200)
 
     except IntegrityError as e:
@@ -176,26 +163,21 @@ def update_music(request, *args, **kwargs):
         if missing_fields:
             return JsonResponse(ServiceResult.as_failure(error_message="Required fields missing", status=400).to_dict())
 
-        with connection.cursor() as cursor:
-            cursor.execute(
-                '''
-                UPDATE Music 
-                SET  title = %s, album_name = %s, genre = %s, updated_at = CURRENT_TIMESTAMP
-                WHERE id = %s
-                ''',
-                [ title, album_name, genre, music_id]
-            )
-
-            if cursor.rowcount == 0:
+        with transaction.atomic():
+            previous = MusicRepository.update(music_id, [title, album_name, genre])
+            if previous is None:
                 return JsonResponse(ServiceResult.as_failure("Music ID not found", status=404).to_dict(), status=404)
-            
-            music_data = {
+            track_artist_id, previous_genre = previous
+            catalogue_stats.tracks_updated([(track_artist_id, previous_genre)], [(track_artist_id, genre)])
+
+        catalogue_index.update_music(music_id, title, album_name, genre)
+        music_data = {
             "id": music_id,
             "title": title,
             "album_name": album_name,
             "genre": genre    
         }
-            
+
         return JsonResponse(ServiceResult.as_success(music_data).to_dict())
 
     except IntegrityError as e:
@@ -204,3 +186,151 @@ def update_music(request, *args, **kwargs):
 
     except Exception as e:
         return JsonResponse(ServiceResult.as_failure(str(e), status=500).to_dict(), status=500)
+
+
+MAX_BATCH_ITEMS = 5000
+# Insert and update bind a BATCH_ROW per track, delete one parameter per id
+BATCH_INSERT_CHUNK = rows_per_statement(MusicRepository.BATCH_ROW)
+BATCH_UPDATE_CHUNK = rows_per_statement(MusicRepository.BATCH_ROW)
+BATCH_DELETE_CHUNK = rows_per_statement("%s")
+
+
+def _clean_track(track, required_fields):
+    if not isinstance(track, dict):
+        return "Each track must be an object"
+    if [field for field in required_fields if track.get(field) in [None, ""]]:
+        return "Required fields missing"
+    # Anything else would reach the driver, or the duplicate-id set, and fail the whole request
+    for field in ["id", "artist_id"]:
+        if field in required_fields and (not isinstance(track[field], int) or isinstance(track[field], bool)):
+            return f"{field} must be an integer"
+    if not isinstance(track["title"], str) or not isinstance(track["album_name"], str):
+        return "title and album_name must be strings"
+    if track.get("genre") not in MUSIC_GENRES:
+        return "Invalid genre"
+    return None
+
+
+def _insert_tracks(chunk):
+    with transaction.atomic():
+        inserted = MusicRepository.insert_batch([
+            (index, track["artist_id"], track["title"], track["album_name"], track["genre"])
+            for index, track in chunk
+        ])
+        catalogue_stats.tracks_added([(track["artist_id"], track["genre"]) for index, track in chunk if index in inserted])
+        return inserted
+
+
+def _update_tracks(chunk):
+    with transaction.atomic():
+        updated = MusicRepository.update_batch([
+            (index, track["id"], track["title"], track["album_name"], track["genre"])
+            for index, track in chunk
+        ])
+        tracks = dict(chunk)
+        catalogue_stats.tracks_updated(
+            [(artist_id, genre) for _, artist_id, genre in updated.values()],
+            [(artist_id, tracks[index]["genre"]) for index, (_, artist_id, _) in updated.items()],
+        )
+        return {index: music_id for index, (music_id, _, _) in updated.items()}
+
+
+def _delete_tracks(chunk):
+    with transaction.atomic():
+        deleted = MusicRepository.delete_batch([music_id for music_id, _ in chunk])
+        catalogue_stats.tracks_removed(deleted.values())
+        return {music_id: music_id for music_id in deleted}
+
+
+def _run_batch(items, chunk_size, apply):
+    applied = {}
+    errors = {}
+    for start in range(0, len(items), chunk_size):
+        chunk = items[start:start + chunk_size]
+        try:
+            applied.update(apply(chunk))
+        except (IntegrityError, DataError):
+            # The failing statement rolled back its whole chunk; replay it item by item to pin down the bad ones
+            for item in chunk:
+                try:
+                    applied.update(apply([item]))
+                except (IntegrityError, DataError) as e:
+                    errors[item[0]] = "Database error: " + str(e)
+    return applied, errors
+
+
+def _batch_upsert_results(tracks, required_fields, chunk_size, apply, missing_message):
+    results = [None] * len(tracks)
+    valid = []
+    seen_ids = set()
+    for index, track in enumerate(tracks):
+        error_message = _clean_track(track, required_fields)
+        if not error_message and "id" in required_fields:
+            if track["id"] in seen_ids:
+                error_message = "Duplicate music ID in batch"
+            seen_ids.add(track["id"])
+
+        if error_message:
+            results[index] = {"index": index, "error": error_message}
+        else:
+            valid.append((index, track))
+
+    applied, errors = _run_batch(valid, chunk_size, apply)
+    for index, _ in valid:
+        if index in applied:
+            results[index] = {"index": index, "id": applied[index]}
+        else:
+            results[index] = {"index": index, "error": errors.get(index, missing_message)}
+    return results
+
+
+@csrf_exempt
+def batch_music(request, *args, **kwargs):
+    if request.method not in ["POST", "PUT", "DELETE"]:
+        return JsonResponse(ServiceResult.as_failure("Only POST, PUT and DELETE methods allowed", status=405).to_dict(), status=405)
+
+    try:
+        if request.method == "DELETE":
+            try:
+                music_ids = list(dict.fromkeys(int(music_id) for music_id in request.GET.get("ids", "").split(",") if music_id.strip()))
+            except ValueError:
+                return JsonResponse(ServiceResult.as_failure("ids must be a comma separated list of integers", status=400).to_dict(), status=400)
+
+            if not music_ids or len(music_ids) > MAX_BATCH_ITEMS:
+                return JsonResponse(ServiceResult.as_failure(f"Between 1 and {MAX_BATCH_ITEMS} music IDs are required", status=400).to_dict(), status=400)
+
+            deleted, errors = _run_batch([(music_id, music_id) for music_id in music_ids], BATCH_DELETE_CHUNK, _delete_tracks)
+            for music_id in deleted:
+                catalogue_index.remove_music(music_id)
+            results = [
+                {"id": music_id, "deleted": True} if music_id in deleted
+                else {"id": music_id, "error": errors.get(music_id, "Music not found")}
+                for music_id in music_ids
+            ]
+            return JsonResponse(ServiceResult.as_success(results).to_dict(), status=200)
+
+        tracks = json.loads(request.body.decode("utf-8"))
+        if not isinstance(tracks, list) or not tracks or len(tracks) > MAX_BATCH_ITEMS:
+            return JsonResponse(ServiceResult.as_failure(f"A list of 1 to {MAX_BATCH_ITEMS} tracks is required", status=400).to_dict(), status=400)
+
+        if request.method == "POST":
+            results = _batch_upsert_results(
+                tracks, ["artist_id", "title", "album_name", "genre"], BATCH_INSERT_CHUNK, _insert_tracks, "Failed to insert record"
+            )
+            for result in results:
+                if "id" in result:
+                    track = tracks[result["index"]]
+                    catalogue_index.add_music(result["id"], track["title"], track["album_name"], track["genre"], track["artist_id"])
+        else:
+            results = _batch_upsert_results(
+                tracks, ["id", "title", "album_name", "genre"], BATCH_UPDATE_CHUNK, _update_tracks, "Music ID not found"
+            )
+            for result in results:
+                if "id" in result:
+                    track = tracks[result["index"]]
+                    catalogue_index.update_music(result["id"], track["title"], track["album_name"], track["genre"])
+
+        return JsonResponse(ServiceResult.as_success(results).to_dict(), status=200)
+
+    except Exception as e:
+        return JsonResponse(ServiceResult.as_failure(str(e), status=500).to_dict(), status=500)
@@ -0,0 +1,69 @@
+import jwt
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from registration.tokens import decode_token
+from utils.rate_limit import client_ip
+from utils.serialization import JsonResponse
+from utils.service_result import ServiceResult
+
+
+def _failure(error_message, status=401):
+    return JsonResponse(ServiceResult.as_failure(error_message, status=status).to_dict(), status=status)
+
+
+class JWTAuthenticationMiddleware:
+    """Validates the Authorization: Bearer token for the apps in JWT_PROTECTED_PATHS.
+
+    JWT_ADMIN_PATHS (the operational endpoints) also need the is_admin claim, unless
+    the client address is in ADMIN_ALLOWED_IPS, e.g. a metrics scraper that cannot
+    send a token. The decoded claims are attached as request.jwt_claims (None on
+    unprotected paths and allowlisted requests).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.protected_paths = tuple(getattr(settings, "JWT_PROTECTED_PATHS", []))
+        self.admin_paths = tuple(getattr(settings, "JWT_ADMIN_PATHS", []))
+        self.admin_allowed_ips = frozenset(getattr(settings, "ADMIN_ALLOWED_IPS", []))
+        self.trusted_proxies = getattr(settings, "RATE_LIMIT_TRUSTED_PROXIES", 0)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self._authenticate(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        return self._authenticate(request) or await self.get_response(request)
+
+    def _authenticate(self, request):
+        request.jwt_claims = None
+        if request.method == "OPTIONS":
+            return None
+        admin_only = request.path.startswith(self.admin_paths)
+        if admin_only and client_ip(request, self.trusted_proxies) in self.admin_allowed_ips:
+            return None
+        if not admin_only and not request.path.startswith(self.protected_paths):
+            return None
+
+        scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+        token = token.strip()
+        if scheme.lower() != "bearer" or not token:
+            return _failure("Authorization token is required")
+
+        try:
+            request.jwt_claims = decode_token(token)
+        except jwt.ExpiredSignatureError:
+            return _failure("Token has expired")
+        except jwt.InvalidTokenError as e:
+            return _failure(f"Invalid token: {str(e)}")
+
+        if admin_only and not request.jwt_claims.get("is_admin"):
+            return _failure("Admin access required", status=403)
+        return None
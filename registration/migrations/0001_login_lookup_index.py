@@ -0,0 +1,33 @@
+from django.db import migrations
+
+from utils.migrations import vendor_sql
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    operations = [
+        # login looks the user up by username and reads only these columns; the unique
+        # constraint's index on username alone still needs a lookup into the table for them
+        vendor_sql(
+            {
+                "microsoft": [
+                    "CREATE NONCLUSTERED INDEX IX_auth_user_login ON auth_user (username) INCLUDE (is_staff, password)",
+                ],
+                "postgresql": [
+                    "CREATE INDEX IX_auth_user_login ON auth_user (username) INCLUDE (is_staff, password)",
+                ],
+                "sqlite": [
+                    "CREATE INDEX IX_auth_user_login ON auth_user (username, is_staff, password)",
+                ],
+            },
+            {
+                "microsoft": ["DROP INDEX IX_auth_user_login ON auth_user"],
+                "postgresql": ["DROP INDEX IX_auth_user_login"],
+                "sqlite": ["DROP INDEX IX_auth_user_login"],
+            },
+        ),
+    ]
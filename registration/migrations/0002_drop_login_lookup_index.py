@@ -0,0 +1,34 @@
+from django.db import migrations
+
+from utils.migrations import vendor_sql
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("registration", "0001_login_lookup_index"),
+    ]
+
+    operations = [
+        # login reads one row per request by the unique username index, and the extra lookup for its
+        # columns is not worth copying every password hash into a second index. It no longer covered
+        # the query either, since login reads is_superuser rather than is_staff
+        vendor_sql(
+            {
+                "microsoft": ["DROP INDEX IX_auth_user_login ON auth_user"],
+                "postgresql": ["DROP INDEX IX_auth_user_login"],
+                "sqlite": ["DROP INDEX IX_auth_user_login"],
+            },
+            {
+                "microsoft": [
+                    "CREATE NONCLUSTERED INDEX IX_auth_user_login ON auth_user (username) INCLUDE (is_staff, password)",
+                ],
+                "postgresql": [
+                    "CREATE INDEX IX_auth_user_login ON auth_user (username) INCLUDE (is_staff, password)",
+                ],
+                "sqlite": [
+                    "CREATE INDEX IX_auth_user_login ON auth_user (username, is_staff, password)",
+                ],
+            },
+        ),
+    ]
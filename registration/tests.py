@@ -1,3 +1,71 @@
-from django.test import TestCase
+import hashlib
 
-# Create your tests here.
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test import override_settings
+
+from registration.views import generate_jwt_token
+from utils.testing import ApiTestCase
+
+
+class AdminPathTests(ApiTestCase):
+    def bearer(self, is_admin):
+        return {"HTTP_AUTHORIZATION": "Bearer " + generate_jwt_token(2, "someone", is_admin)}
+
+    def test_operational_endpoints_need_an_admin_token(self):
+        for path in ["/metrics", "/cache/stats/"]:
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(path).status_code, 200)
+                self.assertEqual(self.client_class().get(path).status_code, 401)
+                self.assertEqual(self.client_class().get(path, **self.bearer(False)).status_code, 403)
+                self.assertEqual(self.client_class().get(path, **self.bearer(True)).status_code, 200)
+
+    def test_registered_users_are_not_admins(self):
+        bearer = {"HTTP_AUTHORIZATION": self.register()}
+        self.assertEqual(self.client_class().get("/metrics", **bearer).status_code, 403)
+        self.assertEqual(self.client_class().get("/cache/stats/", **bearer).status_code, 403)
+
+    @override_settings(ADMIN_ALLOWED_IPS=["10.0.0.5"], RATE_LIMIT_TRUSTED_PROXIES=1)
+    def test_allowlisted_addresses_need_no_token(self):
+        self.assertEqual(self.client_class().get("/metrics", HTTP_X_FORWARDED_FOR="10.0.0.5").status_code, 200)
+        self.assertEqual(self.client_class().get("/metrics", HTTP_X_FORWARDED_FOR="10.0.0.6").status_code, 401)
+        # Only the address the trusted proxy saw counts, not one the client prepended
+        self.assertEqual(
+            self.client_class().get("/metrics", HTTP_X_FORWARDED_FOR="10.0.0.5, 10.0.0.6").status_code, 401
+        )
+
+
+@override_settings(PASSWORD_WORK_FACTOR={"pbkdf2_iterations": 1000})
+class PasswordUpgradeTests(ApiTestCase):
+    def stored_hash(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT password FROM auth_user WHERE username = %s", ["legacy"])
+            return cursor.fetchone()[0]
+
+    def set_hash(self, encoded):
+        with connection.cursor() as cursor:
+            cursor.execute("UPDATE auth_user SET password = %s WHERE username = %s", [encoded, "legacy"])
+
+    def login(self, password):
+        _, body = self.send("post", "/auth/login/", {"username": "legacy", "password": password})
+        return body["status"]
+
+    def test_legacy_sha1_hash_is_rewritten_on_login(self):
+        self.register("legacy", "secret")
+        self.set_hash(hashlib.sha1(b"secret").hexdigest())
+
+        self.assertEqual(self.login("wrong"), 401)
+        self.assertEqual(self.stored_hash(), hashlib.sha1(b"secret").hexdigest())
+
+        self.assertEqual(self.login("secret"), 200)
+        self.assertTrue(self.stored_hash().startswith("pbkdf2_sha256$1000$"))
+        self.assertEqual(self.login("secret"), 200)
+
+    def test_outdated_work_factor_is_raised_on_login(self):
+        self.register("legacy", "secret")
+        with override_settings(PASSWORD_WORK_FACTOR={"pbkdf2_iterations": 500}):
+            self.set_hash(make_password("secret"))
+        self.assertTrue(self.stored_hash().startswith("pbkdf2_sha256$500$"))
+
+        self.assertEqual(self.login("secret"), 200)
+        self.assertTrue(self.stored_hash().startswith("pbkdf2_sha256$1000$"))
@@ -0,0 +1,54 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+from django.conf import settings
+
+
+class VerifiedTokenCache:
+    """Bounded LRU of already-verified JWT claims, keyed by token digest.
+
+    Entries are only trusted until the token's own exp, so a cached token expires
+    exactly when a freshly decoded one would.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, digest):
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            claims, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[digest]
+                return None
+            self._entries.move_to_end(digest)
+            return claims
+
+    def put(self, digest, claims):
+        expires_at = claims.get("exp")
+        if not isinstance(expires_at, (int, float)):
+            return
+        with self._lock:
+            self._entries[digest] = (claims, expires_at)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+verified_tokens = VerifiedTokenCache(getattr(settings, "JWT_TOKEN_CACHE_SIZE", 1024))
+
+
+def decode_token(token):
+    digest = hashlib.sha256(token.encode("utf-8")).digest()
+    claims = verified_tokens.get(digest)
+    if claims is None:
+        claims = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+        verified_tokens.put(digest, claims)
+    return dict(claims)
@@ -1,8 +1,9 @@
 from django import urls
 from registration import views
+from utils.async_db import for_server
 
 urlpatterns = [
-    urls.path('register/',views.register), 
-    urls.path('login/',views.login),
-    urls.path('validate/',views.validate_token),
+    urls.path('register/',for_server(views.register)), 
+    urls.path('login/',for_server(views.login)),
+    urls.path('validate/',for_server(views.validate_token)),
 ]
\ No newline at end of file
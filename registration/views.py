@@ -1,20 +1,16 @@
 import datetime
-import hashlib
 import json
 import jwt
 from django.db import connection, IntegrityError
 from django.views.decorators.csrf import csrf_exempt
-from django.http import JsonResponse
+from utils.serialization import JsonResponse
 from utils.service_result import ServiceResult
+from registration.tokens import decode_token
+from utils.passwords import hash_password, verify_password
 from django.conf import settings
 
 
 
-def hash_password(password):
-    sha1 = hashlib.sha1()
-    sha1.update(password.encode('utf-8'))
-    return sha1.hexdigest()
-
 def generate_jwt_token(user_id, username, is_admin):
     payload = {
         'user_id': user_id,
@@ -57,8 +53,8 @@ def register(request):
                     data['fname'],
                     data['lname'],
                     data['email'],
-                    True,  
-                    True   
+                    False,
+                    True
                 ]
             )
 
@@ -102,21 +98,35 @@ def login(request):
         with connection.cursor() as cursor:    
             cursor.execute(
                 '''
-                SELECT id, username, is_staff FROM auth_user 
-                WHERE username = %s AND password = %s
+                SELECT id, username, is_superuser, password FROM auth_user 
+                WHERE username = %s
                 ''',   
                 [
-                    data['username'],
-                    hash_password(data['password'])
+                    data['username']
                 ]
             )
             user = cursor.fetchone()
             if not user:
+                # Hash anyway so unknown usernames take as long as wrong passwords
+                hash_password(data['password'])
                 result = ServiceResult.as_failure("Invalid username or password", status=401)
                 return JsonResponse(result.to_dict())
 
-           
-            token = generate_jwt_token(user[0], user[1], user[2]) 
+            is_valid, needs_rehash = verify_password(data['password'], user[3])
+            if not is_valid:
+                result = ServiceResult.as_failure("Invalid username or password", status=401)
+                return JsonResponse(result.to_dict())
+
+            if needs_rehash:
+                cursor.execute(
+                    '''
+                    UPDATE auth_user SET password = %s WHERE id = %s
+                    ''',
+                    [hash_password(data['password']), user[0]]
+                )
+
+            # is_admin comes from is_superuser: rows registered before is_staff defaulted to False still carry it
+            token = generate_jwt_token(user[0], user[1], user[2])
            
             response = JsonResponse(
                 ServiceResult.as_success({ 
@@ -159,11 +169,7 @@ def validate_token(request):
             )
 
         try:
-            decoded_token = jwt.decode(
-                token, 
-                settings.SECRET_KEY, 
-                algorithms=["HS256"]
-            )
+            decoded_token = decode_token(token)
             return JsonResponse(
                 ServiceResult.as_success({
                     "user_id": decoded_token.get("user_id"),
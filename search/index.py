@@ -0,0 +1,353 @@
+import bisect
+import heapq
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connections
+
+from utils.repositories import ArtistRepository, MusicRepository
+
+_WORD = re.compile(r"\w+")
+
+ARTIST = "artist"
+MUSIC = "music"
+# Album names count for less than the artist name or track title they belong to
+FIELD_WEIGHTS = {"name": 1.0, "title": 1.0, "album_name": 0.6}
+MIN_SCORE = 0.4
+# A query word is matched against the indexed vocabulary first, then only the closest words' postings are read
+MIN_WORD_SIMILARITY = 0.3
+MAX_WORD_CANDIDATES = 50
+PREFIX_SIMILARITY = 0.8
+
+
+def tokenize(text):
+    return _WORD.findall((text or "").casefold())
+
+
+def trigrams(word):
+    # Padded like pg_trgm so short words and word starts still produce trigrams
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _entry(key, weight):
+    # Postings lists sort best first: higher weight, then artists before tracks, then newest first
+    kind, key_id = key
+    return -weight, kind != ARTIST, -key_id
+
+
+def _entry_key(entry):
+    return (MUSIC if entry[1] else ARTIST), -entry[2]
+
+
+def _scaled(entries, score):
+    for weight, kind, key_id in entries:
+        yield weight * score, kind, key_id
+
+
+class _Documents:
+    """Word postings per document plus a trigram index over the vocabulary.
+
+    Fuzzy and prefix matching run against the distinct words, which are far fewer
+    than the documents, so common trigrams do not fan out to every document.
+    Each word keeps a weight lookup and a list of the same postings in rank
+    order so a search can stop reading as soon as the top results are settled.
+    Track keys are also grouped by artist, so deleting an artist touches only
+    its own tracks.
+
+    Searches read it without a lock while one writer at a time changes it. Outside
+    bulk mode a write therefore replaces the ranked lists and vocabulary sets it
+    touches with changed copies instead of editing them, and readers tolerate
+    words and documents that disappear between two lookups.
+    """
+
+    def __init__(self, bulk=False):
+        # In bulk mode postings are appended unsorted and finish_bulk() sorts them once
+        self.bulk = bulk
+        self.documents = {}
+        self.words = {}
+        self.postings = {}
+        self.ranked = {}
+        self.vocabulary = defaultdict(set)
+        self.trigram_counts = {}
+        self.tracks = defaultdict(set)
+
+    def index(self, key, document, fields):
+        words = {}
+        for field, text in fields.items():
+            weight = FIELD_WEIGHTS[field]
+            for word in tokenize(text):
+                if words.get(word, 0) < weight:
+                    words[word] = weight
+        self.remove(key)
+        self.documents[key] = document
+        self.words[key] = words
+        for word, weight in words.items():
+            if word not in self.postings:
+                self.postings[word] = {}
+                self.ranked[word] = []
+                word_trigrams = trigrams(word)
+                self.trigram_counts[word] = len(word_trigrams)
+                for trigram in word_trigrams:
+                    if self.bulk:
+                        self.vocabulary[trigram].add(word)
+                    else:
+                        self.vocabulary[trigram] = self.vocabulary.get(trigram, set()) | {word}
+            self.postings[word][key] = weight
+            if self.bulk:
+                self.ranked[word].append(_entry(key, weight))
+            else:
+                entries = list(self.ranked[word])
+                bisect.insort(entries, _entry(key, weight))
+                self.ranked[word] = entries
+
+    def finish_bulk(self):
+        for entries in self.ranked.values():
+            entries.sort()
+        self.bulk = False
+
+    def remove(self, key):
+        document = self.documents.pop(key, None)
+        if document is not None and key[0] == MUSIC:
+            tracks = self.tracks[document["artist_id"]]
+            tracks.discard(key)
+            if not tracks:
+                del self.tracks[document["artist_id"]]
+        for word, weight in self.words.pop(key, {}).items():
+            postings = self.postings[word]
+            del postings[key]
+            if postings:
+                entries = list(self.ranked[word])
+                del entries[bisect.bisect_left(entries, _entry(key, weight))]
+                self.ranked[word] = entries
+                continue
+            del self.postings[word]
+            del self.ranked[word]
+            del self.trigram_counts[word]
+            for trigram in trigrams(word):
+                words = self.vocabulary[trigram] - {word}
+                if words:
+                    self.vocabulary[trigram] = words
+                else:
+                    del self.vocabulary[trigram]
+
+    def similar_words(self, query_word):
+        query_trigrams = trigrams(query_word)
+        # A word reaching MIN_WORD_SIMILARITY shares at least `needed` trigrams with the query, so it
+        # must turn up in one of the len - needed + 1 rarest ones; the common trigrams are only probed
+        by_rarity = sorted(query_trigrams, key=lambda trigram: len(self.vocabulary.get(trigram, ())))
+        needed = max(1, math.ceil(MIN_WORD_SIMILARITY * len(query_trigrams)))
+        split = len(by_rarity) - needed + 1
+        shared = Counter()
+        for trigram in by_rarity[:split]:
+            shared.update(self.vocabulary.get(trigram, ()))
+        for trigram in by_rarity[split:]:
+            words = self.vocabulary.get(trigram, ())
+            for word in shared:
+                if word in words:
+                    shared[word] += 1
+
+        # Jaccard similarity of the trigram sets, with prefixes of indexed words ranked as close matches
+        query_count = len(query_trigrams)
+        trigram_counts = self.trigram_counts
+        scored = heapq.nlargest(MAX_WORD_CANDIDATES, (
+            (
+                max(count / (query_count + trigram_counts[word] - count),
+                    PREFIX_SIMILARITY if word.startswith(query_word) else 0),
+                word,
+            )
+            for word, count in shared.items() if count >= needed and word in trigram_counts
+        ))
+        return [(score, word) for score, word in scored if score >= MIN_WORD_SIMILARITY]
+
+    def matches(self, similar):
+        # One query word's postings merged best first across the vocabulary words it matched
+        return heapq.merge(*[_scaled(self.ranked.get(word, ()), score) for score, word in similar])
+
+    def word_score(self, similar, key):
+        return max((score * self.postings.get(word, {}).get(key, 0) for score, word in similar), default=0)
+
+    def put_artist(self, artist_id, name):
+        artist_id = int(artist_id)
+        self.index((ARTIST, artist_id), {"type": ARTIST, "id": artist_id, "name": name}, {"name": name})
+
+    def put_music(self, music_id, title, album_name, genre, artist_id):
+        music_id, artist_id = int(music_id), int(artist_id)
+        self.index(
+            (MUSIC, music_id),
+            {
+                "type": MUSIC,
+                "id": music_id,
+                "title": title,
+                "album_name": album_name,
+                "genre": genre,
+                "artist_id": artist_id,
+            },
+            {"title": title, "album_name": album_name},
+        )
+        self.tracks[artist_id].add((MUSIC, music_id))
+
+    def remove_artist(self, artist_id):
+        # Deleting an artist cascades to its tracks
+        self.remove((ARTIST, artist_id))
+        for key in list(self.tracks.get(artist_id, ())):
+            self.remove(key)
+
+
+class CatalogueIndex:
+    """In-process trigram index over artist names, track titles and album names.
+
+    The add/update/delete views keep it current for the process they run in.
+    Other worker processes pick their changes up through a background rebuild
+    once the index is older than SEARCH_INDEX_MAX_AGE seconds; the old index
+    keeps serving while it runs. Builds load a new index outside the write lock
+    and swap it in; searches use whichever index is current without locking.
+    """
+
+    def __init__(self):
+        # Serializes writers; a build only takes it for the swap
+        self._lock = threading.RLock()
+        # Held through the first build, so searches arriving meanwhile wait for it instead of starting their own
+        self._first_build = threading.Lock()
+        self._data = _Documents()
+        self._writes = 0
+        self._rebuilding = False
+        self.built_at = None
+        self.stale = False
+
+    def _write(self, apply):
+        with self._lock:
+            self._writes += 1
+            apply(self._data)
+
+    # Write hooks for the add/update/delete views
+
+    def add_artist(self, artist_id, name):
+        self._write(lambda data: data.put_artist(artist_id, name))
+
+    def remove_artist(self, artist_id):
+        artist_id = int(artist_id)
+        self._write(lambda data: data.remove_artist(artist_id))
+
+    def add_music(self, music_id, title, album_name, genre, artist_id):
+        self._write(lambda data: data.put_music(music_id, title, album_name, genre, artist_id))
+
+    def update_artist(self, artist_id, name):
+        self._write(lambda data: data.put_artist(artist_id, name))
+
+    def update_music(self, music_id, title, album_name, genre):
+        def apply(data):
+            document = data.documents.get((MUSIC, int(music_id)))
+            if document is not None:
+                data.put_music(music_id, title, album_name, genre, document["artist_id"])
+        self._write(apply)
+
+    def remove_music(self, music_id):
+        self._write(lambda data: data.remove((MUSIC, int(music_id))))
+
+    def mark_stale(self):
+        # For writes that do not return the new ids, e.g. the CSV import
+        self.stale = True
+
+    def build(self):
+        started = time.time()
+        writes = self._writes
+        data = _Documents(bulk=True)
+        for rows in ArtistRepository.iter_batches(fields=["id", "name"]):
+            for row in rows:
+                data.put_artist(row[0], row[1])
+        for rows in MusicRepository.iter_with_artist_id():
+            for row in rows:
+                data.put_music(*row)
+        data.finish_bulk()
+
+        with self._lock:
+            self._data = data
+            self.built_at = started
+            # Writes applied to the old index while this one was loading may be missing from it
+            self.stale = writes != self._writes
+
+    def _rebuild_in_background(self):
+        try:
+            self.build()
+        finally:
+            self._rebuilding = False
+            connections.close_all()
+
+    def ensure_fresh(self):
+        if self.built_at is None:
+            with self._first_build:
+                if self.built_at is None:
+                    self.build()
+            return
+
+        max_age = getattr(settings, "SEARCH_INDEX_MAX_AGE", 300)
+        if not (self.stale or time.time() - self.built_at > max_age):
+            return
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._rebuild_in_background, name="search-index", daemon=True).start()
+
+    def search(self, query, limit, types=(ARTIST, MUSIC)):
+        words = tokenize(query)
+        if not words:
+            return []
+
+        data = self._data
+        similar = [data.similar_words(word) for word in words]
+        streams = [data.matches(matches) for matches in similar]
+        # Threshold algorithm: read every word's postings best first and score each new document
+        # in full; once the current top results beat the best score an unread document could
+        # still reach, reading stops
+        bounds = [matches[0][0] if matches else 0 for matches in similar]
+        seen = set()
+        top = []
+        while True:
+            for position, stream in enumerate(streams):
+                entry = next(stream, None)
+                if entry is None:
+                    bounds[position] = 0
+                    continue
+                bounds[position] = -entry[0]
+                key = _entry_key(entry)
+                if key in seen:
+                    continue
+                seen.add(key)
+                if key[0] not in types:
+                    continue
+                score = sum(data.word_score(matches, key) for matches in similar)
+                if score < MIN_SCORE * len(words):
+                    continue
+                ranked = (score, key[0] == ARTIST, key[1], key)
+                if len(top) < limit:
+                    heapq.heappush(top, ranked)
+                elif ranked > top[0]:
+                    heapq.heapreplace(top, ranked)
+
+            threshold = sum(bounds)
+            if threshold < MIN_SCORE * len(words) or (len(top) == limit and top[0][0] >= threshold):
+                break
+
+        # A document removed while this search ran is left out
+        documents = [(data.documents.get(key), score) for score, _, _, key in sorted(top, reverse=True)]
+        return [
+            {**document, "score": round(score / len(words), 3)} for document, score in documents if document is not None
+        ]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "documents": len(self._data.documents),
+                "words": len(self._data.postings),
+                "built_at": self.built_at,
+                "stale": self.stale,
+            }
+
+
+catalogue_index = CatalogueIndex()
@@ -0,0 +1,92 @@
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from search.index import ARTIST, MUSIC, CatalogueIndex
+
+
+class RemoveArtistTests(SimpleTestCase):
+    def setUp(self):
+        self.index = CatalogueIndex()
+        self.index.add_artist(1, "Nina Simone")
+        self.index.add_artist(2, "Miles Davis")
+        self.index.add_music(10, "Feeling Good", "I Put a Spell on You", "jazz", 1)
+        self.index.add_music(11, "Sinnerman", "Pastel Blues", "jazz", 1)
+        self.index.add_music(20, "So What", "Kind of Blue", "jazz", 2)
+
+    def test_removes_the_artist_and_only_its_tracks(self):
+        self.index.remove_artist("1")
+        data = self.index._data
+        self.assertEqual(set(data.documents), {(ARTIST, 2), (MUSIC, 20)})
+        self.assertEqual(dict(data.tracks), {2: {(MUSIC, 20)}})
+        self.assertNotIn("sinnerman", data.postings)
+        self.assertEqual([hit["id"] for hit in self.index.search("blue", 10)], [20])
+
+    def test_track_map_follows_track_removal(self):
+        self.index.remove_music(11)
+        self.index.update_music(10, "Feeling Good", "Feeling Good", "jazz")
+        self.assertEqual(self.index._data.tracks[1], {(MUSIC, 10)})
+        self.index.remove_music(10)
+        self.assertNotIn(1, self.index._data.tracks)
+
+
+class SearchTests(SimpleTestCase):
+    def setUp(self):
+        self.index = CatalogueIndex()
+        self.index.add_artist(1, "Miles Davis")
+        self.index.add_music(10, "Miles Runs the Voodoo Down", "Bitches Brew", "jazz", 1)
+        self.index.add_music(11, "So What", "Miles Ahead", "jazz", 1)
+        self.index.add_music(12, "Blue in Green", "Kind of Blue", "jazz", 1)
+
+    def search(self, query, **kwargs):
+        return [(hit["type"], hit["id"]) for hit in self.index.search(query, 10, **kwargs)]
+
+    def test_ranking(self):
+        # Names and titles outrank album names; on equal scores artists come first, then newer tracks
+        self.assertEqual(self.search("miles"), [(ARTIST, 1), (MUSIC, 10), (MUSIC, 11)])
+        self.assertEqual(self.search("mile")[0], (ARTIST, 1))
+        self.assertEqual(self.search("miles", types=(MUSIC,)), [(MUSIC, 10), (MUSIC, 11)])
+        self.assertEqual(self.search("blue green"), [(MUSIC, 12)])
+        self.assertEqual(self.search("zzzz"), [])
+
+    def test_updates_are_visible(self):
+        self.index.update_music(12, "Flamenco Sketches", "Kind of Blue", "jazz")
+        self.assertEqual(self.search("flamenco"), [(MUSIC, 12)])
+        self.assertEqual(self.search("green"), [])
+
+        self.index.update_artist(1, "Dewey Davis")
+        self.assertEqual(self.search("dewey"), [(ARTIST, 1)])
+        self.assertNotIn((ARTIST, 1), self.search("miles"))
+
+    def test_search_runs_while_writes_change_the_index(self):
+        errors = []
+
+        def churn():
+            try:
+                for music_id in range(100, 1100):
+                    self.index.add_music(music_id, f"Miles {music_id}", "Live", "jazz", 1)
+                    self.index.remove_music(music_id - 1)
+            except Exception as e:
+                errors.append(e)
+
+        writer = threading.Thread(target=churn)
+        writer.start()
+        while writer.is_alive():
+            self.search("miles live")
+        writer.join()
+        self.assertEqual(errors, [])
+
+    def test_first_build_does_not_block_writers(self):
+        def build():
+            writer = threading.Thread(target=self.index.add_artist, args=(2, "Wayne Shorter"))
+            writer.start()
+            writer.join(timeout=5)
+            self.assertFalse(writer.is_alive())
+            self.index.built_at = time.time()
+
+        self.index.built_at = None
+        with mock.patch.object(self.index, "build", side_effect=build):
+            self.index.ensure_fresh()
+        self.assertEqual(self.search("wayne"), [(ARTIST, 2)])
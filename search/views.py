@@ -0,0 +1,35 @@
+from django.views.decorators.csrf import csrf_exempt
+
+from search.index import ARTIST, MUSIC, catalogue_index
+from utils.serialization import JsonResponse
+from utils.service_result import ServiceResult
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+SEARCH_TYPES = [ARTIST, MUSIC]
+
+
+@csrf_exempt
+def search(request, *args, **kwargs):
+    if request.method != "GET":
+        return JsonResponse(ServiceResult.as_failure("Only GET method allowed", status=405).to_dict(), status=405)
+
+    try:
+        query = request.GET.get("q", "").strip()
+        if not query:
+            return JsonResponse(ServiceResult.as_failure("q is required", status=400).to_dict(), status=400)
+
+        try:
+            limit = min(max(int(request.GET.get("limit") or DEFAULT_LIMIT), 1), MAX_LIMIT)
+        except ValueError:
+            return JsonResponse(ServiceResult.as_failure("limit must be an integer", status=400).to_dict(), status=400)
+
+        types = [item.strip() for item in request.GET.get("type", "").split(",") if item.strip()] or SEARCH_TYPES
+        if [item for item in types if item not in SEARCH_TYPES]:
+            return JsonResponse(ServiceResult.as_failure("type must be artist, music or both", status=400).to_dict(), status=400)
+
+        catalogue_index.ensure_fresh()
+        return JsonResponse(ServiceResult.as_success(catalogue_index.search(query, limit, types)).to_dict(), status=200)
+
+    except Exception as e:
+        return JsonResponse(ServiceResult.as_failure(str(e), status=500).to_dict(), status=500)
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from stats.summary import catalogue_stats
+
+
+class Command(BaseCommand):
+    help = "Recomputes the CatalogueStats counters from Artist and Music, repairing any drift."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drifted = catalogue_stats.rebuild()
+        self.stdout.write(f"CatalogueStats rebuilt, {drifted} bucket(s) corrected")
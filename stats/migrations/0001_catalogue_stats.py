@@ -0,0 +1,42 @@
+from django.db import migrations
+
+from utils.migrations import vendor_sql
+
+
+def fill(apps, schema_editor):
+    from stats.summary import catalogue_stats
+
+    catalogue_stats.rebuild()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("music", "0001_music_lookup_indexes"),
+    ]
+
+    operations = [
+        # Counters behind stats/, one row per (dimension, bucket); see stats/summary.py
+        vendor_sql(
+            {
+                "microsoft": [
+                    "CREATE TABLE CatalogueStats (dimension VARCHAR(32) NOT NULL, bucket VARCHAR(64) NOT NULL, "
+                    "value INT NOT NULL, CONSTRAINT PK_CatalogueStats PRIMARY KEY (dimension, bucket))",
+                ],
+                "postgresql": [
+                    "CREATE TABLE CatalogueStats (dimension VARCHAR(32) NOT NULL, bucket VARCHAR(64) NOT NULL, "
+                    "value INT NOT NULL, CONSTRAINT PK_CatalogueStats PRIMARY KEY (dimension, bucket))",
+                ],
+                "sqlite": [
+                    "CREATE TABLE CatalogueStats (dimension VARCHAR(32) NOT NULL, bucket VARCHAR(64) NOT NULL, "
+                    "value INT NOT NULL, PRIMARY KEY (dimension, bucket))",
+                ],
+            },
+            {
+                "microsoft": ["DROP TABLE CatalogueStats"],
+                "postgresql": ["DROP TABLE CatalogueStats"],
+                "sqlite": ["DROP TABLE CatalogueStats"],
+            },
+        ),
+        migrations.RunPython(fill, migrations.RunPython.noop),
+    ]
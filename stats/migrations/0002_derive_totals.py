@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+def rebuild(apps, schema_editor):
+    from stats.summary import catalogue_stats
+
+    # Drops the stored totals rows, which read() now sums from the buckets, and gives every
+    # artist an albums_declared bucket
+    catalogue_stats.rebuild()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("stats", "0001_catalogue_stats"),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,229 @@
+from collections import Counter
+
+from django.db import connection
+
+from utils.dialects import get_dialect
+from utils.repositories import MUSIC_GENRES, rows_per_statement
+
+TRACKS_PER_GENRE = "tracks_per_genre"
+ARTISTS_PER_DECADE = "artists_per_decade"
+TRACKS_PER_ARTIST = "tracks_per_artist"
+ALBUMS_DECLARED = "albums_declared"
+ALBUMS_REAL = "albums_real"
+TOTALS = "totals"
+# Per-artist dimensions grow with the catalogue, so stats/ returns them only when asked for
+SMALL_DIMENSIONS = [TOTALS, TRACKS_PER_GENRE, ARTISTS_PER_DECADE]
+DIMENSIONS = SMALL_DIMENSIONS + [TRACKS_PER_ARTIST, ALBUMS_DECLARED, ALBUMS_REAL]
+# Stored dimensions, in the order a write locks them: the artist's own buckets, then the shared ones
+PER_ARTIST_DIMENSIONS = [ALBUMS_DECLARED, ALBUMS_REAL, TRACKS_PER_ARTIST]
+SHARED_DIMENSIONS = [TRACKS_PER_GENRE, ARTISTS_PER_DECADE]
+# totals bucket -> (dimension, aggregate) it is computed from when read. Every artist has an
+# albums_declared bucket, so counting those counts the artists
+TOTALS_FROM = {
+    "artists": (ALBUMS_DECLARED, "COUNT(*)"),
+    "tracks": (TRACKS_PER_GENRE, "SUM(value)"),
+    ALBUMS_DECLARED: (ALBUMS_DECLARED, "SUM(value)"),
+    ALBUMS_REAL: (ALBUMS_REAL, "SUM(value)"),
+}
+
+
+def decade(first_release_year):
+    return None if first_release_year is None else str(int(first_release_year) // 10 * 10)
+
+
+class CatalogueStats:
+    """Pre-aggregated counters in the CatalogueStats (dimension, bucket, value) table.
+
+    The write views call these inside their own transaction so the counters commit
+    or roll back with the rows they describe. Counters are written with the dialect's
+    upsert (MERGE ... WITH (HOLDLOCK) on SQL Server, INSERT ... ON CONFLICT elsewhere),
+    so adding a delta is atomic under concurrent writers. The per-artist albums_real
+    count is recomputed rather than added to; its row is locked before the recount,
+    see _refresh_albums.
+
+    totals are not stored: read() sums the buckets, so writes do not all queue on a
+    few shared rows. Every write locks the artist's buckets before the genre and
+    decade ones, so concurrent writes cannot deadlock on each other's order.
+    Anything that bypasses the views (manual SQL, restores) is repaired by
+    `manage.py rebuild_stats`.
+    """
+
+    KEYS = ("dimension", "bucket")
+    COLUMNS = ("dimension", "bucket", "value")
+    ROW = "(%s, %s, %s)"
+    DELETE_BUCKET = "DELETE FROM CatalogueStats WHERE dimension = %s AND bucket = %s"
+    SELECT_BUCKETS = "SELECT bucket, value FROM CatalogueStats WHERE dimension = %s AND bucket IN ({buckets})"
+    SELECT_DIMENSIONS = "SELECT dimension, bucket, value FROM CatalogueStats WHERE dimension IN ({dimensions})"
+    SELECT_TOTAL = "SELECT {aggregate} FROM CatalogueStats WHERE dimension = %s"
+    SELECT_ARTIST = "SELECT first_release_year, no_of_albums_released FROM Artist WHERE id = %s"
+    SELECT_ARTIST_GENRES = "SELECT genre, COUNT(*) FROM Music WHERE artist_id = %s GROUP BY genre"
+    COUNT_ALBUMS = '''
+        SELECT artist_id, COUNT(DISTINCT album_name) FROM Music WHERE artist_id IN ({ids}) GROUP BY artist_id
+        '''
+
+    REBUILD = [
+        "DELETE FROM CatalogueStats",
+        '''
+        INSERT INTO CatalogueStats (dimension, bucket, value)
+        SELECT 'tracks_per_genre', genre, COUNT(*) FROM Music GROUP BY genre
+        ''',
+        '''
+        INSERT INTO CatalogueStats (dimension, bucket, value)
+        SELECT 'artists_per_decade', CAST(first_release_year / 10 * 10 AS VARCHAR(20)), COUNT(*) FROM Artist
+        WHERE first_release_year IS NOT NULL GROUP BY first_release_year / 10 * 10
+        ''',
+        '''
+        INSERT INTO CatalogueStats (dimension, bucket, value)
+        SELECT 'tracks_per_artist', CAST(artist_id AS VARCHAR(20)), COUNT(*) FROM Music GROUP BY artist_id
+        ''',
+        '''
+        INSERT INTO CatalogueStats (dimension, bucket, value)
+        SELECT 'albums_declared', CAST(id AS VARCHAR(20)), COALESCE(no_of_albums_released, 0) FROM Artist
+        ''',
+        '''
+        INSERT INTO CatalogueStats (dimension, bucket, value)
+        SELECT 'albums_real', CAST(artist_id AS VARCHAR(20)), COUNT(DISTINCT album_name) FROM Music GROUP BY artist_id
+        ''',
+    ]
+
+    def _merge(self, values, accumulate=False):
+        """Sets the (dimension, bucket) counters in values, or adds to them with accumulate."""
+        sql = get_dialect().upsert("CatalogueStats", self.KEYS, self.COLUMNS, accumulate)
+        rows = [(dimension, bucket, value) for (dimension, bucket), value in values.items()]
+        with connection.cursor() as cursor:
+            chunk_size = rows_per_statement(self.ROW)
+            for start in range(0, len(rows), chunk_size):
+                chunk = rows[start:start + chunk_size]
+                cursor.execute(
+                    sql.format(rows=", ".join([self.ROW] * len(chunk))),
+                    [value for row in chunk for value in row]
+                )
+
+    def _apply(self, deltas):
+        # Per-artist buckets first, then the shared ones, the lock order every write follows
+        deltas = {key: delta for key, delta in deltas.items() if delta}
+        for dimensions in (PER_ARTIST_DIMENSIONS, SHARED_DIMENSIONS):
+            part = {key: delta for key, delta in sorted(deltas.items()) if key[0] in dimensions}
+            if part:
+                self._merge(part, accumulate=True)
+
+    def _refresh_albums(self, artist_ids):
+        """Recounts distinct album names for the artists a write touched."""
+        buckets = sorted({str(artist_id) for artist_id in artist_ids})
+        if not buckets:
+            return
+        # Adding 0 creates any missing bucket and holds its row lock until commit, so a concurrent
+        # write for the same artist waits here and then counts this one's committed tracks
+        self._merge({(ALBUMS_REAL, bucket): 0 for bucket in buckets}, accumulate=True)
+        with connection.cursor() as cursor:
+            cursor.execute(self.COUNT_ALBUMS.format(ids=", ".join(["%s"] * len(buckets))), [int(b) for b in buckets])
+            current = {str(artist_id): count for artist_id, count in cursor.fetchall()}
+        self._merge({(ALBUMS_REAL, bucket): current.get(bucket, 0) for bucket in buckets})
+
+    # Write hooks, called inside the view's transaction
+
+    def artists_added(self, artists):
+        """artists are (id, first_release_year, no_of_albums_released) rows."""
+        declared = {}
+        deltas = Counter()
+        for artist_id, first_release_year, no_of_albums_released in artists:
+            declared[ALBUMS_DECLARED, str(artist_id)] = int(no_of_albums_released or 0)
+            if first_release_year is not None:
+                deltas[ARTISTS_PER_DECADE, decade(first_release_year)] += 1
+        if declared:
+            self._merge(dict(sorted(declared.items())))
+        self._apply(deltas)
+
+    def artist_updated(self, artist_id, previous, first_release_year, no_of_albums_released):
+        """previous is the (first_release_year, no_of_albums_released) the row held before the update."""
+        previous_year, _ = previous
+        self._merge({(ALBUMS_DECLARED, str(artist_id)): int(no_of_albums_released or 0)})
+        deltas = Counter()
+        if previous_year is not None:
+            deltas[ARTISTS_PER_DECADE, decade(previous_year)] -= 1
+        if first_release_year not in [None, ""]:
+            deltas[ARTISTS_PER_DECADE, decade(first_release_year)] += 1
+        self._apply(deltas)
+
+    def artist_removing(self, artist_id):
+        # Runs before the DELETE: the artist's tracks go with it through ON DELETE CASCADE
+        with connection.cursor() as cursor:
+            cursor.execute(self.SELECT_ARTIST, [artist_id])
+            artist = cursor.fetchone()
+            if artist is None:
+                return
+            cursor.execute(self.SELECT_ARTIST_GENRES, [artist_id])
+            genres = cursor.fetchall()
+            for dimension in PER_ARTIST_DIMENSIONS:
+                cursor.execute(self.DELETE_BUCKET, [dimension, str(artist_id)])
+
+        first_release_year, _ = artist
+        deltas = Counter()
+        if first_release_year is not None:
+            deltas[ARTISTS_PER_DECADE, decade(first_release_year)] -= 1
+        for genre, count in genres:
+            deltas[TRACKS_PER_GENRE, genre] -= count
+        self._apply(deltas)
+
+    def tracks_added(self, tracks):
+        """tracks are (artist_id, genre) pairs."""
+        self._tracks_changed([], tracks)
+
+    def tracks_removed(self, tracks):
+        self._tracks_changed(tracks, [])
+
+    def tracks_updated(self, previous, current):
+        """previous and current are (artist_id, genre) pairs for the same tracks before and after the update."""
+        self._tracks_changed(previous, current)
+
+    def _tracks_changed(self, removed, added):
+        removed, added = list(removed), list(added)
+        deltas = Counter()
+        for sign, tracks in ((-1, removed), (1, added)):
+            for artist_id, genre in tracks:
+                deltas[TRACKS_PER_GENRE, genre] += sign
+                deltas[TRACKS_PER_ARTIST, str(artist_id)] += sign
+        # albums_real sorts before tracks_per_artist in PER_ARTIST_DIMENSIONS, so it is locked first
+        self._refresh_albums([artist_id for artist_id, _ in removed + added])
+        self._apply(deltas)
+
+    # Reads and repair
+
+    def read(self, dimensions=SMALL_DIMENSIONS):
+        stored = [dimension for dimension in dimensions if dimension != TOTALS]
+        with connection.cursor() as cursor:
+            rows = []
+            if stored:
+                cursor.execute(self.SELECT_DIMENSIONS.format(dimensions=", ".join(["%s"] * len(stored))), stored)
+                rows = cursor.fetchall()
+            totals = {}
+            if TOTALS in dimensions:
+                for bucket, (dimension, aggregate) in TOTALS_FROM.items():
+                    cursor.execute(self.SELECT_TOTAL.format(aggregate=aggregate), [dimension])
+                    totals[bucket] = cursor.fetchone()[0] or 0
+
+        stats = {dimension: {} for dimension in dimensions}
+        if TOTALS in stats:
+            stats[TOTALS] = totals
+        if TRACKS_PER_GENRE in stats:
+            stats[TRACKS_PER_GENRE] = dict.fromkeys(MUSIC_GENRES, 0)
+        for dimension, bucket, value in rows:
+            stats[dimension][bucket] = value
+        return stats
+
+    def rebuild(self):
+        """Recomputes every counter from Artist and Music; returns how many buckets were wrong or missing."""
+        before = self.read(DIMENSIONS)
+        with connection.cursor() as cursor:
+            for sql in self.REBUILD:
+                cursor.execute(sql)
+        after = self.read(DIMENSIONS)
+        return sum(
+            1
+            for dimension in DIMENSIONS
+            for bucket in set(before[dimension]) | set(after[dimension])
+            if before[dimension].get(bucket, 0) != after[dimension].get(bucket, 0)
+        )
+
+
+catalogue_stats = CatalogueStats()
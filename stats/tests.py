@@ -0,0 +1,62 @@
+from unittest import mock
+
+from django.db import connection
+
+from stats.summary import (
+    ALBUMS_DECLARED, ALBUMS_REAL, PER_ARTIST_DIMENSIONS, SHARED_DIMENSIONS, TOTALS, TRACKS_PER_ARTIST, catalogue_stats,
+)
+from utils.testing import ApiTestCase
+
+
+class CatalogueStatsTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.artist_id = self.send("post", "/artist/add/", {
+            "name": "artist", "gender": "male", "first_release_year": 1990, "no_of_albums_released": 2,
+        })[1]["data"]["id"]
+
+    def add_track(self, album_name, genre="rock"):
+        body = {"artist_id": self.artist_id, "title": "t", "album_name": album_name, "genre": genre}
+        return self.send("post", "/music/add/", body)[1]["data"]["id"]
+
+    def test_write_hooks_match_a_rebuild(self):
+        first = self.add_track("a")
+        self.add_track("a")
+        self.add_track("b", genre="jazz")
+        self.send("put", "/music/update/", {"id": first, "title": "t", "album_name": "c", "genre": "rnb"})
+        self.send("delete", f"/music/delete?id={first}")
+
+        stats = catalogue_stats.read([TOTALS, TRACKS_PER_ARTIST, ALBUMS_REAL])
+        self.assertEqual(stats[ALBUMS_REAL], {str(self.artist_id): 2})
+        self.assertEqual(stats[TOTALS][ALBUMS_REAL], 2)
+        self.assertEqual(stats[TRACKS_PER_ARTIST], {str(self.artist_id): 2})
+        self.assertEqual(catalogue_stats.rebuild(), 0)
+
+    def test_artist_delete_clears_its_buckets(self):
+        self.add_track("a")
+        self.send("delete", f"/artist/delete?id={self.artist_id}")
+        stats = catalogue_stats.read([TOTALS, ALBUMS_REAL])
+        self.assertEqual(stats[ALBUMS_REAL], {})
+        self.assertEqual(stats[TOTALS][ALBUMS_REAL], 0)
+        self.assertEqual(catalogue_stats.rebuild(), 0)
+
+    def test_totals_are_summed_from_the_buckets(self):
+        self.add_track("a")
+        self.send("post", "/artist/add/", {
+            "name": "other", "gender": "female", "first_release_year": 2001, "no_of_albums_released": 3,
+        })
+        self.assertEqual(catalogue_stats.read([TOTALS])[TOTALS], {
+            "artists": 2, "tracks": 1, ALBUMS_DECLARED: 5, ALBUMS_REAL: 1,
+        })
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM CatalogueStats WHERE dimension = %s", [TOTALS])
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_track_writes_lock_artist_buckets_first(self):
+        with mock.patch.object(catalogue_stats, "_merge", wraps=catalogue_stats._merge) as merge:
+            self.add_track("a")
+        dimensions = [{dimension for dimension, _ in call.args[0]} for call in merge.call_args_list]
+        shared = [index for index, names in enumerate(dimensions) if names & set(SHARED_DIMENSIONS)]
+        per_artist = [index for index, names in enumerate(dimensions) if names & set(PER_ARTIST_DIMENSIONS)]
+        self.assertTrue(shared and per_artist)
+        self.assertLess(max(per_artist), min(shared))
@@ -0,0 +1,7 @@
+from django import urls
+from stats import views
+from utils.async_db import for_server
+
+urlpatterns = [
+    urls.path('',for_server(views.stats)),
+]
@@ -0,0 +1,24 @@
+from django.views.decorators.csrf import csrf_exempt
+
+from stats.summary import DIMENSIONS, SMALL_DIMENSIONS, catalogue_stats
+from utils.serialization import JsonResponse
+from utils.service_result import ServiceResult
+
+
+@csrf_exempt
+def stats(request, *args, **kwargs):
+    if request.method != "GET":
+        return JsonResponse(ServiceResult.as_failure("Only GET method allowed", status=405).to_dict(), status=405)
+
+    try:
+        dimensions = [item.strip() for item in request.GET.get("dimensions", "").split(",") if item.strip()]
+        if [item for item in dimensions if item not in DIMENSIONS]:
+            return JsonResponse(ServiceResult.as_failure(
+                "dimensions: expected a comma separated subset of " + ", ".join(DIMENSIONS), status=400
+            ).to_dict(), status=400)
+
+        data = catalogue_stats.read(list(dict.fromkeys(dimensions)) or SMALL_DIMENSIONS)
+        return JsonResponse(ServiceResult.as_success(data).to_dict(), status=200)
+
+    except Exception as e:
+        return JsonResponse(ServiceResult.as_failure(str(e), status=500).to_dict(), status=500)
@@ -0,0 +1,66 @@
+"""Memory and throughput of artist/download on the SQLite stand-in.
+
+    python test/bench_artist_download.py --rows 1000000
+    python test/bench_artist_download.py --rows 1000000 --format xlsx --include-music
+
+Throughput is measured on a plain pass; peak Python memory is measured on a
+second pass under tracemalloc, which is slower but allocation-accurate.
+"""
+import argparse
+import time
+import tracemalloc
+
+from bench_setup import create_schema, seed, setup_django
+
+
+def consume(response):
+    size = 0
+    for chunk in response.streaming_content:
+        size += len(chunk)
+    if hasattr(response, "file_to_stream"):
+        response.close()
+    return size
+
+
+def run(view, factory, query):
+    request = factory.get("/artist/download/", query)
+    return consume(view(request))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=["csv", "xlsx"], default="csv")
+    parser.add_argument("--include-music", action="store_true")
+    parser.add_argument("--skip-seed", action="store_true")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import RequestFactory
+    from artist.views import download_artist
+
+    if not args.skip_seed:
+        create_schema()
+        started = time.perf_counter()
+        seed(args.rows, tracks_per_artist=2 if args.include_music else 0)
+        print(f"seeded {args.rows} artists in {time.perf_counter() - started:.1f}s")
+
+    query = {"format": args.format}
+    if args.include_music:
+        query["include"] = "music"
+    factory = RequestFactory()
+
+    started = time.perf_counter()
+    size = run(download_artist, factory, query)
+    elapsed = time.perf_counter() - started
+    print(f"{args.format}: {size / 1e6:.1f} MB in {elapsed:.2f}s, {args.rows / elapsed:,.0f} artists/s")
+
+    tracemalloc.start()
+    run(download_artist, factory, query)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{args.format}: peak traced memory {peak / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Concurrent-request throughput of the ASGI (uvicorn) and WSGI (gunicorn) servers.
+
+    python test/bench_asgi.py --compare --path "/artist/get/?limit=50" --token <jwt>
+    python test/bench_asgi.py --url "http://127.0.0.1:8000/artist/get/?limit=50" --token <jwt>
+
+--compare starts `uvicorn artist_mgmt_be.asgi:application` and
+`gunicorn artist_mgmt_be.wsgi:application --threads N`, each with a single
+worker process, and runs the same load against both. Without it, the load is
+sent to an already running server at --url. The server processes use the
+project settings, including DJANGO_SETTINGS_MODULE and the database, from the
+current environment.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def _worker(host, port, request_bytes, deadline, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            writer.write(request_bytes)
+            await writer.drain()
+
+            status_line = await reader.readline()
+            length = 0
+            chunked = False
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+                elif name.lower() == "transfer-encoding" and "chunked" in value.lower():
+                    chunked = True
+
+            if chunked:
+                while True:
+                    size = int((await reader.readline()).strip() or b"0", 16)
+                    await reader.readexactly(size + 2)
+                    if size == 0:
+                        break
+            else:
+                await reader.readexactly(length)
+
+            if not status_line.split(b" ")[1].startswith((b"2", b"3")):
+                errors.append(status_line)
+            latencies.append(time.perf_counter() - started)
+    finally:
+        writer.close()
+
+
+async def load(url, concurrency, seconds, token):
+    parts = urlsplit(url)
+    target = parts.path + (f"?{parts.query}" if parts.query else "")
+    headers = [f"GET {target} HTTP/1.1", f"Host: {parts.netloc}", "Connection: keep-alive"]
+    if token:
+        headers.append(f"Authorization: Bearer {token}")
+    request_bytes = ("\r\n".join(headers) + "\r\n\r\n").encode("latin-1")
+
+    latencies = []
+    errors = []
+    deadline = time.perf_counter() + seconds
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        _worker(parts.hostname, parts.port or 80, request_bytes, deadline, latencies, errors)
+        for _ in range(concurrency)
+    ])
+    return latencies, errors, time.perf_counter() - started
+
+
+def report(label, latencies, errors, elapsed):
+    ordered = sorted(latencies) or [0]
+    pick = lambda pct: ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] * 1000
+    print(
+        f"{label:10} {len(latencies) / elapsed:8.0f} req/s  p50 {pick(50):7.1f} ms  "
+        f"p99 {pick(99):7.1f} ms  errors {len(errors)}"
+    )
+
+
+def wait_for_port(host, port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            asyncio.run(asyncio.wait_for(asyncio.open_connection(host, port), 1))
+            return
+        except (OSError, asyncio.TimeoutError):
+            time.sleep(0.2)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def serve_and_load(label, command, port, args):
+    server = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_port("127.0.0.1", port)
+        report(label, *asyncio.run(load(f"http://127.0.0.1:{port}{args.path}", args.concurrency, args.seconds, args.token)))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url")
+    parser.add_argument("--path", default="/artist/get/?limit=50")
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--wsgi-threads", type=int, default=10)
+    parser.add_argument("--token", default=os.environ.get("BENCH_TOKEN"))
+    args = parser.parse_args()
+
+    if not args.compare:
+        report("server", *asyncio.run(load(args.url, args.concurrency, args.seconds, args.token)))
+        return
+
+    serve_and_load(
+        "uvicorn",
+        [sys.executable, "-m", "uvicorn", "artist_mgmt_be.asgi:application", "--port", "8101", "--log-level", "warning"],
+        8101,
+        args,
+    )
+    serve_and_load(
+        "gunicorn",
+        [sys.executable, "-m", "gunicorn", "artist_mgmt_be.wsgi:application", "--bind", "127.0.0.1:8102",
+         "--workers", "1", "--threads", str(args.wsgi_threads)],
+        8102,
+        args,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""CPU cost against bytes saved for the response encodings CompressionMiddleware can use.
+
+    python test/bench_compression.py
+    python test/bench_compression.py --rows 1000 100000 --repeat 5
+
+Two shapes are measured for each level: a paginated JSON list page compressed in one
+call, and the same rows as an ndjson stream compressed batch by batch the way a
+?stream= response is, with a flush after every STREAM_BATCH_SIZE rows. Brotli levels
+are skipped unless the brotli package is installed. Every output is decompressed and
+compared with the input before it is timed.
+"""
+import argparse
+import time
+import zlib
+
+from bench_serialization import payload
+from bench_setup import setup_django
+
+GZIP_LEVELS = [1, 3, 6, 9]
+BROTLI_QUALITIES = [1, 4, 5, 6, 9, 11]
+
+
+def one_shot(make_compressor, body):
+    return [make_compressor().compress(body)]
+
+
+def chunked(make_compressor, chunks):
+    compressor = make_compressor()
+    return [compressor.chunk(chunk) for chunk in chunks] + [compressor.finish()]
+
+
+def best_of(compress, data, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        parts = compress(data)
+        timings.append(time.perf_counter() - started)
+    return min(timings), b"".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from utils import compression
+    from utils.serialization import dumps
+    from utils.streaming import STREAM_BATCH_SIZE
+
+    codecs = [
+        (f"gzip-{level}", lambda level=level: compression.GzipCompressor(level), lambda body: zlib.decompress(body, 47))
+        for level in GZIP_LEVELS
+    ]
+    if compression.brotli is None:
+        print("brotli is not installed; timing gzip only")
+    else:
+        codecs += [
+            (f"br-{quality}", lambda quality=quality: compression.BrotliCompressor(quality), compression.brotli.decompress)
+            for quality in BROTLI_QUALITIES
+        ]
+
+    print(f"{'rows':>8} {'shape':7} {'codec':8} {'ms':>8} {'MB/s':>7} {'in MB':>7} {'out MB':>7} {'saved':>6}")
+    for rows in args.rows:
+        data = payload(rows)
+        body = dumps(data)
+        records = data["data"]
+        chunks = [
+            b"".join(dumps(record) + b"\n" for record in records[start:start + STREAM_BATCH_SIZE])
+            for start in range(0, len(records), STREAM_BATCH_SIZE)
+        ]
+        shapes = [("page", one_shot, body), ("stream", chunked, chunks)]
+
+        for shape, compress, source in shapes:
+            original = source if isinstance(source, bytes) else b"".join(source)
+            for name, make_compressor, decompress in codecs:
+                seconds, output = best_of(lambda value: compress(make_compressor, value), source, args.repeat)
+                assert decompress(output) == original
+                print(
+                    f"{rows:>8} {shape:7} {name:8} {seconds * 1000:>8.1f} {len(original) / 1e6 / seconds:>7.0f}"
+                    f" {len(original) / 1e6:>7.2f} {len(output) / 1e6:>7.2f} {1 - len(output) / len(original):>6.1%}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Login throughput per core for each password hasher work factor.
+
+    python test/bench_login.py
+    python test/bench_login.py --burst 200 --cores 4
+
+Times verify_password (the CPU-bound part of login) on one core. For a burst of
+--burst simultaneous logins served by --cores workers, the estimated p99 is the
+time until 99% of the burst has been hashed. Pick the largest factor whose p99
+still fits the login latency budget. Argon2 runs only if argon2-cffi is installed.
+"""
+import argparse
+import math
+import time
+
+from bench_setup import setup_django
+
+SETTINGS = [
+    ("pbkdf2", "pbkdf2_iterations", [100_000, 300_000, 600_000, 1_000_000]),
+    ("scrypt", "scrypt_work_factor", [2 ** 13, 2 ** 14, 2 ** 15]),
+    ("argon2", "argon2_time_cost", [1, 2, 3]),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=2.0, help="time spent per setting")
+    parser.add_argument("--burst", type=int, default=100)
+    parser.add_argument("--cores", type=int, default=4)
+    args = parser.parse_args()
+
+    setup_django(PASSWORD_WORK_FACTOR={})
+    from django.conf import settings
+    from django.contrib.auth.hashers import make_password
+    from utils.passwords import (
+        TunableArgon2PasswordHasher,
+        TunablePBKDF2PasswordHasher,
+        TunableScryptPasswordHasher,
+        verify_password,
+    )
+
+    hashers = {
+        "pbkdf2": TunablePBKDF2PasswordHasher(),
+        "scrypt": TunableScryptPasswordHasher(),
+        "argon2": TunableArgon2PasswordHasher(),
+    }
+
+    print(f"{'hasher':8} {'factor':>10} {'ms/login':>9} {'logins/s/core':>14} {'burst p99 ms':>13}")
+    for name, factor, values in SETTINGS:
+        for value in values:
+            settings.PASSWORD_WORK_FACTOR = {factor: value}
+            try:
+                encoded = make_password("correct horse", hasher=hashers[name])
+            except ValueError as e:
+                print(f"{name:8} skipped: {e}")
+                break
+
+            calls = 0
+            started = time.perf_counter()
+            while time.perf_counter() - started < args.seconds:
+                verify_password("correct horse", encoded)
+                calls += 1
+            per_login = (time.perf_counter() - started) / calls
+
+            burst_p99 = math.ceil(args.burst * 0.99 / args.cores) * per_login
+            print(
+                f"{name:8} {value:>10} {per_login * 1000:>9.1f} {1 / per_login:>14.1f} {burst_p99 * 1000:>13.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""p50/p99 latency of artist/get with and without the connection pool.
+
+    python test/bench_pool.py --threads 8 --requests 500 --connect-delay-ms 20
+
+Runs on the SQLite stand-in through the real WSGI handler, so connections are
+opened and closed by Django's request signals exactly as in production.
+Connecting to SQLite is nearly free, so --connect-delay-ms adds a sleep to every
+new connection to approximate an ODBC handshake with SQL Server.
+"""
+import argparse
+import statistics
+import threading
+import time
+
+from bench_setup import create_schema, seed, setup_django
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run(handler, environ_for, threads, requests_per_thread):
+    latencies = []
+    lock = threading.Lock()
+
+    def start_response(status, headers):
+        pass
+
+    def worker():
+        local = []
+        for _ in range(requests_per_thread):
+            started = time.perf_counter()
+            response = handler(environ_for(), start_response)
+            b"".join(response)
+            response.close()
+            local.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return latencies, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=500, help="requests per thread")
+    parser.add_argument("--pool-size", type=int, default=8)
+    parser.add_argument("--connect-delay-ms", type=float, default=20)
+    parser.add_argument("--rows", type=int, default=10000)
+    args = parser.parse_args()
+
+    setup_django(engine="artist_mgmt_be.backends.sqlite3", database_options={"CONN_MAX_AGE": 0, "POOL": None})
+    from django.conf import settings
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db import connections
+    from django.db.backends.sqlite3.base import DatabaseWrapper
+    from django.test import RequestFactory
+
+    db_settings = settings.DATABASES["default"]
+    create_schema()
+    seed(args.rows)
+    connections["default"].close()
+
+    connect = DatabaseWrapper.get_new_connection
+
+    def slow_connect(self, conn_params):
+        time.sleep(args.connect_delay_ms / 1000)
+        return connect(self, conn_params)
+
+    DatabaseWrapper.get_new_connection = slow_connect
+
+    handler = WSGIHandler()
+    factory = RequestFactory()
+
+    def environ_for():
+        return factory.get("/artist/get/", {"limit": 50}).environ
+
+    for label, pool in [("no pool", None), ("pool", {"SIZE": args.pool_size, "MAX_AGE": 300, "PRE_PING": True})]:
+        db_settings["POOL"] = pool
+        run(handler, environ_for, args.threads, 5)
+        latencies, elapsed = run(handler, environ_for, args.threads, args.requests)
+        print(
+            f"{label:8} p50 {percentile(latencies, 50) * 1000:7.2f} ms  "
+            f"p99 {percentile(latencies, 99) * 1000:7.2f} ms  "
+            f"mean {statistics.mean(latencies) * 1000:7.2f} ms  "
+            f"{len(latencies) / elapsed:8.0f} req/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
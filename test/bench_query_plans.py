@@ -0,0 +1,144 @@
+"""Query plans and timings of the hot lookups before and after the index migrations.
+
+    python test/bench_query_plans.py --artists 100000 --tracks 10
+    python test/bench_query_plans.py --project-db
+
+Rolls the artist, music and registration index migrations back, captures the
+plan and timing of each query, migrates forward and captures them again. By
+default this runs on the seeded SQLite stand-in; --project-db uses the database
+from artist_mgmt_be.settings instead (point it at a staging copy: the indexes
+are dropped and rebuilt there). The indexes are left applied afterwards.
+"""
+import argparse
+import os
+import statistics
+import time
+
+from bench_setup import create_schema, seed, setup_django
+
+INDEX_MIGRATIONS = [
+    ("artist", "0001_artist_list_indexes"),
+    ("music", "0001_music_lookup_indexes"),
+    ("registration", "0001_login_lookup_index"),
+]
+
+
+def hot_queries(artist_id, username):
+    from utils.dialects import get_dialect
+    from utils.repositories import ArtistRepository, MusicRepository
+
+    return [
+        ("artist list page", *get_dialect().limit(ArtistRepository.SELECT_PAGE.format(where=""), [], 51)),
+        ("artist list validator", ArtistRepository.SELECT_VALIDATOR, []),
+        ("music by artist", MusicRepository.SELECT_FOR_ARTIST.format(
+            columns=", ".join(column for column, _ in MusicRepository.artist_columns), filters=""
+        ), [artist_id]),
+        ("music by artist validator", MusicRepository.SELECT_FOR_ARTIST_VALIDATOR, [artist_id]),
+        ("music list validator", MusicRepository.SELECT_VALIDATOR, []),
+        ("login lookup", "SELECT id, username, is_superuser, password FROM auth_user WHERE username = %s", [username]),
+    ]
+
+
+def query_plan(cursor, vendor, sql, params):
+    if vendor == "microsoft":
+        cursor.execute("SET SHOWPLAN_TEXT ON")
+        try:
+            cursor.execute(sql, params)
+            lines = []
+            while True:
+                lines.extend(str(row[0]).rstrip() for row in cursor.fetchall())
+                if not cursor.nextset():
+                    break
+            # The first result set echoes the statement itself
+            return lines[1:]
+        finally:
+            cursor.execute("SET SHOWPLAN_TEXT OFF")
+
+    if vendor == "postgresql":
+        cursor.execute("EXPLAIN " + sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+    cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+    return [row[-1] for row in cursor.fetchall()]
+
+
+def timing(cursor, sql, params, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        cursor.execute(sql, params)
+        cursor.fetchall()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+
+def capture(queries, runs):
+    from django.db import connection
+
+    results = {}
+    with connection.cursor() as cursor:
+        for name, sql, params in queries:
+            results[name] = (query_plan(cursor, connection.vendor, sql, params), *timing(cursor, sql, params, runs))
+    return results
+
+
+def migrate(target):
+    from django.core.management import call_command
+
+    for app, name in INDEX_MIGRATIONS:
+        call_command("migrate", app, name if target == "forward" else "zero", verbosity=0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--project-db", action="store_true")
+    parser.add_argument("--artists", type=int, default=100_000)
+    parser.add_argument("--tracks", type=int, default=10, help="tracks per artist")
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    if args.project_db:
+        import django
+        os.environ.setdefault("DJANGO_SETTINGS_MODULE", "artist_mgmt_be.settings")
+        django.setup()
+    else:
+        setup_django(INSTALLED_APPS=[
+            "django.contrib.contenttypes", "django.contrib.auth", "registration", "artist", "music",
+        ])
+        from django.core.management import call_command
+        call_command("migrate", "auth", verbosity=0)
+        create_schema()
+        seed(args.artists, args.tracks)
+
+    from django.contrib.auth.models import User
+    from django.db import connection
+
+    username = "plan-check"
+    User.objects.get_or_create(username=username, defaults={"password": "!"})
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT MAX(artist_id) FROM Music")
+        artist_id = cursor.fetchone()[0] or 1
+    queries = hot_queries(artist_id, username)
+
+    migrate("zero")
+    before = capture(queries, args.runs)
+    migrate("forward")
+    after = capture(queries, args.runs)
+
+    print(f"vendor: {connection.vendor}\n")
+    for name, _, _ in queries:
+        before_plan, before_median, before_p95 = before[name]
+        after_plan, after_median, after_p95 = after[name]
+        print(f"== {name}")
+        print(f"   before  median {before_median:8.2f} ms  p95 {before_p95:8.2f} ms")
+        for line in before_plan:
+            print(f"     {line}")
+        print(f"   after   median {after_median:8.2f} ms  p95 {after_p95:8.2f} ms")
+        for line in after_plan:
+            print(f"     {line}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
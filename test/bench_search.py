@@ -0,0 +1,65 @@
+"""Build time of the search index and latency of /search/ style queries.
+
+    python test/bench_search.py
+    python test/bench_search.py --artists 20000 --tracks 10 --runs 50
+
+Seeds the SQLite stand-in, builds the catalogue index from it the way the
+first request after start-up does, then times a mix of exact, prefix, typo
+and multi-word queries plus the write hooks the add/update/delete views call.
+"""
+import argparse
+import statistics
+import time
+
+from bench_setup import create_schema, seed, setup_django
+
+QUERIES = ["artist 1234", "artst", "track 77", "album 500-1", "trak 1999 2", "9"]
+
+
+def timed(call, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--artists", type=int, default=20_000)
+    parser.add_argument("--tracks", type=int, default=10, help="tracks per artist")
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    create_schema()
+    seed(args.artists, args.tracks)
+
+    from search.index import CatalogueIndex
+
+    index = CatalogueIndex()
+    started = time.perf_counter()
+    index.build()
+    print(f"build: {time.perf_counter() - started:.2f} s  {index.stats()}\n")
+
+    for query in QUERIES:
+        median, p95 = timed(lambda: index.search(query, 20), args.runs)
+        top = index.search(query, 1)
+        print(f"{query!r:16} median {median:7.2f} ms  p95 {p95:7.2f} ms  top {top[0] if top else None}")
+
+    counter = iter(range(10_000_000, 20_000_000))
+
+    def write():
+        music_id = next(counter)
+        index.add_music(music_id, f"Bench Track {music_id}", "Bench Album", "rock", 1)
+        index.update_music(music_id, f"Renamed Track {music_id}", "Bench Album", "jazz")
+        index.remove_music(music_id)
+
+    median, p95 = timed(write, args.runs)
+    print(f"\nadd + update + remove track  median {median:7.2f} ms  p95 {p95:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""ServiceResult serialization time, stdlib json against orjson.
+
+    python test/bench_serialization.py
+    python test/bench_serialization.py --rows 10000 100000 --repeat 5
+
+Payloads are artist list pages shaped like get_artist's, including the date
+values returned for dob. Both encoders must produce the same document once
+parsed; the benchmark checks that before timing.
+"""
+import argparse
+import datetime
+import json
+import time
+
+from bench_setup import setup_django
+
+
+def payload(rows):
+    from utils.service_result import ServiceResult
+
+    genders = ["male", "female", "others"]
+    return ServiceResult.as_page([
+        {
+            "id": index,
+            "name": f"artist {index}",
+            "dob": datetime.date(1970, 1, 1) + datetime.timedelta(days=index % 15000),
+            "gender": genders[index % 3],
+            "address": f"{index} Main Street",
+            "first_release_year": 1990 + index % 30,
+            "no_of_albums_released": index % 12,
+        }
+        for index in range(rows, 0, -1)
+    ], "aWQ6MQ").to_dict()
+
+
+def best_of(dumps, data, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = dumps(data)
+        timings.append(time.perf_counter() - started)
+    return min(timings), len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from utils.serialization import orjson_dumps, stdlib_dumps
+
+    encoders = [("json", stdlib_dumps)]
+    if orjson_dumps is None:
+        print("orjson is not installed; timing the stdlib encoder only")
+    else:
+        encoders.append(("orjson", orjson_dumps))
+
+    print(f"{'rows':>8} {'encoder':8} {'ms':>9} {'MB':>7} {'speedup':>8}")
+    for rows in args.rows:
+        data = payload(rows)
+        if orjson_dumps is not None:
+            assert json.loads(stdlib_dumps(data)) == json.loads(orjson_dumps(data))
+
+        baseline = None
+        for name, dumps in encoders:
+            seconds, size = best_of(dumps, data, args.repeat)
+            baseline = baseline or seconds
+            print(f"{rows:>8} {name:8} {seconds * 1000:>9.1f} {size / 1e6:>7.2f} {baseline / seconds:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Shared SQLite stand-in for the benchmark scripts in this folder.
+
+The tables are created from sql_querys by utils/schema.py, the same translation
+`manage.py bootstrap_schema` runs for the sqlite and postgres DB_PROFILEs.
+"""
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+GENRES = ["rnb", "country", "classic", "rock", "jazz"]
+
+
+def setup_django(db_path=None, engine="django.db.backends.sqlite3", database_options=None, **overrides):
+    import django
+    from django.conf import settings
+
+    db_path = db_path or os.path.join(tempfile.gettempdir(), "artist_mgmt_bench.sqlite3")
+    database = {"ENGINE": engine, "NAME": db_path, **(database_options or {})}
+    options = {
+        "DEBUG": False,
+        "SECRET_KEY": "bench",
+        "ALLOWED_HOSTS": ["*"],
+        "ROOT_URLCONF": "artist_mgmt_be.urls",
+        "INSTALLED_APPS": ["django.contrib.contenttypes", "django.contrib.auth"],
+        "MIDDLEWARE": [],
+        "DATABASES": {"default": database},
+        "USE_TZ": True,
+    }
+    options.update(overrides)
+    settings.configure(**options)
+    django.setup()
+    return db_path
+
+
+def create_schema():
+    from django.db import connection
+
+    from utils.schema import bootstrap_schema
+
+    bootstrap_schema(connection)
+
+
+def seed(artists, tracks_per_artist=0, batch_size=10000):
+    from django.db import connection, transaction
+
+    rng = random.Random(42)
+    with connection.cursor() as cursor:
+        cursor.execute("DELETE FROM Music")
+        cursor.execute("DELETE FROM Artist")
+
+    for start in range(0, artists, batch_size):
+        stop = min(start + batch_size, artists)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(
+                """
+                INSERT INTO Artist (id, name, dob, gender, address, first_release_year, no_of_albums_released)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                """,
+                [
+                    (i + 1, f"Artist {i}", "1990-01-01", rng.choice("mfo"), f"{i} Main Street",
+                     rng.randint(1950, 2024), rng.randint(0, 20))
+                    for i in range(start, stop)
+                ],
+            )
+            if tracks_per_artist:
+                cursor.executemany(
+                    "INSERT INTO Music (artist_id, title, album_name, genre) VALUES (%s, %s, %s, %s)",
+                    [
+                        (i + 1, f"Track {i}-{t}", f"Album {i}-{t // 4}", rng.choice(GENRES))
+                        for i in range(start, stop)
+                        for t in range(tracks_per_artist)
+                    ],
+                )
@@ -1,10 +1,11 @@
 from django import urls
 from users import views
+from utils.async_db import for_server
 
 urlpatterns = [
-    urls.path('add/',views.add_users),
-    urls.path('get/',views.get_users),
-    urls.path('get/<int:id>/',views.get_users),
-    urls.path('delete',views.delete_users),
-    urls.path('update/',views.update_users)
+    urls.path('add/',for_server(views.add_users)),
+    urls.path('get/',for_server(views.get_users)),
+    urls.path('get/<int:id>/',for_server(views.get_users)),
+    urls.path('delete',for_server(views.delete_users)),
+    urls.path('update/',for_server(views.update_users))
 ]
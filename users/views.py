@@ -1,18 +1,23 @@
-from django.db import connection, transaction
-from django.http import JsonResponse  
+from django.db import transaction
+from utils.serialization import JsonResponse
 from django.db.utils import IntegrityError
 import json
-import hashlib
 from django.views.decorators.csrf import csrf_exempt
 
 from utils.service_result import ServiceResult
+from utils.idempotency import idempotent
+from utils.passwords import hash_password
+from utils.pagination import InvalidPageRequest, parse_page_params
+from utils.streaming import stream_batches, stream_format, stream_rows_response
+from utils.cache import EntityCache
+from utils.conditional import not_modified, validators_for, with_validators
+from utils.fields import InvalidFields, parse_fields
+from utils.repositories import GENDER_CODES, UserRepository
 
-def hash_password(password):
-    sha1 = hashlib.sha1()
-    sha1.update(password.encode('utf-8'))
-    return sha1.hexdigest()
+user_cache = EntityCache("user")
 
 @csrf_exempt
+@idempotent
 def add_users(request, *args, **kwargs):
     if request.method != "POST":
         result = ServiceResult.as_failure(error_message="Only POST method allowed", status=405)
@@ -36,20 +41,10 @@ def add_users(request, *args, **kwargs):
         password = f"{fname}{phone[-4:]}"
         hashed_password = hash_password(password)
 
-        gender_map = {"male": "m", "female": "f", "others": "o"}
-        gender = gender_map.get(gender.lower())
+        gender = GENDER_CODES.get(gender.lower())
 
         with transaction.atomic():
-            with connection.cursor() as cursor:
-                cursor.execute(
-                    '''
-                    INSERT INTO Users (first_name, last_name, email, password, phone, gender, dob, address)
-                    OUTPUT INSERTED.id
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                    ''',
-                    [fname, lname, email, hashed_password, phone, gender, dob, address]
-                )
-                user_id = cursor.fetchone()[0] 
+            user_id = UserRepository.insert([fname, lname, email, hashed_password, phone, gender, dob, address])
 
         user_data = {
             "id": user_id,
@@ -86,64 +81,54 @@ def get_users(request, *args, **kwargs):
         return JsonResponse(result.to_dict())
 
     try:
-        gender_map = {"m": "male", "f": "female", "o": "others"}
         user_id = request.GET.get("id")
-
-        with transaction.atomic():
-            
-            with connection.cursor() as cursor:
-                if user_id:
-                    cursor.execute(
-                        '''
-                        SELECT first_name, last_name, email, phone, gender, dob, address,id
-                        FROM Users WHERE id = %s
-                        ''', 
-                        [user_id]
-                    )
-                    user = cursor.fetchone()
-
-                    if not user:
-                        return JsonResponse(ServiceResult.as_failure("User ID not found", status=404).to_dict())
-
-                    user_data = {
-                        "fname": user[0],
-                        "lname": user[1],
-                        "email": user[2],
-                        "phone": user[3],
-                        "gender": gender_map.get(user[4]),
-                        "dob": user[5],
-                        "address": user[6],
-                        "id":user[7]
-                    }
-
-                    return JsonResponse(ServiceResult.as_success(user_data).to_dict())
-
-                cursor.execute(
-                    '''
-                    SELECT first_name, last_name, email, phone, gender, dob, address,id
-                    FROM Users ORDER BY ID DESC
-                    '''
-                )
-                users = cursor.fetchall()
-
-                if not users:
-                    return JsonResponse(ServiceResult.as_failure("No users found", status=404).to_dict())
-
-                users_data = [
-                    {
-                        "fname": user[0],
-                        "lname": user[1],
-                        "email": user[2],
-                        "phone": user[3],
-                        "gender": gender_map.get(user[4]),
-                        "dob": user[5],
-                        "address": user[6],
-                        "id":user[7]
-                    }
-                    for user in users
-                ]
-
-                return JsonResponse(ServiceResult.as_success(users_data).to_dict())
+        fields = parse_fields(request.GET, UserRepository.keys)
+
+        if user_id:
+            validator = UserRepository.ids_validator([user_id])
+            if not validator[0]:
+                return JsonResponse(ServiceResult.as_failure("User ID not found", status=404).to_dict())
+            etag, last_modified = validators_for(request, "user", validator)
+            cached_response = not_modified(request, etag, last_modified)
+            if cached_response:
+                return cached_response
+
+            user_data = user_cache.get_fields(user_id, fields, lambda fields: UserRepository.get(user_id, fields))
+
+            if not user_data:
+                return JsonResponse(ServiceResult.as_failure("User ID not found", status=404).to_dict())
+
+            return with_validators(
+                JsonResponse(ServiceResult.as_success(user_data).to_dict()), etag, last_modified
+            )
+
+        etag, last_modified = validators_for(request, "users", UserRepository.validator())
+        cached_response = not_modified(request, etag, last_modified)
+        if cached_response:
+            return cached_response
+
+        fmt = stream_format(request)
+        if fmt:
+            return with_validators(
+                stream_rows_response(
+                    fmt,
+                    stream_batches(request, UserRepository.iter_batches, UserRepository.aiter_batches, fields=fields),
+                    UserRepository.projection(fields).map_row,
+                ),
+                etag,
+                last_modified,
+            )
+
+        limit, after_id = parse_page_params(request.GET)
+        users_data, next_cursor = UserRepository.page(limit, after_id, fields=fields)
+
+        if not users_data:
+            return JsonResponse(ServiceResult.as_failure("No users found", status=404).to_dict())
+
+        return with_validators(JsonResponse(ServiceResult.as_page(users_data, next_cursor).to_dict()), etag, last_modified)
+
+    except (InvalidPageRequest, InvalidFields) as e:
+        return JsonResponse(ServiceResult.as_failure(str(e), status=400).to_dict())
 
     except IntegrityError as e:
         error_message = str(e)
@@ -165,17 +150,11 @@ def delete_users(request, *args, **kwargs):
             return JsonResponse(ServiceResult.as_failure("User ID is required", status=400).to_dict())
 
         with transaction.atomic():
-            with connection.cursor() as cursor:
-                cursor.execute(
-                    '''
-                    DELETE FROM Users WHERE id = %s
-                    ''', 
-                    [user_id]
-                )
-                if cursor.rowcount == 0:
-                    return JsonResponse(ServiceResult.as_failure("User not found", status=404).to_dict(), status=404)
-
-                return JsonResponse(ServiceResult.as_success("User Deleted Successfully").to_dict())
+            if UserRepository.delete(user_id) == 0:
+                return JsonResponse(ServiceResult.as_failure("User not found", status=404).to_dict(), status=404)
+
+        user_cache.invalidate(user_id)
+        return JsonResponse(ServiceResult.as_success("User Deleted Successfully").to_dict())
 
     except IntegrityError as e:
         return JsonResponse(ServiceResult.as_failure("Database error: " + str(e), status=400).to_dict())
@@ -191,7 +170,6 @@ def update_users(request, *args, **kwargs):
 
     try:
         data = json.loads(request.body.decode("utf-8"))
-        print(data)
         user_id = data.get("id")
 
         if not user_id:
@@ -210,33 +188,24 @@ def update_users(request, *args, **kwargs):
         if missing_fields:
             return JsonResponse(ServiceResult.as_failure("Required fields missing", status=400).to_dict())
         
-        gender_map = {"male": "m", "female": "f", "others": "o"}
-        gender = gender_map.get(gender.lower())
+        gender = GENDER_CODES.get(gender.lower())
 
         with transaction.atomic():
-            with connection.cursor() as cursor:    
-                cursor.execute(
-                    '''
-                    UPDATE Users 
-                    SET first_name = %s, last_name = %s, email = %s, phone = %s, gender = %s, dob = %s, address = %s,updated_at=CURRENT_TIMESTAMP
-                    WHERE id = %s
-                    ''',
-                    [fname, lname, email, phone, gender, dob, address, user_id]
-                )
-                if cursor.rowcount == 0:
-                    return JsonResponse(ServiceResult.as_failure("User not found", status=404).to_dict(), status=404)
-
-                user_data = {
-                    "id": user_id,
-                    "fname": fname,
-                    "lname": lname,
-                    "email": email,
-                    "phone": phone,
-                    "gender": original_gender,
-                    "dob": dob,
-                    "address": address
-                }
+            if UserRepository.update(user_id, [fname, lname, email, phone, gender, dob, address]) == 0:
+                return JsonResponse(ServiceResult.as_failure("User not found", status=404).to_dict(), status=404)
+
+        user_data = {
+            "id": user_id,
+            "fname": fname,
+            "lname": lname,
+            "email": email,
+            "phone": phone,
+            "gender": original_gender,
+            "dob": dob,
+            "address": address
+        }
 
+        user_cache.invalidate(user_id)
         return JsonResponse(ServiceResult.as_success(user_data).to_dict())
 
     except IntegrityError as e:
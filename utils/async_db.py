@@ -0,0 +1,56 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import SyncToAsync
+from django.conf import settings
+from django.db import connections
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def db_executor():
+    # Sized like the connection pool: more threads than connections would only queue inside the pool
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, "ASYNC_DB_WORKERS", 10),
+                    thread_name_prefix="async-db",
+                )
+    return _executor
+
+
+def _run_and_release(func, *args, **kwargs):
+    try:
+        return func(*args, **kwargs)
+    finally:
+        # Executor threads outlive the request, so release their connections the way
+        # request_finished would; with the pool this hands them straight back to it
+        for conn in connections.all(initialized_only=True):
+            conn.close_if_unusable_or_obsolete()
+
+
+async def run_db(func, *args, **kwargs):
+    """Runs blocking database code on the bounded executor instead of the single
+    thread-sensitive thread Django would otherwise use for every sync view.
+
+    SQL Server has no native asyncio driver, so thread offload is the whole
+    strategy for this backend.
+    """
+    return await SyncToAsync(_run_and_release, thread_sensitive=False, executor=db_executor())(
+        func, *args, **kwargs
+    )
+
+
+def async_view(view):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        return await run_db(view, request, *args, **kwargs)
+    return wrapper
+
+
+def for_server(view):
+    return async_view(view) if getattr(settings, "ASYNC_VIEWS", False) else view
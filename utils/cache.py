@@ -0,0 +1,83 @@
+import threading
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.conf import settings
+
+from utils.fields import project
+
+_MISSING = object()
+_registry = {}
+
+
+class EntityCache:
+    """Read-through cache of row dicts keyed by entity id.
+
+    Entries live in the Django cache named by ENTITY_CACHE_ALIAS (local memory by
+    default) and expire after that cache's TIMEOUT. Hit and miss counters are kept
+    per process so the cache can be sized from the numbers a worker reports.
+    """
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        _registry[prefix] = self
+
+    @property
+    def _cache(self):
+        return caches[getattr(settings, "ENTITY_CACHE_ALIAS", DEFAULT_CACHE_ALIAS)]
+
+    def key(self, entity_id):
+        try:
+            entity_id = int(entity_id)
+        except (TypeError, ValueError):
+            pass
+        return f"{self.prefix}:{entity_id}"
+
+    def get_or_load(self, entity_id, loader):
+        data = self._cache.get(self.key(entity_id), _MISSING)
+        if data is not _MISSING:
+            with self._lock:
+                self.hits += 1
+            return data
+
+        with self._lock:
+            self.misses += 1
+        data = loader()
+        if data is not None:
+            self._cache.set(self.key(entity_id), data, DEFAULT_TIMEOUT)
+        return data
+
+    def get_fields(self, entity_id, fields, loader):
+        """get_or_load() for a ?fields= subset; loader(fields) reads the row, None meaning every column.
+
+        A cached row is projected. On a miss only the requested columns are read and
+        nothing is cached, so entries are always whole rows.
+        """
+        if fields is None:
+            return self.get_or_load(entity_id, lambda: loader(None))
+
+        data = self._cache.get(self.key(entity_id), _MISSING)
+        with self._lock:
+            if data is _MISSING:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return project(loader(fields) if data is _MISSING else data, fields)
+
+    def invalidate(self, entity_id):
+        self._cache.delete(self.key(entity_id))
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+def cache_stats():
+    return {prefix: entity_cache.stats() for prefix, entity_cache in _registry.items()}
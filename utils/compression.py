@@ -0,0 +1,155 @@
+import re
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+_ACCEPT_ENCODING = re.compile(r"\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*")
+
+
+class GzipCompressor:
+    encoding = "gzip"
+
+    def __init__(self, level):
+        # wbits 31 writes the gzip header and trailer around the deflate stream
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data) + self._compressor.flush()
+
+    def chunk(self, data):
+        # A sync flush ends each chunk on a byte boundary so the client can decode the rows sent so far
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class BrotliCompressor:
+    encoding = "br"
+
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data) + self._compressor.finish()
+
+    def chunk(self, data):
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def accepted_encodings(header):
+    encodings = {}
+    for item in header.split(","):
+        match = _ACCEPT_ENCODING.fullmatch(item)
+        if match:
+            try:
+                encodings[match.group(1).lower()] = float(match.group(2) or 1)
+            except ValueError:
+                continue
+    return encodings
+
+
+def _compressed_chunks(content, compressor):
+    for data in content:
+        chunk = compressor.chunk(data)
+        if chunk:
+            yield chunk
+    yield compressor.finish()
+
+
+async def _acompressed_chunks(content, compressor):
+    async for data in content:
+        chunk = compressor.chunk(data)
+        if chunk:
+            yield chunk
+    yield compressor.finish()
+
+
+class CompressionMiddleware:
+    """Brotli or gzip for JSON and text responses, negotiated from Accept-Encoding.
+
+    Regular responses are compressed once they reach COMPRESSION_MIN_SIZE bytes.
+    Streaming responses (the ?stream= list exports) are always compressed, one chunk
+    at a time as the view produces them, so the body is never buffered. Brotli needs
+    the optional brotli package; without it gzip is offered alone. See
+    test/bench_compression.py for the cost of each level.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "COMPRESSION_ENABLED", True):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.min_size = getattr(settings, "COMPRESSION_MIN_SIZE", 1024)
+        self.gzip_level = getattr(settings, "COMPRESSION_GZIP_LEVEL", 3)
+        self.brotli_quality = getattr(settings, "COMPRESSION_BROTLI_QUALITY", 5)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def compressor(self, request):
+        encodings = accepted_encodings(request.headers.get("Accept-Encoding", ""))
+        if brotli is not None and encodings.get("br", 0) > 0:
+            return BrotliCompressor(self.brotli_quality)
+        if encodings.get("gzip", 0) > 0:
+            return GzipCompressor(self.gzip_level)
+        return None
+
+    def process_response(self, request, response):
+        if (
+            response.status_code != 200
+            or response.has_header("Content-Encoding")
+            or not response.get("Content-Type", "").startswith(COMPRESSIBLE_TYPES)
+            or "no-transform" in response.get("Cache-Control", "")
+        ):
+            return response
+
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+        patch_vary_headers(response, ["Accept-Encoding"])
+
+        compressor = self.compressor(request)
+        if compressor is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = _acompressed_chunks(response.streaming_content, compressor)
+            else:
+                response.streaming_content = _compressed_chunks(response.streaming_content, compressor)
+            del response["Content-Length"]
+        else:
+            content = compressor.compress(response.content)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response["Content-Length"] = str(len(content))
+
+        # The encoded body differs byte for byte, so a strong validator no longer matches it
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = compressor.encoding
+        return response
@@ -0,0 +1,51 @@
+import datetime
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from utils.dialects import get_dialect
+
+
+def _timestamp(value, zone):
+    if isinstance(value, str):
+        try:
+            value = datetime.datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if not isinstance(value, datetime.datetime):
+        return None
+    if value.tzinfo is None:
+        if zone is None:
+            return None
+        value = value.replace(tzinfo=zone)
+    return int(value.timestamp())
+
+
+def validators_for(request, scope, parts):
+    # The query string is part of the tag so each page, filter and projection revalidates on its own
+    digest = hashlib.md5(
+        json.dumps([scope, list(parts), sorted(request.GET.lists())], cls=DjangoJSONEncoder).encode("utf-8")
+    ).hexdigest()
+    # Without a known zone for naive database times there is no Last-Modified; the ETag still covers them
+    zone = get_dialect().timestamp_zone(connection)
+    timestamps = [ts for ts in (_timestamp(part, zone) for part in parts) if ts is not None]
+    return quote_etag(digest), max(timestamps) if timestamps else None
+
+
+def not_modified(request, etag, last_modified):
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        return with_validators(response, etag, last_modified)
+    return None
+
+
+def with_validators(response, etag, last_modified):
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    response["Cache-Control"] = "private, no-cache"
+    return response
@@ -0,0 +1,187 @@
+import queue
+import threading
+import time
+
+from django.db.utils import OperationalError
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(OperationalError):
+    pass
+
+
+class ConnectionPool:
+    """Raw connections for one set of connection parameters.
+
+    acquire() hands out a (connection, created_at) lease and release() takes it back,
+    so the age travels with the connection instead of in a lookup keyed by id(),
+    which a new connection can reuse once an old one is collected.
+    """
+
+    def __init__(self, connect, size=10, max_age=300, pre_ping=True, timeout=10):
+        self._connect = connect
+        self.size = size
+        self.max_age = max_age
+        self.pre_ping = pre_ping
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self.in_use = 0
+        self.retired = False
+
+    @property
+    def saturated(self):
+        return self.in_use >= self.size
+
+    def stats(self):
+        return {"size": self.size, "in_use": self.in_use, "idle": self._idle.qsize()}
+
+    def acquire(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeout(f"No database connection available within {self.timeout}s (pool size {self.size})")
+
+        try:
+            lease = self._checkout()
+        except BaseException:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self.in_use += 1
+        return lease
+
+    def release(self, lease, reusable=True):
+        with self._lock:
+            self.in_use -= 1
+        try:
+            if reusable and not self.retired and not self._expired(lease):
+                self._idle.put(lease)
+            else:
+                self._discard(lease[0])
+        finally:
+            self._slots.release()
+
+    def retire(self):
+        """Closes the idle connections; the ones still in use are closed when they come back."""
+        self.retired = True
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(conn)
+
+    def _checkout(self):
+        while True:
+            try:
+                lease = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect(), time.monotonic()
+
+            if self._expired(lease) or (self.pre_ping and not self._ping(lease[0])):
+                self._discard(lease[0])
+                continue
+            return lease
+
+    def _expired(self, lease):
+        if not self.max_age:
+            return False
+        return time.monotonic() - lease[1] > self.max_age
+
+    def _ping(self, conn):
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchall()
+            finally:
+                cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+def get_pool(alias):
+    entry = _pools.get(alias)
+    return entry[1] if entry else None
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+def _pool_for(alias, pool_settings, conn_params, connect):
+    # A pool only hands out connections opened with the parameters it was built for: when the
+    # alias's settings change (tests, override_settings, a reloaded config) it is rebuilt
+    key = _freeze(conn_params)
+    entry = _pools.get(alias)
+    if entry is None or entry[0] != key:
+        with _pools_lock:
+            entry = _pools.get(alias)
+            if entry is None or entry[0] != key:
+                if entry is not None:
+                    entry[1].retire()
+                entry = _pools[alias] = key, ConnectionPool(
+                    connect,
+                    size=pool_settings.get("SIZE", 10),
+                    max_age=pool_settings.get("MAX_AGE", 300),
+                    pre_ping=pool_settings.get("PRE_PING", True),
+                    timeout=pool_settings.get("TIMEOUT", 10),
+                )
+    return entry[1]
+
+
+class PooledDatabaseWrapperMixin:
+    """Hands out raw connections from a per-alias ConnectionPool instead of opening one per request.
+
+    Configured with a "POOL" entry next to the usual DATABASES keys; without it the
+    wrapper behaves exactly like the backend it is mixed into.
+    """
+
+    def _connection_pool(self, conn_params):
+        pool_settings = self.settings_dict.get("POOL")
+        if not pool_settings:
+            return None
+        connect = super().get_new_connection
+        return _pool_for(self.alias, pool_settings, conn_params, lambda: connect(conn_params))
+
+    def get_new_connection(self, conn_params):
+        pool = self._connection_pool(conn_params)
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        conn, created_at = pool.acquire()
+        # The lease goes back to the pool it came from, even if the alias has a new pool by then
+        self._pool_lease = pool, created_at
+        return conn
+
+    def _close(self):
+        lease = getattr(self, "_pool_lease", None)
+        if lease is None:
+            return super()._close()
+
+        pool, created_at = lease
+        self._pool_lease = None
+        try:
+            # Never hand the next borrower a connection with an open transaction
+            self.connection.rollback()
+            reusable = True
+        except Exception:
+            reusable = False
+        pool.release((self.connection, created_at), reusable=reusable)
@@ -0,0 +1,152 @@
+import datetime
+import re
+from functools import lru_cache
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+
+_VALUES = re.compile(r"\s+VALUES\b", re.IGNORECASE)
+_WHERE = re.compile(r"\s+WHERE\b", re.IGNORECASE)
+
+
+class Dialect:
+    """The SQL that differs between the databases the repositories run on.
+
+    Statements are written once in the subset every vendor accepts and passed
+    through these helpers where they disagree: returning generated or deleted
+    values, upserts and row limits. Rewritten statements are cached, so the
+    templates can be run through them on every call.
+    """
+
+    vendor = None
+    # SQL Server's OUTPUT DELETED returns the row as it was before an UPDATE, in the same statement.
+    # RETURNING only sees the new row, so elsewhere the previous values are read first
+    returns_previous_values = False
+    # A multi-row INSERT ... VALUES hands out identity values in VALUES order
+    ordered_identity = True
+    # (pattern, replacement) pairs turning the T-SQL column definitions in sql_querys into this vendor's
+    ddl_replacements = []
+
+    def limit(self, sql, params, limit):
+        return f"{sql.rstrip()} LIMIT %s", [*params, limit]
+
+    @lru_cache(maxsize=None)
+    def returning(self, sql, columns):
+        """INSERT or DELETE that returns `columns` of the rows it inserted or deleted."""
+        return f"{sql.rstrip()} RETURNING {', '.join(columns)}"
+
+    def update_returning_previous(self, cursor, table, sql, params, entity_id, columns):
+        """Runs an UPDATE ... WHERE id = %s; returns `columns` of the row as it was before, or None when it does not exist."""
+        cursor.execute(self.for_update(f"SELECT {', '.join(columns)} FROM {table} WHERE id = %s"), [entity_id])
+        previous = cursor.fetchone()
+        if previous is not None:
+            cursor.execute(sql, params)
+        return previous
+
+    def for_update(self, sql):
+        return sql
+
+    @lru_cache(maxsize=None)
+    def upsert(self, table, keys, columns, accumulate=False):
+        """INSERT of `columns` with a {rows} slot for the VALUES rows; a row whose `keys` already exist
+        is updated instead, adding to the stored values when accumulate is set."""
+        updates = ", ".join(
+            f"{column} = {table}.{column} + excluded.{column}" if accumulate else f"{column} = excluded.{column}"
+            for column in columns if column not in keys
+        )
+        return (
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES {{rows}} "
+            f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {updates}"
+        )
+
+    def timestamp_zone(self, conn):
+        """The zone of the naive datetimes CURRENT_TIMESTAMP stores in the updated_at columns, or None when unknown."""
+        return datetime.timezone.utc
+
+    def translate_ddl(self, definition):
+        for pattern, replacement in self.ddl_replacements:
+            definition = re.sub(pattern, replacement, definition, flags=re.IGNORECASE)
+        return definition
+
+
+class MicrosoftDialect(Dialect):
+    vendor = "microsoft"
+    returns_previous_values = True
+    # SQL Server makes no promise about the order identity values are assigned in
+    ordered_identity = False
+
+    def limit(self, sql, params, limit):
+        return sql.replace("SELECT", "SELECT TOP (%s)", 1), [limit, *params]
+
+    @lru_cache(maxsize=None)
+    def returning(self, sql, columns):
+        if sql.lstrip().upper().startswith("DELETE"):
+            return _WHERE.sub(f" OUTPUT {', '.join('DELETED.' + c for c in columns)} WHERE", sql, count=1)
+        return _VALUES.sub(f" OUTPUT {', '.join('INSERTED.' + c for c in columns)} VALUES", sql, count=1)
+
+    @lru_cache(maxsize=None)
+    def returning_previous(self, sql, columns):
+        return _WHERE.sub(f" OUTPUT {', '.join('DELETED.' + c for c in columns)} WHERE", sql, count=1)
+
+    def update_returning_previous(self, cursor, table, sql, params, entity_id, columns):
+        cursor.execute(self.returning_previous(sql, columns), params)
+        return cursor.fetchone()
+
+    def timestamp_zone(self, conn):
+        # GETDATE() and CURRENT_TIMESTAMP are the server's local time, which only the TIME_ZONE
+        # database setting names
+        return conn.timezone if conn.settings_dict.get("TIME_ZONE") else None
+
+    @lru_cache(maxsize=None)
+    def upsert(self, table, keys, columns, accumulate=False):
+        # HOLDLOCK keeps the range locked between the match and the insert, so concurrent upserts of
+        # the same key cannot both take the WHEN NOT MATCHED branch
+        updates = ", ".join(
+            f"{column} = target.{column} + src.{column}" if accumulate else f"{column} = src.{column}"
+            for column in columns if column not in keys
+        )
+        return (
+            f"MERGE {table} WITH (HOLDLOCK) AS target USING (VALUES {{rows}}) AS src ({', '.join(columns)}) "
+            f"ON {' AND '.join(f'target.{key} = src.{key}' for key in keys)} "
+            f"WHEN MATCHED THEN UPDATE SET {updates} "
+            f"WHEN NOT MATCHED THEN INSERT ({', '.join(columns)}) "
+            f"VALUES ({', '.join('src.' + column for column in columns)});"
+        )
+
+
+class PostgresDialect(Dialect):
+    vendor = "postgresql"
+    ddl_replacements = [
+        (r"\bINT\s+PRIMARY\s+KEY\s+IDENTITY\s*\(\s*1\s*,\s*1\s*\)", "INT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY"),
+        (r"\bDATETIME2\b", "TIMESTAMP"),
+        (r"\bGETDATE\(\)", "CURRENT_TIMESTAMP"),
+    ]
+
+    def for_update(self, sql):
+        return f"{sql.rstrip()} FOR UPDATE"
+
+    def timestamp_zone(self, conn):
+        # TIMESTAMP columns take CURRENT_TIMESTAMP in the session time zone, which Django sets to this
+        return conn.timezone
+
+
+class SQLiteDialect(Dialect):
+    # RETURNING needs SQLite 3.35 and ON CONFLICT ... DO UPDATE 3.24. Writers are serialized
+    # database-wide, so reading previous values before an UPDATE needs no row lock
+    vendor = "sqlite"
+    ddl_replacements = [
+        (r"\bINT\s+PRIMARY\s+KEY\s+IDENTITY\s*\(\s*1\s*,\s*1\s*\)", "INTEGER PRIMARY KEY AUTOINCREMENT"),
+        (r"\bDATETIME2\b", "TIMESTAMP"),
+        (r"\bGETDATE\(\)", "CURRENT_TIMESTAMP"),
+    ]
+
+
+DIALECTS = {dialect.vendor: dialect for dialect in [MicrosoftDialect(), PostgresDialect(), SQLiteDialect()]}
+
+
+def get_dialect(conn=None):
+    vendor = (conn or connection).vendor
+    try:
+        return DIALECTS[vendor]
+    except KeyError:
+        raise ImproperlyConfigured(f"No SQL dialect for the {vendor!r} database backend")
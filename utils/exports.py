@@ -0,0 +1,64 @@
+import csv
+import tempfile
+
+from asgiref.sync import sync_to_async
+from django.http import FileResponse, StreamingHttpResponse
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def csv_streaming_response(filename, header, batches, row_to_values):
+    writer = csv.writer(_Echo())
+
+    def generate():
+        yield writer.writerow(header)
+        for rows in batches:
+            yield "".join(writer.writerow(row_to_values(row)) for row in rows)
+
+    async def agenerate():
+        yield writer.writerow(header)
+        async for rows in batches:
+            yield "".join(writer.writerow(row_to_values(row)) for row in rows)
+
+    # batches comes from utils.streaming.stream_batches: an async iterator under ASGI
+    content = agenerate() if hasattr(batches, "__aiter__") else generate()
+    response = StreamingHttpResponse(content, content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+async def _aread_blocks(file, block_size):
+    read = sync_to_async(file.read, thread_sensitive=False)
+    while block := await read(block_size):
+        yield block
+
+
+def xlsx_file_response(filename, header, batches, row_to_values, serves_async=False):
+    from openpyxl import Workbook
+
+    # write_only keeps a single row in memory; the zip is spooled to a temporary
+    # file and streamed back in FileResponse blocks once the workbook is closed
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(header)
+    for rows in batches:
+        for row in rows:
+            sheet.append(row_to_values(row))
+
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    response = FileResponse(
+        output,
+        as_attachment=True,
+        filename=filename,
+        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    )
+    if serves_async:
+        # Django would read a file body into memory in one go under ASGI; the FileResponse
+        # still closes the file once the blocks are sent
+        response.streaming_content = _aread_blocks(output, response.block_size)
+    return response
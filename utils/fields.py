@@ -0,0 +1,22 @@
+class InvalidFields(ValueError):
+    pass
+
+
+def parse_fields(query, keys):
+    """Returns the keys named in ?fields=a,b, or None when the parameter is absent."""
+    value = query.get("fields", "").strip()
+    if not value:
+        return None
+
+    fields = list(dict.fromkeys(item.strip() for item in value.split(",") if item.strip()))
+    unknown = [field for field in fields if field not in keys]
+    if unknown or not fields:
+        raise InvalidFields("fields: expected a comma separated subset of " + ", ".join(keys))
+    return fields
+
+
+def project(data, fields):
+    # For rows that come back whole, e.g. from the entity cache
+    if fields is None or data is None:
+        return data
+    return {key: data[key] for key in fields}
@@ -0,0 +1,55 @@
+class InvalidFilter(ValueError):
+    pass
+
+
+def escape_like(value):
+    # [ is a wildcard on SQL Server; the others are standard LIKE wildcards
+    for char in ("\\", "%", "_", "["):
+        value = value.replace(char, "\\" + char)
+    return value
+
+
+def prefix(column):
+    def build(value):
+        return f"{column} LIKE %s ESCAPE '\\'", [escape_like(value) + "%"]
+    return build
+
+
+def contains(column):
+    def build(value):
+        return f"{column} LIKE %s ESCAPE '\\'", ["%" + escape_like(value) + "%"]
+    return build
+
+
+def integer(column, operator="="):
+    def build(value):
+        try:
+            number = int(value)
+        except ValueError:
+            raise InvalidFilter(f"expected an integer, got {value}")
+        return f"{column} {operator} %s", [number]
+    return build
+
+
+def one_of(template, choices):
+    """template holds one {} for the placeholder list, e.g. "genre IN ({})"; the value is comma separated."""
+    def build(value):
+        values = list(dict.fromkeys(item.strip().lower() for item in value.split(",") if item.strip()))
+        invalid = [item for item in values if item not in choices]
+        if invalid or not values:
+            raise InvalidFilter("expected one of: " + ", ".join(choices))
+        return template.format(", ".join(["%s"] * len(values))), values
+    return build
+
+
+def parse_filters(query, spec):
+    """Returns [(condition, params)] for the parameters in spec that are present in the query."""
+    conditions = []
+    for name, build in spec.items():
+        value = query.get(name, "").strip()
+        if value:
+            try:
+                conditions.append(build(value))
+            except InvalidFilter as e:
+                raise InvalidFilter(f"{name}: {e}")
+    return conditions
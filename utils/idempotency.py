@@ -0,0 +1,101 @@
+import hashlib
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.http import HttpResponse
+
+from utils.serialization import JsonResponse
+from utils.service_result import ServiceResult
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+_IN_FLIGHT = "in-flight"
+
+
+def _cache():
+    return caches[getattr(settings, "IDEMPOTENCY_CACHE_ALIAS", DEFAULT_CACHE_ALIAS)]
+
+
+def _cache_key(request, key):
+    # Keys are scoped per user and endpoint so two clients that pick the same key never see each other's responses
+    claims = getattr(request, "jwt_claims", None) or {}
+    scope = f"{claims.get('user_id', '')}\n{request.path}\n{key}"
+    return "idempotency:" + hashlib.sha256(scope.encode("utf-8")).hexdigest()
+
+
+def _failure(error_message, status):
+    return JsonResponse(ServiceResult.as_failure(error_message, status=status).to_dict(), status=status)
+
+
+def _replay(entry):
+    response = HttpResponse(entry["content"], status=entry["status"], content_type=entry["content_type"])
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def _storable(response):
+    # Server errors may be transient, so a retry runs the view again; the views also report
+    # some of them with HTTP 200 and the real status inside the ServiceResult body
+    if response.streaming or response.status_code >= 500:
+        return False
+    try:
+        status = json.loads(response.content).get("status") or 0
+    except (ValueError, AttributeError):
+        status = 0
+    return status < 500
+
+
+def idempotent(view):
+    """Replays the stored response of a POST retried with the same Idempotency-Key header.
+
+    The first request with a key claims it with cache.add, so a concurrent retry gets a
+    409 instead of inserting a second row. Once the view returns, its response is kept
+    for IDEMPOTENCY_KEY_TTL seconds and replayed without touching the database. Reusing
+    a key with a different body is a 422. Requests without the header run as before.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if request.method != "POST" or key is None:
+            return view(request, *args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return _failure(f"{HEADER} must be 1 to {MAX_KEY_LENGTH} characters", 400)
+
+        cache = _cache()
+        cache_key = _cache_key(request, key)
+        fingerprint = hashlib.sha256(request.body).hexdigest()
+
+        in_flight = {"state": _IN_FLIGHT, "fingerprint": fingerprint}
+        if not cache.add(cache_key, in_flight, getattr(settings, "IDEMPOTENCY_LOCK_TIMEOUT", 60)):
+            entry = cache.get(cache_key)
+            if entry is not None:
+                if entry["fingerprint"] != fingerprint:
+                    return _failure(f"{HEADER} was already used with a different request body", 422)
+                if entry["state"] == _IN_FLIGHT:
+                    return _failure(f"A request with this {HEADER} is still being processed", 409)
+                return _replay(entry)
+            # The entry expired between add and get; claim the key again
+            cache.set(cache_key, in_flight, getattr(settings, "IDEMPOTENCY_LOCK_TIMEOUT", 60))
+
+        try:
+            response = view(request, *args, **kwargs)
+        except BaseException:
+            cache.delete(cache_key)
+            raise
+
+        if not _storable(response):
+            cache.delete(cache_key)
+            return response
+
+        cache.set(cache_key, {
+            "state": "done",
+            "fingerprint": fingerprint,
+            "status": response.status_code,
+            "content_type": response["Content-Type"],
+            "content": response.content,
+        }, getattr(settings, "IDEMPOTENCY_KEY_TTL", 86400))
+        return response
+
+    return wrapper
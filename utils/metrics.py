@@ -0,0 +1,216 @@
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+# Statements past this many distinct shapes are counted under one "other" series
+MAX_STATEMENTS = 500
+
+_WHITESPACE = re.compile(r"\s+")
+_PLACEHOLDER_ROWS = re.compile(r"(\((?:%s, )*%s\))(?:, \((?:%s, )*%s\))+")
+_PLACEHOLDER_LIST = re.compile(r"%s(?:, %s)+")
+
+
+def normalize_sql(sql):
+    # Batched statements differ only in how many rows or ids they carry; fold those
+    # so each statement shape is one series
+    sql = _WHITESPACE.sub(" ", sql).strip()
+    sql = _PLACEHOLDER_ROWS.sub(r"\1, ...", sql)
+    return _PLACEHOLDER_LIST.sub("%s, ...", sql)[:300]
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip([*self.buckets, "+Inf"], self.counts):
+            total += count
+            yield bound, total
+
+
+class StatementStats:
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+
+class RequestStats:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+class MetricsRegistry:
+    """Process-local counters; each worker process exposes its own series on /metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.request_latency = {}
+            self.request_queries = {}
+            self.request_db_time = {}
+            self.statements = {}
+
+    def observe_request(self, endpoint, method, status, seconds, stats):
+        with self._lock:
+            self.request_latency.setdefault((endpoint, method, status), Histogram(LATENCY_BUCKETS)).observe(seconds)
+            self.request_queries.setdefault(endpoint, Histogram(QUERY_COUNT_BUCKETS)).observe(stats.queries)
+            self.request_db_time.setdefault(endpoint, Histogram(LATENCY_BUCKETS)).observe(stats.db_time)
+
+    def observe_statement(self, sql, seconds):
+        statement = normalize_sql(sql)
+        with self._lock:
+            stats = self.statements.get(statement)
+            if stats is None:
+                if len(self.statements) >= MAX_STATEMENTS:
+                    statement = "other"
+                stats = self.statements.setdefault(statement, StatementStats())
+            stats.count += 1
+            stats.sum += seconds
+            stats.max = max(stats.max, seconds)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            self._render_histograms(
+                lines, "http_request_duration_seconds", "Time until the view returned its response.",
+                {_labels(endpoint=e, method=m, status=s): h for (e, m, s), h in self.request_latency.items()},
+            )
+            self._render_histograms(
+                lines, "db_queries_per_request", "SQL statements executed per request.",
+                {_labels(endpoint=e): h for e, h in self.request_queries.items()},
+            )
+            self._render_histograms(
+                lines, "db_time_per_request_seconds", "Time spent executing SQL per request.",
+                {_labels(endpoint=e): h for e, h in self.request_db_time.items()},
+            )
+
+            lines.append("# HELP db_statement_duration_seconds Execution time per normalized SQL statement.")
+            lines.append("# TYPE db_statement_duration_seconds summary")
+            for statement, stats in self.statements.items():
+                labels = _labels(statement=statement)
+                lines.append(f"db_statement_duration_seconds_count{labels} {stats.count}")
+                lines.append(f"db_statement_duration_seconds_sum{labels} {stats.sum:.6f}")
+            lines.append("# HELP db_statement_max_seconds Slowest execution seen per normalized SQL statement.")
+            lines.append("# TYPE db_statement_max_seconds gauge")
+            for statement, stats in self.statements.items():
+                lines.append(f"db_statement_max_seconds{_labels(statement=statement)} {stats.max:.6f}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_histograms(lines, name, help_text, histograms):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for labels, histogram in histograms.items():
+            for bound, total in histogram.cumulative():
+                lines.append(f'{name}_bucket{labels[:-1]},le="{bound}"}} {total}')
+            lines.append(f"{name}_sum{labels} {histogram.sum:.6f}")
+            lines.append(f"{name}_count{labels} {histogram.count}")
+
+
+registry = MetricsRegistry()
+_request_stats = ContextVar("request_stats", default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        registry.observe_statement(sql, elapsed)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += elapsed
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    # Installed per connection rather than with a per-request `with execute_wrapper(...)`,
+    # because async views run their queries on executor threads with their own connections;
+    # the request's stats still reach them through the copied context
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class MetricsMiddleware:
+    """Records per-endpoint latency, query counts and SQL time for /metrics.
+
+    Streaming responses are timed until the view returns, not until the body is sent.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "METRICS_ENABLED", True):
+            raise MiddlewareNotUsed()
+        connection_created.connect(install_query_recorder, dispatch_uid="utils.metrics")
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(None, connection)
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        stats, token, started = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_stats.reset(token)
+        self._finish(request, response, stats, started)
+        return response
+
+    async def __acall__(self, request):
+        stats, token, started = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_stats.reset(token)
+        self._finish(request, response, stats, started)
+        return response
+
+    @staticmethod
+    def _start():
+        stats = RequestStats()
+        return stats, _request_stats.set(stats), time.perf_counter()
+
+    @staticmethod
+    def _finish(request, response, stats, started):
+        match = getattr(request, "resolver_match", None)
+        endpoint = match.route if match else "<unmatched>"
+        registry.observe_request(endpoint, request.method, response.status_code, time.perf_counter() - started, stats)
@@ -0,0 +1,17 @@
+from django.db import migrations
+
+
+def vendor_sql(forward, reverse):
+    """RunPython operation that executes the statements listed for the current
+    connection.vendor ("microsoft", "postgresql", "sqlite").
+
+    The tables behind the views are plain SQL tables rather than models, so index
+    changes go through migrations as raw DDL; vendors without an entry are skipped.
+    """
+    def runner(statements):
+        def run(apps, schema_editor):
+            for sql in statements.get(schema_editor.connection.vendor, []):
+                schema_editor.execute(sql)
+        return run
+
+    return migrations.RunPython(runner(forward), runner(reverse))
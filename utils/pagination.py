@@ -0,0 +1,63 @@
+import base64
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+class InvalidPageRequest(ValueError):
+    pass
+
+
+def encode_cursor(last_id):
+    return base64.urlsafe_b64encode(f"id:{last_id}".encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        prefix, _, value = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8").partition(":")
+        if prefix != "id":
+            raise ValueError(cursor)
+        return int(value)
+    except (ValueError, UnicodeError):
+        raise InvalidPageRequest("Invalid cursor")
+
+
+def parse_page_params(query):
+    limit = query.get("limit")
+    after = query.get("after")
+
+    if limit in [None, ""]:
+        limit = DEFAULT_LIMIT
+    else:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise InvalidPageRequest("limit must be an integer")
+        if limit < 1:
+            raise InvalidPageRequest("limit must be positive")
+        limit = min(limit, MAX_LIMIT)
+
+    after_id = decode_cursor(after) if after else None
+    return limit, after_id
+
+
+def split_page(rows, limit, id_index=0):
+    # Callers fetch limit + 1 rows so the presence of a next page is known without a COUNT(*)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1][id_index])
+
+
+def keyset_where(after_id, column="id", filters=()):
+    # filters are (condition, params) pairs ANDed with the keyset condition, see utils/filters.py
+    conditions = [condition for condition, _ in filters]
+    params = [param for _, filter_params in filters for param in filter_params]
+    if after_id is not None:
+        conditions.append(f"{column} < %s")
+        params.append(after_id)
+    if not conditions:
+        return "", []
+    return "WHERE " + " AND ".join(conditions), params
+
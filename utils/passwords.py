@@ -0,0 +1,60 @@
+import hashlib
+import hmac
+import re
+
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    PBKDF2PasswordHasher,
+    ScryptPasswordHasher,
+    check_password,
+    make_password,
+)
+
+# Rows written before the switch to Django's hashers hold a bare, unsalted SHA-1 hex digest
+_LEGACY_SHA1 = re.compile(r"^[0-9a-f]{40}$")
+
+
+def _work_factor(name, default):
+    return getattr(settings, "PASSWORD_WORK_FACTOR", {}).get(name, default)
+
+
+class TunablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return _work_factor("pbkdf2_iterations", PBKDF2PasswordHasher.iterations)
+
+
+class TunableArgon2PasswordHasher(Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return _work_factor("argon2_time_cost", Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return _work_factor("argon2_memory_cost", Argon2PasswordHasher.memory_cost)
+
+
+class TunableScryptPasswordHasher(ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return _work_factor("scrypt_work_factor", ScryptPasswordHasher.work_factor)
+
+
+def hash_password(password):
+    return make_password(password)
+
+
+def verify_password(password, encoded):
+    """Returns (is_valid, needs_rehash).
+
+    needs_rehash is set for legacy SHA-1 rows and for hashes made with another
+    algorithm or work factor than the current first entry in PASSWORD_HASHERS.
+    """
+    if encoded and _LEGACY_SHA1.match(encoded):
+        legacy = hashlib.sha1(password.encode("utf-8")).hexdigest()
+        return hmac.compare_digest(legacy, encoded), True
+
+    outdated = []
+    is_valid = check_password(password, encoded, setter=outdated.append)
+    return is_valid, bool(outdated)
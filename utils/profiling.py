@@ -0,0 +1,143 @@
+import cProfile
+import io
+import itertools
+import os
+import pstats
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.http import HttpResponse
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_PARAM = "profile"
+PROFILE_MODES = {"1": "inline", "inline": "inline", "store": "store"}
+STATS_LIMIT = 60
+
+_SLUG = re.compile(r"[^A-Za-z0-9]+")
+
+
+class _CProfile:
+    extension = "prof"
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+
+    def start(self):
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+
+    def save(self, path):
+        self.profiler.dump_stats(path)
+
+    def render(self):
+        output = io.StringIO()
+        pstats.Stats(self.profiler, stream=output).sort_stats("cumulative").print_stats(STATS_LIMIT)
+        return output.getvalue(), "text/plain; charset=utf-8"
+
+
+class _Pyinstrument:
+    extension = "html"
+
+    def __init__(self):
+        from pyinstrument import Profiler
+        self.profiler = Profiler()
+
+    def start(self):
+        self.profiler.start()
+
+    def stop(self):
+        self.profiler.stop()
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.profiler.output_html())
+
+    def render(self):
+        return self.profiler.output_html(), "text/html; charset=utf-8"
+
+
+PROFILERS = {
+    "cprofile": _CProfile,
+    "pyinstrument": _Pyinstrument,
+}
+
+
+class ProfilingMiddleware:
+    """Profiles selected requests, from this middleware down through the view and
+    the response serialization.
+
+    A request is profiled when an admin (is_admin claim in the verified JWT) sends
+    `X-Profile: inline|store` or `?profile=inline|store`, or when it is the Nth
+    request under PROFILING_SAMPLE_RATE = N; sampled profiles are always stored.
+    `inline` replaces the response with the report. Stored profiles go to
+    PROFILING_DIR (.prof for cProfile, load with pstats or snakeviz).
+
+    Sync only: the profilers follow one thread, and async views run their work on
+    the DB executor threads. With PROFILING_ENABLED off the middleware is removed
+    from the chain entirely.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "PROFILING_ENABLED", False):
+            raise MiddlewareNotUsed()
+
+        engine = getattr(settings, "PROFILING_ENGINE", "cprofile")
+        if engine not in PROFILERS:
+            raise ImproperlyConfigured(f"PROFILING_ENGINE must be one of {', '.join(PROFILERS)}")
+        self.profiler_class = PROFILERS[engine]
+        self.directory = getattr(settings, "PROFILING_DIR", "profiles")
+        self.sample_rate = getattr(settings, "PROFILING_SAMPLE_RATE", 0)
+        self.counter = itertools.count(1)
+        # The interpreter allows one active profiler, so concurrent picks are served unprofiled
+        self.lock = threading.Lock()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = self._mode(request)
+        if not mode or not self.lock.acquire(blocking=False):
+            return self.get_response(request)
+
+        try:
+            profiler = self.profiler_class()
+            started = time.perf_counter()
+            profiler.start()
+            try:
+                response = self.get_response(request)
+                if response.streaming and not response.is_async:
+                    # Pull the body inside the profile, otherwise streamed rows would be fetched after it stops.
+                    # Async bodies fetch on the DB executor threads, which the profiler does not follow anyway
+                    response.streaming_content = [b"".join(response.streaming_content)]
+            finally:
+                profiler.stop()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        finally:
+            self.lock.release()
+
+        if mode == "inline":
+            report, content_type = profiler.render()
+            profiled = HttpResponse(report, content_type=content_type)
+            profiled["X-Profile-Status"] = str(response.status_code)
+            profiled["X-Profile-Duration-Ms"] = f"{elapsed_ms:.1f}"
+            return profiled
+
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}-{request.method}-{_SLUG.sub('_', request.path).strip('_')}-{elapsed_ms:.0f}ms"
+        profiler.save(os.path.join(self.directory, f"{name}.{profiler.extension}"))
+        return response
+
+    def _mode(self, request):
+        requested = request.headers.get(PROFILE_HEADER) or request.GET.get(PROFILE_PARAM)
+        if requested:
+            # is_admin is only set for superusers, see registration.views.login
+            claims = getattr(request, "jwt_claims", None) or {}
+            if claims.get("is_admin") and requested.lower() in PROFILE_MODES:
+                return PROFILE_MODES[requested.lower()]
+
+        if self.sample_rate and next(self.counter) % self.sample_rate == 0:
+            return "store"
+        return None
@@ -0,0 +1,164 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.module_loading import import_string
+
+from utils.db_pool import get_pool
+from utils.serialization import JsonResponse
+from utils.service_result import ServiceResult
+
+
+def refill(state, rate, burst, now):
+    """Token bucket: state is (tokens, updated_at) or None for a full bucket; returns the tokens available now."""
+    if state is None:
+        return burst
+    tokens, updated_at = state
+    return min(burst, tokens + (now - updated_at) * rate)
+
+
+class MemoryBucketStore:
+    """Buckets kept in this process, least recently used evicted past RATE_LIMIT_MAX_KEYS.
+
+    Each worker enforces its own budget, so with N workers a client can get up to N
+    times the configured rate; use CacheBucketStore to share buckets between them.
+    """
+
+    blocking = False
+
+    def __init__(self):
+        self.max_keys = getattr(settings, "RATE_LIMIT_MAX_KEYS", 100000)
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst):
+        """Returns (allowed, seconds until a token is available)."""
+        now = time.monotonic()
+        with self._lock:
+            tokens = refill(self._buckets.pop(key, None), rate, burst, now)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0 if allowed else (1 - tokens) / rate
+
+
+class CacheBucketStore:
+    """Buckets in the Django cache named by RATE_LIMIT_CACHE_ALIAS, e.g. Redis shared by every worker.
+
+    The read-modify-write is not atomic across workers, so concurrent requests from one
+    client can overshoot its budget by a request or two; it never under-admits.
+    """
+
+    blocking = True
+
+    def __init__(self):
+        self.cache = caches[getattr(settings, "RATE_LIMIT_CACHE_ALIAS", DEFAULT_CACHE_ALIAS)]
+
+    def take(self, key, rate, burst):
+        now = time.time()
+        cache_key = "ratelimit:" + key
+        tokens = refill(self.cache.get(cache_key), rate, burst, now)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        # Expire once the bucket would be full again; a missing entry reads as full
+        self.cache.set(cache_key, (tokens, now), math.ceil((burst - tokens) / rate) + 1)
+        return allowed, 0 if allowed else (1 - tokens) / rate
+
+
+def client_ip(request, trusted_proxies=0):
+    """The address trusted_proxies hops back in X-Forwarded-For, else REMOTE_ADDR."""
+    if trusted_proxies:
+        forwarded = [ip.strip() for ip in request.headers.get("X-Forwarded-For", "").split(",") if ip.strip()]
+        if len(forwarded) >= trusted_proxies:
+            return forwarded[-trusted_proxies]
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def _failure(error_message, status, retry_after):
+    response = JsonResponse(ServiceResult.as_failure(error_message, status=status).to_dict(), status=status)
+    response["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+class RateLimitMiddleware:
+    """Per-client token buckets for the routes in RATE_LIMITS, plus load shedding.
+
+    Runs after JWTAuthenticationMiddleware so authenticated clients are keyed by their
+    user id; everyone else is keyed by IP. The longest RATE_LIMITS prefix matching the
+    path picks the budget. While the database connection pool is saturated, requests
+    are turned away with a 503 before a view can queue for a connection.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "RATE_LIMIT_ENABLED", True):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.store = import_string(getattr(settings, "RATE_LIMIT_STORE", "utils.rate_limit.MemoryBucketStore"))()
+        # Longest prefix first so /music/get/ can have a different budget than /music/
+        self.budgets = sorted(
+            (
+                (prefix, budget["RATE"] / budget.get("PER", 1), budget.get("BURST", budget["RATE"]))
+                for prefix, budget in getattr(settings, "RATE_LIMITS", {}).items()
+            ),
+            key=lambda item: len(item[0]),
+            reverse=True,
+        )
+        self.shed_on_saturation = getattr(settings, "RATE_LIMIT_SHED_ON_POOL_SATURATION", True)
+        self.shed_exempt_paths = tuple(getattr(settings, "RATE_LIMIT_SHED_EXEMPT_PATHS", []))
+        self.trusted_proxies = getattr(settings, "RATE_LIMIT_TRUSTED_PROXIES", 0)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self._check(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        if self.store.blocking:
+            rejected = await sync_to_async(self._check, thread_sensitive=False)(request)
+        else:
+            rejected = self._check(request)
+        return rejected or await self.get_response(request)
+
+    def client_key(self, request):
+        claims = getattr(request, "jwt_claims", None)
+        if claims and claims.get("user_id") is not None:
+            return f"user:{claims['user_id']}"
+        return "ip:" + client_ip(request, self.trusted_proxies)
+
+    def _saturated(self):
+        for alias in connections:
+            pool = get_pool(alias)
+            if pool is not None and pool.saturated:
+                return True
+        return False
+
+    def _check(self, request):
+        if request.method == "OPTIONS":
+            return None
+
+        for prefix, rate, burst in self.budgets:
+            if request.path.startswith(prefix):
+                allowed, retry_after = self.store.take(f"{prefix}|{self.client_key(request)}", rate, burst)
+                if not allowed:
+                    return _failure("Too many requests, slow down", 429, retry_after)
+                break
+
+        if self.shed_on_saturation and not request.path.startswith(self.shed_exempt_paths) and self._saturated():
+            return _failure("Server is busy, retry shortly", 503, 1)
+        return None
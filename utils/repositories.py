@@ -0,0 +1,501 @@
+from django.db import connection
+
+from utils.async_db import run_db
+from utils.dialects import get_dialect
+from utils.filters import contains, integer, one_of, prefix
+from utils.pagination import keyset_where, split_page
+from utils.streaming import STREAM_BATCH_SIZE, iter_batches
+
+GENDER_NAMES = {"m": "male", "f": "female", "o": "others"}
+GENDER_CODES = {"male": "m", "female": "f", "others": "o"}
+# Mirrors the CHECK constraint on Music.genre in sql_querys
+MUSIC_GENRES = ["rnb", "country", "classic", "rock", "jazz"]
+# SQL Server caps a statement at 2100 parameters
+MAX_STATEMENT_PARAMETERS = 2100
+
+
+def rows_per_statement(row, headroom=100):
+    """How many copies of a VALUES `row` fit in one statement, leaving headroom for its other parameters."""
+    return (MAX_STATEMENT_PARAMETERS - headroom) // row.count("%s")
+
+
+def row_mapper(keys, converters=None):
+    """Compiles `lambda row: {keys[0]: row[0], ...}` for a fixed column order.
+
+    A dict display with constant keys is cheaper per row than dict(zip(...)) and
+    avoids the per-row index lookups of hand-written mapping code.
+    """
+    converters = converters or {}
+    namespace = {}
+    items = []
+    for index, key in enumerate(keys):
+        if key in converters:
+            namespace[f"convert_{index}"] = converters[key]
+            items.append(f"{key!r}: convert_{index}(row[{index}])")
+        else:
+            items.append(f"{key!r}: row[{index}]")
+    exec(f"def map_row(row):\n    return {{{', '.join(items)}}}", namespace)
+    return namespace["map_row"]
+
+
+class Projection:
+    """SELECT list and row mapper for a subset of a repository's keys."""
+
+    def __init__(self, repository, keys):
+        columns = [column for column, key in repository.columns if key in keys]
+        id_column = next(column for column, key in repository.columns if key == "id")
+        if id_column not in columns:
+            # Still read for the page cursor; the mapper only looks at the leading columns
+            columns.append(id_column)
+        select_list = ", ".join(columns)
+
+        self.keys = keys
+        self.columns = columns
+        self.id_index = columns.index(id_column)
+        self.map_row = row_mapper(keys, repository.converters)
+        self.SELECT_BY_ID = f"SELECT {select_list} FROM {repository.table} WHERE id = %s"
+        self.SELECT_PAGE = f"SELECT {select_list} FROM {repository.table} {{where}} ORDER BY id DESC"
+
+
+class Repository:
+    table = None
+    # (column, key) pairs in SELECT order; key is the name used in the response dict
+    columns = ()
+    converters = {}
+    # query parameter -> condition builder from utils/filters.py
+    filters = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.keys = [key for _, key in cls.columns]
+        cls.id_index = cls.keys.index("id")
+        full = Projection(cls, tuple(cls.keys))
+        cls._projections = {full.keys: full}
+        cls.map_row = staticmethod(full.map_row)
+
+        select_list = ", ".join(column for column, _ in cls.columns)
+        cls.SELECT_BY_ID = full.SELECT_BY_ID
+        cls.SELECT_PAGE = full.SELECT_PAGE
+        cls.SELECT_ALL = f"SELECT {select_list} FROM {cls.table} ORDER BY id DESC"
+        cls.SELECT_VALIDATOR = f"SELECT COUNT(*), MAX(updated_at) FROM {cls.table}"
+        cls.SELECT_IDS_VALIDATOR = f"SELECT COUNT(*), MAX(updated_at) FROM {cls.table} WHERE id IN ({{ids}})"
+        cls.DELETE_BY_ID = f"DELETE FROM {cls.table} WHERE id = %s"
+
+    @classmethod
+    def projection(cls, fields=None):
+        """fields comes from utils.fields.parse_fields; None selects every column."""
+        keys = tuple(key for key in cls.keys if fields is None or key in fields)
+        projection = cls._projections.get(keys)
+        if projection is None:
+            projection = cls._projections[keys] = Projection(cls, keys)
+        return projection
+
+    @classmethod
+    def get(cls, entity_id, fields=None):
+        projection = cls.projection(fields)
+        with connection.cursor() as cursor:
+            cursor.execute(projection.SELECT_BY_ID, [entity_id])
+            row = cursor.fetchone()
+        return projection.map_row(row) if row else None
+
+    @classmethod
+    def page_rows(cls, limit, after_id=None, filters=(), fields=None):
+        """Up to limit unmapped rows after after_id, in the projection's column order."""
+        where, params = keyset_where(after_id, filters=filters)
+        with connection.cursor() as cursor:
+            cursor.execute(*get_dialect().limit(cls.projection(fields).SELECT_PAGE.format(where=where), params, limit))
+            return cursor.fetchall()
+
+    @classmethod
+    def page(cls, limit, after_id=None, filters=(), fields=None):
+        projection = cls.projection(fields)
+        rows, next_cursor = split_page(cls.page_rows(limit + 1, after_id, filters, fields), limit, projection.id_index)
+        map_row = projection.map_row
+        return [map_row(row) for row in rows], next_cursor
+
+    @classmethod
+    def iter_batches(cls, filters=(), batch_size=STREAM_BATCH_SIZE, fields=None):
+        where, params = keyset_where(None, filters=filters)
+        return iter_batches(cls.projection(fields).SELECT_PAGE.format(where=where), params, batch_size)
+
+    @classmethod
+    async def aiter_batches(cls, filters=(), batch_size=STREAM_BATCH_SIZE, fields=None):
+        """iter_batches for the event loop. Each batch is its own keyset page fetched on the DB executor,
+        so no cursor crosses threads and no connection is held while the client reads."""
+        id_index = cls.projection(fields).id_index
+        after_id = None
+        while True:
+            rows = await run_db(cls.page_rows, batch_size, after_id, filters, fields)
+            if rows:
+                yield rows
+            if len(rows) < batch_size:
+                return
+            after_id = rows[-1][id_index]
+
+    @classmethod
+    def validator(cls):
+        with connection.cursor() as cursor:
+            cursor.execute(cls.SELECT_VALIDATOR)
+            return cursor.fetchone()
+
+    @classmethod
+    def ids_validator(cls, entity_ids):
+        """validator() for the given rows only; COUNT(*) is 0 when none of them exist."""
+        with connection.cursor() as cursor:
+            cursor.execute(cls.SELECT_IDS_VALIDATOR.format(ids=", ".join(["%s"] * len(entity_ids))), entity_ids)
+            return cursor.fetchone()
+
+    @classmethod
+    def delete(cls, entity_id):
+        with connection.cursor() as cursor:
+            cursor.execute(cls.DELETE_BY_ID, [entity_id])
+            return cursor.rowcount
+
+
+class ArtistRepository(Repository):
+    table = "Artist"
+    columns = (
+        ("id", "id"),
+        ("name", "name"),
+        ("dob", "dob"),
+        ("gender", "gender"),
+        ("address", "address"),
+        ("first_release_year", "first_release_year"),
+        ("no_of_albums_released", "no_of_albums_released"),
+    )
+    converters = {"gender": GENDER_NAMES.get}
+    filters = {
+        "name": prefix("name"),
+        "name_contains": contains("name"),
+        "first_release_year": integer("first_release_year"),
+        "first_release_year_min": integer("first_release_year", ">="),
+        "first_release_year_max": integer("first_release_year", "<="),
+        # Artists with at least one track in the genre; served by IX_Music_artist_id
+        "genre": one_of(
+            "EXISTS (SELECT 1 FROM Music WHERE Music.artist_id = Artist.id AND Music.genre IN ({}))", MUSIC_GENRES
+        ),
+    }
+
+    INSERT = '''
+        INSERT INTO Artist (name, dob, gender, address, first_release_year, no_of_albums_released)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        '''
+    INSERT_MANY = '''
+        INSERT INTO Artist (name, dob, gender, address, first_release_year, no_of_albums_released)
+        VALUES {rows}
+        '''
+    INSERT_ROW = "(%s, %s, %s, %s, %s, %s)"
+    INSERT_MANY_RETURNING = ("id", "first_release_year", "no_of_albums_released")
+    UPDATE = '''
+        UPDATE Artist SET name = %s, dob = %s, gender = %s, address = %s, first_release_year = %s,
+        no_of_albums_released = %s, updated_at = CURRENT_TIMESTAMP WHERE id = %s
+        '''
+    UPDATE_RETURNING_PREVIOUS = ("first_release_year", "no_of_albums_released")
+    SELECT_MANY = "SELECT {columns} FROM Artist WHERE Artist.id IN ({ids}) ORDER BY Artist.id DESC"
+    SELECT_MANY_WITH_MUSIC = '''
+        SELECT {columns}, Music.id, Music.title, Music.album_name, Music.genre FROM Artist
+        LEFT JOIN Music ON Music.artist_id = Artist.id WHERE Artist.id IN ({ids}) ORDER BY Artist.id DESC, Music.id
+        '''
+    SELECT_MANY_VALIDATOR_WITH_MUSIC = '''
+        SELECT COUNT(DISTINCT Artist.id), MAX(Artist.updated_at), COUNT(Music.id), MAX(Music.updated_at) FROM Artist
+        LEFT JOIN Music ON Music.artist_id = Artist.id WHERE Artist.id IN ({ids})
+        '''
+    EXPORT_WITH_MUSIC = '''
+        SELECT Artist.id, Artist.name, Artist.dob, Artist.gender, Artist.address, Artist.first_release_year,
+        Artist.no_of_albums_released, Music.id, Music.title, Music.album_name, Music.genre
+        FROM Artist LEFT JOIN Music ON Music.artist_id = Artist.id {where} ORDER BY Artist.id DESC, Music.id
+        '''
+    # Keyset position (artist id, music id) in EXPORT_WITH_MUSIC order. An artist without tracks has a single
+    # row with a NULL music id, and `Music.id > NULL` matches nothing, so the export moves on to the next artist
+    EXPORT_AFTER = "WHERE Artist.id < %s OR (Artist.id = %s AND Music.id > %s)"
+
+    @classmethod
+    def insert(cls, values):
+        with connection.cursor() as cursor:
+            cursor.execute(get_dialect().returning(cls.INSERT, ("id",)), values)
+            return cursor.fetchone()[0]
+
+    @classmethod
+    def insert_many(cls, rows):
+        """Returns (id, first_release_year, no_of_albums_released) for each inserted row."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                get_dialect().returning(cls.INSERT_MANY, cls.INSERT_MANY_RETURNING).format(
+                    rows=", ".join([cls.INSERT_ROW] * len(rows))
+                ),
+                [value for values in rows for value in values]
+            )
+            return cursor.fetchall()
+
+    @classmethod
+    def update(cls, artist_id, values):
+        """Returns the previous (first_release_year, no_of_albums_released), or None when the artist does not exist."""
+        with connection.cursor() as cursor:
+            return get_dialect().update_returning_previous(
+                cursor, cls.table, cls.UPDATE, [*values, artist_id], artist_id, cls.UPDATE_RETURNING_PREVIOUS
+            )
+
+    @classmethod
+    def get_many(cls, artist_ids, include_music=False, fields=None):
+        """Returns {id: artist} from one query; with include_music each artist carries its tracks under "music"."""
+        projection = cls.projection(fields)
+        sql = cls.SELECT_MANY_WITH_MUSIC if include_music else cls.SELECT_MANY
+        with connection.cursor() as cursor:
+            cursor.execute(
+                sql.format(
+                    columns=", ".join("Artist." + column for column in projection.columns),
+                    ids=", ".join(["%s"] * len(artist_ids)),
+                ),
+                artist_ids
+            )
+            rows = cursor.fetchall()
+
+        map_row, id_index = projection.map_row, projection.id_index
+        if not include_music:
+            return {row[id_index]: map_row(row) for row in rows}
+
+        # Rows arrive grouped by artist, so tracks are attached in the same pass that builds the artists
+        map_track = MusicRepository.map_row
+        track_start = len(projection.columns)
+        artists = {}
+        tracks = None
+        for row in rows:
+            artist_id = row[id_index]
+            if artist_id not in artists:
+                artist = artists[artist_id] = map_row(row)
+                tracks = artist["music"] = []
+            if row[track_start] is not None:
+                tracks.append(map_track(row[track_start:]))
+        return artists
+
+    @classmethod
+    def many_validator(cls, artist_ids, include_music=False):
+        """ids_validator() for get_many; with include_music the artists' tracks count as well. The first value is
+        the number of artists found either way."""
+        if not include_music:
+            return cls.ids_validator(artist_ids)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                cls.SELECT_MANY_VALIDATOR_WITH_MUSIC.format(ids=", ".join(["%s"] * len(artist_ids))), artist_ids
+            )
+            return cursor.fetchone()
+
+    @classmethod
+    def export_batches(cls, include_music=False, batch_size=STREAM_BATCH_SIZE):
+        return iter_batches(cls.EXPORT_WITH_MUSIC.format(where="") if include_music else cls.SELECT_ALL, [], batch_size)
+
+    @classmethod
+    def export_page_rows(cls, limit, after=None):
+        where, params = ("", []) if after is None else (cls.EXPORT_AFTER, [after[0], *after])
+        with connection.cursor() as cursor:
+            cursor.execute(*get_dialect().limit(cls.EXPORT_WITH_MUSIC.format(where=where), params, limit))
+            return cursor.fetchall()
+
+    @classmethod
+    async def aexport_batches(cls, include_music=False, batch_size=STREAM_BATCH_SIZE):
+        """export_batches for the event loop, one keyset page per batch like aiter_batches."""
+        if not include_music:
+            async for rows in cls.aiter_batches(batch_size=batch_size):
+                yield rows
+            return
+        after = None
+        while True:
+            rows = await run_db(cls.export_page_rows, batch_size, after)
+            if rows:
+                yield rows
+            if len(rows) < batch_size:
+                return
+            after = rows[-1][0], rows[-1][7]
+
+
+class MusicRepository(Repository):
+    table = "Music"
+    columns = (
+        ("id", "id"),
+        ("title", "title"),
+        ("album_name", "album_name"),
+        ("genre", "genre"),
+    )
+    filters = {
+        "title": prefix("Music.title"),
+        "title_contains": contains("Music.title"),
+        "album_name": prefix("Music.album_name"),
+        "album_name_contains": contains("Music.album_name"),
+        "genre": one_of("Music.genre IN ({})", MUSIC_GENRES),
+    }
+
+    SELECT_FOR_ARTIST = '''
+        SELECT {columns} FROM Music
+        INNER JOIN Artist ON Music.artist_id = Artist.id WHERE Music.artist_id = %s {filters}
+        '''
+    SELECT_FOR_ARTIST_VALIDATOR = '''
+        SELECT COUNT(*), MAX(Music.updated_at), MAX(Artist.updated_at) FROM Music
+        INNER JOIN Artist ON Music.artist_id = Artist.id WHERE Music.artist_id = %s
+        '''
+    INSERT = '''
+        INSERT INTO Music (artist_id, title, album_name, genre) VALUES (%s, %s, %s, %s)
+        '''
+    UPDATE = '''
+        UPDATE Music SET title = %s, album_name = %s, genre = %s, updated_at = CURRENT_TIMESTAMP WHERE id = %s
+        '''
+    UPDATE_RETURNING_PREVIOUS = ("artist_id", "genre")
+    INSERT_MANY = "INSERT INTO Music (artist_id, title, album_name, genre) VALUES {rows}"
+    INSERT_ROW = "(%s, %s, %s, %s)"
+    # SQL Server only: identity values are not promised in VALUES order there, but MERGE ... ON 1 = 0
+    # always inserts, and unlike INSERT it can OUTPUT the source index next to the new id
+    INSERT_BATCH = '''
+        MERGE INTO Music USING (VALUES {rows}) AS src (idx, artist_id, title, album_name, genre) ON 1 = 0
+        WHEN NOT MATCHED THEN INSERT (artist_id, title, album_name, genre)
+        VALUES (src.artist_id, src.title, src.album_name, src.genre) OUTPUT src.idx, INSERTED.id;
+        '''
+    # SQL Server only, see update_batch for the other databases
+    UPDATE_BATCH = '''
+        UPDATE Music SET title = src.title, album_name = src.album_name, genre = src.genre,
+        updated_at = CURRENT_TIMESTAMP OUTPUT src.idx, INSERTED.id, DELETED.artist_id, DELETED.genre FROM Music
+        INNER JOIN (VALUES {rows}) AS src (idx, id, title, album_name, genre) ON Music.id = src.id
+        '''
+    SELECT_PREVIOUS_BATCH = "SELECT id, artist_id, genre FROM Music WHERE id IN ({ids})"
+    DELETE_BATCH = "DELETE FROM Music WHERE id IN ({ids})"
+    BATCH_ROW = "(%s, %s, %s, %s, %s)"
+
+    SELECT_ALL_WITH_ARTIST_ID = "SELECT id, title, album_name, genre, artist_id FROM Music"
+
+    artist_columns = (
+        ("Music.id", "id"),
+        ("Music.title", "title"),
+        ("Music.album_name", "album_name"),
+        ("Music.genre", "genre"),
+        ("Artist.name", "artist_name"),
+    )
+    artist_keys = [key for _, key in artist_columns]
+    # keys -> (SELECT list, row mapper), like Repository.projection
+    _artist_projections = {}
+
+    @classmethod
+    def for_artist(cls, artist_id, filters=(), fields=None):
+        """fields is a subset of artist_keys; None selects every column."""
+        keys = tuple(key for key in cls.artist_keys if fields is None or key in fields)
+        projection = cls._artist_projections.get(keys)
+        if projection is None:
+            select_list = ", ".join(column for column, key in cls.artist_columns if key in keys)
+            projection = cls._artist_projections[keys] = select_list, row_mapper(keys)
+        select_list, map_row = projection
+        conditions = "".join(" AND " + condition for condition, _ in filters)
+        params = [artist_id, *(param for _, filter_params in filters for param in filter_params)]
+        with connection.cursor() as cursor:
+            cursor.execute(cls.SELECT_FOR_ARTIST.format(columns=select_list, filters=conditions), params)
+            rows = cursor.fetchall()
+        return [map_row(row) for row in rows]
+
+    @classmethod
+    def iter_with_artist_id(cls, batch_size=STREAM_BATCH_SIZE):
+        return iter_batches(cls.SELECT_ALL_WITH_ARTIST_ID, [], batch_size)
+
+    @classmethod
+    def artist_validator(cls, artist_id):
+        with connection.cursor() as cursor:
+            cursor.execute(cls.SELECT_FOR_ARTIST_VALIDATOR, [artist_id])
+            return cursor.fetchone()
+
+    @classmethod
+    def insert(cls, values):
+        with connection.cursor() as cursor:
+            cursor.execute(get_dialect().returning(cls.INSERT, ("id",)), values)
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    @classmethod
+    def update(cls, music_id, values):
+        """Returns the track's (artist_id, previous genre), or None when it does not exist."""
+        with connection.cursor() as cursor:
+            return get_dialect().update_returning_previous(
+                cursor, cls.table, cls.UPDATE, [*values, music_id], music_id, cls.UPDATE_RETURNING_PREVIOUS
+            )
+
+    @classmethod
+    def insert_batch(cls, rows):
+        """rows are (idx, artist_id, title, album_name, genre); returns {idx: new id}."""
+        dialect = get_dialect()
+        with connection.cursor() as cursor:
+            if not dialect.ordered_identity:
+                cursor.execute(
+                    cls.INSERT_BATCH.format(rows=", ".join([cls.BATCH_ROW] * len(rows))),
+                    [value for row in rows for value in row]
+                )
+                return dict(cursor.fetchall())
+
+            cursor.execute(
+                dialect.returning(cls.INSERT_MANY, ("id",)).format(rows=", ".join([cls.INSERT_ROW] * len(rows))),
+                [value for row in rows for value in row[1:]]
+            )
+            # Ids were handed out in VALUES order, so the smallest belongs to the first row
+            return dict(zip([row[0] for row in rows], sorted(music_id for music_id, in cursor.fetchall())))
+
+    @classmethod
+    def update_batch(cls, rows):
+        """rows are (idx, id, title, album_name, genre); returns {idx: (id, artist_id, previous genre)} for the rows that exist."""
+        dialect = get_dialect()
+        with connection.cursor() as cursor:
+            if dialect.returns_previous_values:
+                cursor.execute(
+                    cls.UPDATE_BATCH.format(rows=", ".join([cls.BATCH_ROW] * len(rows))),
+                    [value for row in rows for value in row]
+                )
+                return {idx: (music_id, artist_id, genre) for idx, music_id, artist_id, genre in cursor.fetchall()}
+
+            music_ids = [row[1] for row in rows]
+            cursor.execute(
+                dialect.for_update(cls.SELECT_PREVIOUS_BATCH.format(ids=", ".join(["%s"] * len(music_ids)))),
+                music_ids
+            )
+            previous = {music_id: (artist_id, genre) for music_id, artist_id, genre in cursor.fetchall()}
+            rows = [row for row in rows if row[1] in previous]
+            cursor.executemany(
+                cls.UPDATE,
+                [[title, album_name, genre, music_id] for _, music_id, title, album_name, genre in rows]
+            )
+            return {idx: (music_id, *previous[music_id]) for idx, music_id, *_ in rows}
+
+    @classmethod
+    def delete_batch(cls, music_ids):
+        """Returns {id: (artist_id, genre)} for the tracks that were deleted."""
+        returning = get_dialect().returning(cls.DELETE_BATCH, ("id", "artist_id", "genre"))
+        with connection.cursor() as cursor:
+            cursor.execute(returning.format(ids=", ".join(["%s"] * len(music_ids))), music_ids)
+            return {music_id: (artist_id, genre) for music_id, artist_id, genre in cursor.fetchall()}
+
+
+class UserRepository(Repository):
+    table = "Users"
+    columns = (
+        ("first_name", "fname"),
+        ("last_name", "lname"),
+        ("email", "email"),
+        ("phone", "phone"),
+        ("gender", "gender"),
+        ("dob", "dob"),
+        ("address", "address"),
+        ("id", "id"),
+    )
+    converters = {"gender": GENDER_NAMES.get}
+
+    INSERT = '''
+        INSERT INTO Users (first_name, last_name, email, password, phone, gender, dob, address)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        '''
+    UPDATE = '''
+        UPDATE Users SET first_name = %s, last_name = %s, email = %s, phone = %s, gender = %s, dob = %s,
+        address = %s, updated_at = CURRENT_TIMESTAMP WHERE id = %s
+        '''
+
+    @classmethod
+    def insert(cls, values):
+        with connection.cursor() as cursor:
+            cursor.execute(get_dialect().returning(cls.INSERT, ("id",)), values)
+            return cursor.fetchone()[0]
+
+    @classmethod
+    def update(cls, user_id, values):
+        with connection.cursor() as cursor:
+            cursor.execute(cls.UPDATE, [*values, user_id])
+            return cursor.rowcount
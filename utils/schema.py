@@ -0,0 +1,76 @@
+import re
+from pathlib import Path
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from utils.dialects import get_dialect
+
+SQL_QUERYS = Path(__file__).resolve().parent.parent / "sql_querys"
+
+_COMMENT = re.compile(r"--[^\n]*")
+_CREATE_TABLE = re.compile(r"CREATE\s+TABLE\s+(\w+)\s*\((.*?)\)\s*;", re.IGNORECASE | re.DOTALL)
+_ALTER_ADD = re.compile(r"ALTER\s+TABLE\s+([\w\[\].]+)\s+ADD\s+([^;\n]+)", re.IGNORECASE)
+_TABLE_CONSTRAINT = re.compile(r"(CONSTRAINT|PRIMARY\s+KEY|FOREIGN\s+KEY|UNIQUE|CHECK)\b", re.IGNORECASE)
+
+
+def _split_definitions(body):
+    # Commas inside IDENTITY(1,1) or CHECK (... IN (...)) do not end a definition
+    definitions, depth, current = [], 0, []
+    for char in body:
+        if char == "," and depth == 0:
+            definitions.append("".join(current).strip())
+            current = []
+            continue
+        depth += {"(": 1, ")": -1}.get(char, 0)
+        current.append(char)
+    definitions.append("".join(current).strip())
+    return [definition for definition in definitions if definition]
+
+
+def read_tables(path=SQL_QUERYS):
+    """{table: [column and constraint definitions]} from the T-SQL schema script, in creation order.
+
+    ALTER TABLE ... ADD columns are folded into their CREATE TABLE, ahead of the table
+    constraints, so a fresh database gets the final shape in one statement.
+    """
+    script = _COMMENT.sub("", Path(path).read_text())
+    tables = {name: _split_definitions(body) for name, body in _CREATE_TABLE.findall(script)}
+    for target, column in _ALTER_ADD.findall(script):
+        name = target.replace("[", "").replace("]", "").split(".")[-1]
+        definitions = tables[name]
+        position = next(
+            (index for index, definition in enumerate(definitions) if _TABLE_CONSTRAINT.match(definition)),
+            len(definitions),
+        )
+        definitions.insert(position, column.strip())
+    return tables
+
+
+def create_table_statements(conn, path=SQL_QUERYS):
+    dialect = get_dialect(conn)
+    return {
+        name: "CREATE TABLE {} (\n    {}\n)".format(
+            name, ",\n    ".join(dialect.translate_ddl(definition) for definition in definitions)
+        )
+        for name, definitions in read_tables(path).items()
+    }
+
+
+def bootstrap_schema(conn, path=SQL_QUERYS):
+    """Creates the tables from sql_querys that do not exist yet; returns (created, skipped) table names."""
+    existing = {name.lower() for name in conn.introspection.table_names()}
+    created, skipped = [], []
+    with conn.cursor() as cursor:
+        for name, sql in create_table_statements(conn, path).items():
+            if name.lower() in existing:
+                skipped.append(name)
+                continue
+            cursor.execute(sql)
+            created.append(name)
+    return created, skipped
+
+
+def create_missing_tables(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    """pre_migrate receiver. The index and stats migrations need the sql_querys tables, so a fresh
+    database, including the one `manage.py test` creates, gets them before any migration runs."""
+    bootstrap_schema(connections[using])
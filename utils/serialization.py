@@ -0,0 +1,58 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_django_encoder = DjangoJSONEncoder()
+
+
+def _default(value):
+    # orjson handles UUID and dataclasses itself; dates and times, Decimal, time deltas
+    # and lazy translation strings fall back to the same rules as DjangoJSONEncoder
+    return _django_encoder.default(value)
+
+
+def stdlib_dumps(data):
+    return json.dumps(data, cls=DjangoJSONEncoder).encode("utf-8")
+
+
+if orjson is not None:
+    # Dates and times go through DjangoJSONEncoder as well: orjson would write microseconds and
+    # "+00:00" where Django writes milliseconds and "Z", so the output would depend on the install
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def orjson_dumps(data):
+        return orjson.dumps(data, default=_default, option=_ORJSON_OPTIONS)
+
+    dumps = orjson_dumps
+    ENCODER = "orjson"
+else:
+    orjson_dumps = None
+    dumps = stdlib_dumps
+    ENCODER = "json"
+
+
+class JsonResponse(HttpResponse):
+    """Drop-in for django.http.JsonResponse that serializes with ServiceResult.serialize.
+
+    `encoder` and `json_dumps_params` are honoured by falling back to the stdlib
+    encoder, so callers that customise serialization keep working.
+    """
+
+    def __init__(self, data, encoder=None, safe=True, json_dumps_params=None, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError("In order to allow non-dict objects to be serialized set the safe parameter to False.")
+        kwargs.setdefault("content_type", "application/json")
+        if encoder is None and json_dumps_params is None:
+            # Imported here because ServiceResult takes its default serializer from this module
+            from utils.service_result import ServiceResult
+
+            content = ServiceResult.serialize(data)
+        else:
+            content = json.dumps(data, cls=encoder or DjangoJSONEncoder, **(json_dumps_params or {}))
+        super().__init__(content=content, **kwargs)
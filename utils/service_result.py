@@ -1,14 +1,24 @@
+from utils.serialization import dumps
+
+
 class ServiceResult:
-    def __init__(self,is_success:bool,data=None,error_message=None,status=200):
+    # The one serializer for JSON response bodies; utils.serialization.JsonResponse calls it too
+    serialize = staticmethod(dumps)
+
+    def __init__(self,is_success:bool,data=None,error_message=None,status=200,next_cursor=None):
         self.is_success=is_success
         self.data=data
         self.error_message=error_message
         self.status=status
-    
+        self.next_cursor=next_cursor
+
     @staticmethod
     def as_success(data):
         return ServiceResult(True,data,None,200)
     @staticmethod
+    def as_page(data,next_cursor):
+        return ServiceResult(True,data,None,200,next_cursor)
+    @staticmethod
     def as_failure(error_message,status):
         return ServiceResult(False,None,error_message,status)
 
@@ -17,6 +27,9 @@ class ServiceResult:
             "isSuccess": self.is_success,
             "data": self.data,
             "errorMessage": self.error_message,
-            "status": self.status
-        }   
-             
\ No newline at end of file
+            "status": self.status,
+            "nextCursor": self.next_cursor
+        }
+
+    def to_json(self):
+        return self.serialize(self.to_dict())
@@ -0,0 +1,90 @@
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connection
+from django.http import StreamingHttpResponse
+
+from utils.serialization import dumps
+
+STREAM_BATCH_SIZE = 1000
+
+STREAM_FORMATS = {
+    "1": "ndjson",
+    "ndjson": "ndjson",
+    "json": "json",
+}
+
+
+def iter_batches(sql, params=None, batch_size=STREAM_BATCH_SIZE):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params or [])
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+
+
+def _ndjson(batches, row_to_dict):
+    for rows in batches:
+        yield b"".join(dumps(row_to_dict(row)) + b"\n" for row in rows)
+
+
+def _json_array(batches, row_to_dict):
+    yield b"["
+    separator = b""
+    for rows in batches:
+        chunk = []
+        for row in rows:
+            chunk.append(separator)
+            chunk.append(dumps(row_to_dict(row)))
+            separator = b","
+        yield b"".join(chunk)
+    yield b"]"
+
+
+async def _andjson(batches, row_to_dict):
+    async for rows in batches:
+        yield b"".join(dumps(row_to_dict(row)) + b"\n" for row in rows)
+
+
+async def _ajson_array(batches, row_to_dict):
+    yield b"["
+    separator = b""
+    async for rows in batches:
+        chunk = []
+        for row in rows:
+            chunk.append(separator)
+            chunk.append(dumps(row_to_dict(row)))
+            separator = b","
+        yield b"".join(chunk)
+    yield b"]"
+
+
+def stream_format(request):
+    return STREAM_FORMATS.get(request.GET.get("stream", "").lower())
+
+
+def serves_async(request):
+    return isinstance(request, ASGIRequest)
+
+
+def stream_batches(request, batches, abatches, *args, **kwargs):
+    """Calls batches, e.g. ArtistRepository.iter_batches, or under ASGI its async twin abatches.
+
+    ASGI sends a streamed body from the event loop and buffers a sync iterator whole
+    before the first byte goes out, so there every batch is fetched on the DB executor.
+    """
+    if serves_async(request):
+        return abatches(*args, **kwargs)
+    return batches(*args, **kwargs)
+
+
+def stream_rows_response(fmt, batches, row_to_dict):
+    # batches comes from stream_batches, so rows are pulled from the database batch by batch
+    # while the response is written and memory stays bounded no matter how large the table is
+    if hasattr(batches, "__aiter__"):
+        if fmt == "json":
+            return StreamingHttpResponse(_ajson_array(batches, row_to_dict), content_type="application/json")
+        return StreamingHttpResponse(_andjson(batches, row_to_dict), content_type="application/x-ndjson")
+    if fmt == "json":
+        return StreamingHttpResponse(_json_array(batches, row_to_dict), content_type="application/json")
+    return StreamingHttpResponse(_ndjson(batches, row_to_dict), content_type="application/x-ndjson")
@@ -0,0 +1,54 @@
+import json
+
+from django.core.cache import caches
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+
+from registration.views import generate_jwt_token
+from utils.repositories import ArtistRepository, MusicRepository
+
+
+class ApiTestMixin:
+    def setUp(self):
+        # The entity and idempotency caches outlive the per-test transaction rollback
+        for cache in caches.all():
+            cache.clear()
+        self.client = Client(HTTP_AUTHORIZATION="Bearer " + generate_jwt_token(1, "admin", True))
+
+    def send(self, method, path, body=None, **extra):
+        if body is None:
+            response = getattr(self.client, method)(path, **extra)
+        else:
+            response = getattr(self.client, method)(path, json.dumps(body), content_type="application/json", **extra)
+        return response, json.loads(response.content)
+
+    def register(self, username="newcomer", password="secret"):
+        """Registers and logs in through the API; returns the Authorization header value."""
+        self.send("post", "/auth/register/", {
+            "fname": "a", "lname": "b", "email": f"{username}@example.com", "username": username, "password": password,
+        })
+        _, body = self.send("post", "/auth/login/", {"username": username, "password": password})
+        return "Bearer " + body["data"]["token"]
+
+    def add_artist(self, name="artist", gender="m", first_release_year=1990, no_of_albums_released=1):
+        return ArtistRepository.insert([name, None, gender, None, first_release_year, no_of_albums_released])
+
+    def add_track(self, artist_id, title="track", album_name="album", genre="rock"):
+        return MusicRepository.insert([artist_id, title, album_name, genre])
+
+
+@override_settings(RATE_LIMIT_ENABLED=False)
+class ApiTestCase(ApiTestMixin, TestCase):
+    """Runs against the sqlite or postgres DB_PROFILE: `DB_PROFILE=sqlite python manage.py test`."""
+
+
+@override_settings(RATE_LIMIT_ENABLED=False)
+class AsyncApiTestCase(ApiTestMixin, TransactionTestCase):
+    """For code that queries from the DB executor threads, which cannot see a TestCase's open transaction."""
+
+    def tearDown(self):
+        # The flush after each test only covers Django models, not the sql_querys tables
+        with connection.cursor() as cursor:
+            for table in ["Music", "Artist"]:
+                cursor.execute(f"DELETE FROM {table}")
+        super().tearDown()
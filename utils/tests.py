@@ -0,0 +1,210 @@
+import datetime
+import json
+from types import SimpleNamespace
+from unittest import mock
+from zoneinfo import ZoneInfo
+
+from django.test import SimpleTestCase, override_settings
+
+from utils import db_pool
+from utils.db_pool import ConnectionPool, _pool_for
+from utils.dialects import DIALECTS
+from utils.filters import InvalidFilter, contains, escape_like, integer, one_of, parse_filters, prefix
+from utils.pagination import (
+    DEFAULT_LIMIT, MAX_LIMIT, InvalidPageRequest, decode_cursor, encode_cursor, keyset_where, parse_page_params,
+    split_page,
+)
+from utils.rate_limit import MemoryBucketStore, refill
+from utils.schema import read_tables
+from utils.serialization import JsonResponse, orjson_dumps, stdlib_dumps
+from utils.service_result import ServiceResult
+from utils.testing import ApiTestCase
+
+
+@override_settings(PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=0)
+class ProfilingTests(ApiTestCase):
+    def test_only_admins_get_profiled(self):
+        response = self.client.get("/artist/get/?profile=inline")
+        self.assertEqual(response["Content-Type"], "text/plain; charset=utf-8")
+        self.assertIn("X-Profile-Status", response)
+
+        bearer = self.register()
+        for response in [
+            self.client_class().get("/artist/get/?profile=inline", HTTP_AUTHORIZATION=bearer),
+            self.client_class().get("/artist/get/", HTTP_AUTHORIZATION=bearer, HTTP_X_PROFILE="inline"),
+        ]:
+            self.assertNotIn("X-Profile-Status", response)
+            self.assertEqual(response["Content-Type"], "application/json")
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def test_connections_expire_by_their_own_age(self):
+        pool = ConnectionPool(mock.Mock, size=2, max_age=10, pre_ping=False)
+        with mock.patch("utils.db_pool.time.monotonic", return_value=100):
+            old = pool.acquire()
+        with mock.patch("utils.db_pool.time.monotonic", return_value=105):
+            young = pool.acquire()
+            pool.release(old)
+            pool.release(young)
+        with mock.patch("utils.db_pool.time.monotonic", return_value=112):
+            # The younger connection comes back first; the older one is over max_age and gets closed
+            self.assertIs(pool.acquire()[0], young[0])
+            self.assertIsNot(pool.acquire()[0], old[0])
+        old[0].close.assert_called_once()
+
+    def test_pool_is_rebuilt_when_the_connection_params_change(self):
+        settings = {"SIZE": 2}
+        with mock.patch.dict(db_pool._pools, clear=True):
+            first = _pool_for("other", settings, {"database": "a", "options": {"timeout": 5}}, mock.Mock)
+            self.assertIs(_pool_for("other", settings, {"options": {"timeout": 5}, "database": "a"}, mock.Mock), first)
+            conn = first.acquire()
+            second = _pool_for("other", settings, {"database": "b", "options": {"timeout": 5}}, mock.Mock)
+            self.assertIsNot(second, first)
+            # A connection borrowed from the retired pool is closed when it comes back
+            first.release(conn)
+            conn[0].close.assert_called_once()
+            self.assertEqual(first.stats()["idle"], 0)
+
+
+class SerializationTests(SimpleTestCase):
+    values = {
+        "aware": datetime.datetime(2026, 10, 18, 12, 30, 5, 123456, tzinfo=datetime.timezone.utc),
+        "naive": datetime.datetime(2026, 10, 18, 12, 30, 5),
+        "date": datetime.date(1990, 2, 3),
+        "time": datetime.time(7, 5, 0, 250000),
+    }
+    expected = {
+        "aware": "2026-10-18T12:30:05.123Z",
+        "naive": "2026-10-18T12:30:05",
+        "date": "1990-02-03",
+        "time": "07:05:00.250",
+    }
+
+    def test_datetime_format(self):
+        # DjangoJSONEncoder's format whichever encoder is installed
+        self.assertEqual(json.loads(stdlib_dumps(self.values)), self.expected)
+        if orjson_dumps is not None:
+            self.assertEqual(json.loads(orjson_dumps(self.values)), self.expected)
+
+    def test_responses_use_the_service_result_serializer(self):
+        result = ServiceResult.as_success(self.values)
+        serialize = mock.Mock(wraps=stdlib_dumps)
+        with mock.patch.object(ServiceResult, "serialize", serialize):
+            response = JsonResponse(result.to_dict())
+            self.assertEqual(result.to_json(), response.content)
+        self.assertEqual(serialize.call_count, 2)
+        self.assertEqual(json.loads(response.content)["data"], self.expected)
+
+
+class PaginationTests(SimpleTestCase):
+    def test_cursor_round_trip(self):
+        for last_id in [1, 42, 10 ** 12]:
+            self.assertEqual(decode_cursor(encode_cursor(last_id)), last_id)
+
+    def test_cursor_has_no_padding(self):
+        self.assertNotIn("=", encode_cursor(1))
+
+    def test_invalid_cursors(self):
+        for cursor in ["", "!!!", encode_cursor(1)[:-2], "bm90OjE", "aWQ6eA"]:  # "not:1", "id:x"
+            with self.assertRaises(InvalidPageRequest):
+                decode_cursor(cursor)
+
+    def test_page_params(self):
+        self.assertEqual(parse_page_params({}), (DEFAULT_LIMIT, None))
+        self.assertEqual(parse_page_params({"limit": "10", "after": encode_cursor(7)}), (10, 7))
+        self.assertEqual(parse_page_params({"limit": str(MAX_LIMIT + 1)}), (MAX_LIMIT, None))
+        for limit in ["0", "-1", "ten"]:
+            with self.assertRaises(InvalidPageRequest):
+                parse_page_params({"limit": limit})
+
+    def test_split_page(self):
+        rows = [(5,), (4,), (3,)]
+        self.assertEqual(split_page(rows, 3), (rows, None))
+        self.assertEqual(split_page(rows, 2), (rows[:2], encode_cursor(4)))
+
+    def test_keyset_where(self):
+        self.assertEqual(keyset_where(None), ("", []))
+        self.assertEqual(keyset_where(9, filters=[("name LIKE %s", ["a%"])]), ("WHERE name LIKE %s AND id < %s", ["a%", 9]))
+
+
+class FilterTests(SimpleTestCase):
+    def test_escape_like(self):
+        self.assertEqual(escape_like(r"100%_[a]\\"), r"100\%\_\[a]\\\\")
+
+    def test_builders(self):
+        self.assertEqual(prefix("name")("a_"), ("name LIKE %s ESCAPE '\\'", ["a\\_%"]))
+        self.assertEqual(contains("name")("5%"), ("name LIKE %s ESCAPE '\\'", ["%5\\%%"]))
+        self.assertEqual(integer("year", ">=")("1990"), ("year >= %s", [1990]))
+        self.assertEqual(one_of("genre IN ({})", ["rock", "jazz"])("Rock, jazz,rock"), ("genre IN (%s, %s)", ["rock", "jazz"]))
+
+    def test_parse_filters(self):
+        spec = {"q": contains("name"), "year": integer("year")}
+        self.assertEqual(parse_filters({"q": " ", "year": "2000"}, spec), [("year = %s", [2000])])
+        with self.assertRaisesMessage(InvalidFilter, "year: expected an integer, got x"):
+            parse_filters({"year": "x"}, spec)
+        with self.assertRaises(InvalidFilter):
+            one_of("genre IN ({})", ["rock"])("polka")
+
+
+class DialectTests(SimpleTestCase):
+    def test_limit(self):
+        sql = "SELECT id FROM Artist WHERE id < %s ORDER BY id DESC"
+        self.assertEqual(DIALECTS["microsoft"].limit(sql, [9], 5), (sql.replace("SELECT", "SELECT TOP (%s)"), [5, 9]))
+        self.assertEqual(DIALECTS["sqlite"].limit(sql, [9], 5), (sql + " LIMIT %s", [9, 5]))
+
+    def test_returning(self):
+        microsoft, sqlite = DIALECTS["microsoft"], DIALECTS["sqlite"]
+        self.assertEqual(
+            microsoft.returning("INSERT INTO T (a) VALUES (%s)", ("id",)), "INSERT INTO T (a) OUTPUT INSERTED.id VALUES (%s)"
+        )
+        self.assertEqual(
+            microsoft.returning("DELETE FROM T WHERE id = %s", ("id", "a")),
+            "DELETE FROM T OUTPUT DELETED.id, DELETED.a WHERE id = %s",
+        )
+        self.assertEqual(sqlite.returning("DELETE FROM T WHERE id = %s", ("id",)), "DELETE FROM T WHERE id = %s RETURNING id")
+
+    def test_upsert(self):
+        keys, columns = ("dimension", "bucket"), ("dimension", "bucket", "value")
+        merge = DIALECTS["microsoft"].upsert("Stats", keys, columns, True)
+        self.assertIn("MERGE Stats WITH (HOLDLOCK)", merge)
+        self.assertIn("value = target.value + src.value", merge)
+        self.assertTrue(DIALECTS["sqlite"].upsert("Stats", keys, columns).endswith(
+            "ON CONFLICT (dimension, bucket) DO UPDATE SET value = excluded.value"
+        ))
+
+    def test_timestamp_zone(self):
+        london = SimpleNamespace(settings_dict={"TIME_ZONE": "Europe/London"}, timezone=ZoneInfo("Europe/London"))
+        unset = SimpleNamespace(settings_dict={"TIME_ZONE": None}, timezone=datetime.timezone.utc)
+        # GETDATE() is local time, so SQL Server timestamps have no zone until the database setting names one
+        self.assertIsNone(DIALECTS["microsoft"].timestamp_zone(unset))
+        self.assertEqual(DIALECTS["microsoft"].timestamp_zone(london), ZoneInfo("Europe/London"))
+        self.assertEqual(DIALECTS["sqlite"].timestamp_zone(london), datetime.timezone.utc)
+
+    def test_postgres_locks_previous_values(self):
+        self.assertEqual(DIALECTS["postgresql"].for_update("SELECT 1"), "SELECT 1 FOR UPDATE")
+
+    def test_schema_folds_alter_table_into_create(self):
+        tables = read_tables()
+        self.assertEqual(list(tables), ["Users", "Artist", "Music"])
+        self.assertEqual(tables["Artist"][-1], "name VARCHAR(255) NOT NULL")
+        self.assertTrue(tables["Music"][-1].startswith("CONSTRAINT FK_artist_id"))
+        self.assertEqual(
+            DIALECTS["sqlite"].translate_ddl(tables["Music"][0]), "id INTEGER PRIMARY KEY AUTOINCREMENT"
+        )
+
+
+class RefillTests(SimpleTestCase):
+    def test_refill(self):
+        self.assertEqual(refill(None, rate=2, burst=10, now=100), 10)
+        self.assertEqual(refill((3, 100), rate=2, burst=10, now=101.5), 6)
+        self.assertEqual(refill((3, 100), rate=2, burst=10, now=200), 10)
+        self.assertEqual(refill((0.5, 100), rate=0.5, burst=1, now=100), 0.5)
+
+    def test_bucket_drains_then_refills(self):
+        store = MemoryBucketStore()
+        for _ in range(3):
+            self.assertEqual(store.take("client", rate=1, burst=3), (True, 0))
+        allowed, retry_after = store.take("client", rate=1, burst=3)
+        self.assertFalse(allowed)
+        self.assertGreater(retry_after, 0)
+        self.assertLessEqual(retry_after, 1)